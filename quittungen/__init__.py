@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Kernfunktionen des Quittungs-Generators (ohne GUI).
+
+Die Untermodule werden erst beim ersten Zugriff importiert, damit z.B.
+`python -m quittungen --help` nicht pandas und python-docx laden muss.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "CompiledTemplate": "template",
+    "check_template": "templatecheck",
+    "ProgressEvent": "pipeline",
+    "Report": "pipeline",
+    "generate_all": "pipeline",
+    "generate_pdfs": "pipeline",
+    "generate_receipts": "pipeline",
+    "load_batch": "batch",
+    "load_prices": "pipeline",
+    "load_template": "template",
+    "run_batch_file": "batch",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    return getattr(module, name)
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Stapelbetrieb: mehrere Aufträge (Schulen, Korrekturen früherer Schuljahre) in
+einem Aufruf.
+
+Die Aufträge stehen in einer Auftragsdatei (JSON, mit PyYAML auch YAML).
+Angaben unter "standard" gelten für alle Aufträge, die sie nicht selbst
+setzen; relative Pfade beziehen sich auf den Ordner der Auftragsdatei:
+
+    {
+      "standard": {"preise": "preise.xlsx", "vorlage": "Quittung-Template.docx", "schritt": "alles"},
+      "auftraege": [
+        {"name": "Schule A", "schuelerliste": "a/schuelerliste.xlsx", "ausgabe": "out/a"},
+        {"name": "Schule B 2024", "schuelerliste": "b/schuelerliste.xlsx", "preise": "preise_2024.xlsx",
+         "ausgabe": "out/b_2024", "inkrementell": true}
+      ]
+    }
+
+Die Aufträge laufen in mehreren Threads gleichzeitig. Vorlagen und
+Preislisten, die mehrere Aufträge verwenden, werden nur einmal geladen
+(quittungen.filecache). Jeder Auftrag schreibt seinen eigenen Laufbericht;
+write_batch_report() fasst alle Aufträge in einem Gesamtbericht zusammen.
+"""
+
+import csv
+import dataclasses
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+STEP_WORD = "word"
+STEP_PDF = "pdf"
+STEP_ALL = "alles"
+STEPS = (STEP_WORD, STEP_PDF, STEP_ALL)
+
+# Auswahl in der Auftragsdatei -> (class_documents, family_files), wie --ausgabeform
+WORD_OUTPUT_FORMS = {"familie": (False, True), "klasse": (True, False), "beides": (True, True)}
+
+STATUS_OK = "ok"
+STATUS_WARNINGS = "warnungen"
+STATUS_FAILED = "fehlgeschlagen"
+STATUS_CANCELLED = "abgebrochen"
+
+_PATH_KEYS = ("schuelerliste", "preise", "vorlage", "ausgabe")
+_JOB_KEYS = ({"name", "schritt", "ausgabeform", "backend", "einzel_pdfs", "pdf_cache", "inkrementell", "prozesse",
+              "doppelte"}
+             | set(_PATH_KEYS))
+# Auswahl in der Auftragsdatei -> Modus in quittungen.duplicates, wie --doppelte
+DUPLICATE_MODES = {"melden": "report", "zusammenfuehren": "merge", "aus": "off"}
+# Eingabedateien, die der jeweilige Schritt braucht
+_REQUIRED_FILES = {STEP_WORD: ("schuelerliste", "preise", "vorlage"), STEP_PDF: (),
+                   STEP_ALL: ("schuelerliste", "preise", "vorlage")}
+
+_CSV_COLUMNS = ["Auftrag", "Schritt", "Status", "Sekunden", "Quittungen", "Sammel-PDFs", "Warnungen", "Ausgabe"]
+
+BatchJob = namedtuple("BatchJob", ["name", "step", "output_dir", "options"])
+BatchResult = namedtuple("BatchResult", ["job", "status", "report", "error", "seconds"])
+
+
+def _read_batch_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Für YAML-Auftragsdateien wird PyYAML benötigt (pip install pyyaml).") from None
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_batch(path):
+    """
+    Liest und prüft die Auftragsdatei und gibt die Liste der BatchJobs zurück.
+    Fehler in irgendeinem Auftrag (unbekannte Angaben, fehlende Dateien, zwei
+    Aufträge mit demselben Ausgabeordner) werden alle zusammen als ValueError
+    gemeldet, bevor ein Auftrag startet. Dazu gehören auch Fehler in den
+    Word-Vorlagen (quittungen.templatecheck).
+    """
+    from .templatecheck import check_template
+
+    try:
+        data = _read_batch_file(path)
+    except ValueError as e:
+        raise ValueError(f"Auftragsdatei '{path}' ist nicht lesbar: {e}") from None
+    if not isinstance(data, dict) or not isinstance(data.get("auftraege"), list) or not data["auftraege"]:
+        raise ValueError(f"Auftragsdatei '{path}' enthält keine Liste 'auftraege'.")
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = data.get("standard") or {}
+    problems = []
+    jobs = []
+    output_dirs = {}
+    for index, entry in enumerate(data["auftraege"], start=1):
+        entry = {**defaults, **(entry or {})}
+        name = str(entry.get("name") or f"Auftrag {index}")
+        unknown = set(entry) - _JOB_KEYS
+        if unknown:
+            problems.append(f"{name}: unbekannte Angaben {', '.join(sorted(unknown))}")
+            continue
+
+        step = entry.get("schritt", STEP_WORD)
+        if step not in STEPS:
+            problems.append(f"{name}: unbekannter Schritt '{step}' (erlaubt: {', '.join(STEPS)})")
+            continue
+        paths = {key: os.path.normpath(os.path.join(base_dir, str(entry[key]))) for key in _PATH_KEYS if entry.get(key)}
+        if "ausgabe" not in paths:
+            problems.append(f"{name}: 'ausgabe' fehlt")
+            continue
+        for key in _REQUIRED_FILES[step]:
+            if key not in paths:
+                problems.append(f"{name}: '{key}' fehlt")
+            elif not os.path.isfile(paths[key]):
+                problems.append(f"{name}: Datei für '{key}' nicht gefunden: {paths[key]}")
+
+        output_key = os.path.normcase(paths["ausgabe"])
+        if output_key in output_dirs:
+            problems.append(f"{name}: denselben Ausgabeordner verwendet schon '{output_dirs[output_key]}'")
+        output_dirs[output_key] = name
+
+        output_form = entry.get("ausgabeform", "familie")
+        if output_form not in WORD_OUTPUT_FORMS:
+            problems.append(f"{name}: unbekannte Ausgabeform '{output_form}' (erlaubt: {', '.join(WORD_OUTPUT_FORMS)})")
+            continue
+
+        duplicates = entry.get("doppelte", "melden")
+        if duplicates not in DUPLICATE_MODES:
+            problems.append(f"{name}: unbekannter Wert für 'doppelte' '{duplicates}' "
+                            f"(erlaubt: {', '.join(DUPLICATE_MODES)})")
+            continue
+
+        workers = entry.get("prozesse", 1)
+        if not isinstance(workers, int) or isinstance(workers, bool) or workers < 1:
+            problems.append(f"{name}: 'prozesse' muss eine ganze Zahl ab 1 sein")
+            continue
+
+        options = {"output_dir": paths["ausgabe"], "incremental": bool(entry.get("inkrementell", False)),
+                   "workers": workers}
+        if step in (STEP_WORD, STEP_ALL):
+            class_documents, family_files = WORD_OUTPUT_FORMS[output_form]
+            options.update(excel_path=paths.get("schuelerliste"), prices_path=paths.get("preise"),
+                           template_path=paths.get("vorlage"), class_documents=class_documents,
+                           family_files=family_files, duplicates=DUPLICATE_MODES[duplicates])
+            # Eine fehlerhafte Vorlage soll den Stapel gar nicht erst starten (Ergebnis wird zwischengespeichert)
+            if os.path.isfile(paths.get("vorlage", "")):
+                try:
+                    template_problems = check_template(paths["vorlage"]).problems(class_documents)
+                except ValueError as e:
+                    template_problems = [str(e)]
+                problems.extend(f"{name}: {text}" for text in template_problems)
+        if step in (STEP_PDF, STEP_ALL):
+            options.update(backend=entry.get("backend"), single_pdfs=bool(entry.get("einzel_pdfs", False)),
+                           pdf_cache=bool(entry.get("pdf_cache", True)))
+        jobs.append(BatchJob(name, step, paths["ausgabe"], options))
+
+    if problems:
+        raise ValueError("Fehler in der Auftragsdatei:\n" + "\n".join(problems))
+    return jobs
+
+
+def _status(report):
+    if report.cancelled:
+        return STATUS_CANCELLED
+    return STATUS_WARNINGS if report.errors else STATUS_OK
+
+
+def run_batch(jobs, parallel=1, progress=None, cancel=None, profile=None, run_report=True):
+    """
+    Führt die Aufträge aus, höchstens `parallel` gleichzeitig, und gibt die
+    BatchResults in der Reihenfolge der Aufträge zurück. Ein fehlgeschlagener
+    Auftrag hält die übrigen nicht auf. progress(Auftragsname, ProgressEvent)
+    wird aus den Threads der Aufträge aufgerufen. Nach einem Abbruch starten
+    keine weiteren Aufträge.
+    """
+    from . import pipeline
+    from .pdf import default_backend_name, get_backend
+
+    if profile and parallel > 1 and len(jobs) > 1:
+        # cProfile und tracemalloc messen den ganzen Prozess bzw. vertragen nur eine Aufzeichnung zur Zeit
+        raise ValueError("Ein Lauf kann nur aufgezeichnet werden, wenn die Aufträge nacheinander laufen.")
+    targets = {STEP_WORD: pipeline.generate_receipts, STEP_PDF: pipeline.generate_pdfs, STEP_ALL: pipeline.generate_all}
+    progress = progress or (lambda name, event: None)
+    # Microsoft Word verträgt keine gleichzeitigen Umwandlungen; solche Aufträge laufen nacheinander
+    exclusive_backend = threading.Lock()
+
+    def run(job):
+        if cancel is not None and cancel.is_set():
+            return BatchResult(job, STATUS_CANCELLED, None, None, 0.0)
+        options = dict(job.options)
+        exclusive = False
+        if job.step in (STEP_PDF, STEP_ALL):
+            options["backend"] = options["backend"] or default_backend_name()
+            backend = get_backend(options["backend"])
+            if not backend.is_available():
+                return BatchResult(job, STATUS_FAILED, None,
+                                   f"Bitte installiere die PDF-Erweiterungen: {backend.missing_packages_hint}", 0.0)
+            exclusive = not backend.parallel_safe
+        start = time.perf_counter()
+        try:
+            if exclusive:
+                exclusive_backend.acquire()
+            report = targets[job.step](progress=lambda event: progress(job.name, event), cancel=cancel,
+                                       profile=profile, run_report=run_report, **options)
+        except Exception as e:
+            return BatchResult(job, STATUS_FAILED, None, str(e), time.perf_counter() - start)
+        finally:
+            if exclusive:
+                exclusive_backend.release()
+        return BatchResult(job, _status(report), report, None, time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(jobs)))) as executor:
+        return list(executor.map(run, jobs))
+
+
+def batch_report_path(batch_file):
+    return os.path.splitext(batch_file)[0] + "_Bericht.json"
+
+
+def write_batch_report(path, results, started, duration):
+    """Gesamtbericht aller Aufträge als JSON und (für Excel) als CSV daneben; gibt den JSON-Pfad zurück."""
+    jobs = []
+    for result in results:
+        entry = {"name": result.job.name, "step": result.job.step, "output_dir": result.job.output_dir,
+                 "status": result.status, "seconds": round(result.seconds, 3), "error": result.error}
+        if result.report is not None:
+            entry["result"] = dataclasses.asdict(result.report)
+        jobs.append(entry)
+
+    data = {
+        "started": started.isoformat(timespec="seconds"),
+        "duration_seconds": round(duration, 3),
+        "totals": {
+            "jobs": len(results),
+            "receipts": sum(r.report.receipts for r in results if r.report is not None),
+            "pdf_files": sum(r.report.pdf_files for r in results if r.report is not None),
+            "errors": sum(len(r.report.errors) for r in results if r.report is not None),
+            "failed": sum(1 for r in results if r.status == STATUS_FAILED),
+            "cancelled": sum(1 for r in results if r.status == STATUS_CANCELLED),
+        },
+        "jobs": jobs,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    # Semikolon und BOM wie beim Laufbericht (quittungen.runreport)
+    with open(os.path.splitext(path)[0] + ".csv", "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(_CSV_COLUMNS)
+        for result in results:
+            report = result.report
+            writer.writerow([result.job.name, result.job.step, result.status,
+                             f"{result.seconds:.1f}".replace(".", ","),
+                             report.receipts if report else "", report.pdf_files if report else "",
+                             len(report.errors) if report else (1 if result.error else 0), result.job.output_dir])
+    return path
+
+
+def run_batch_file(batch_file, parallel=1, progress=None, cancel=None, profile=None, run_report=True,
+                   report_file=None):
+    """Liest die Auftragsdatei, führt alle Aufträge aus und schreibt den Gesamtbericht; gibt (Ergebnisse, Berichtspfad) zurück."""
+    jobs = load_batch(batch_file)
+    started = datetime.now()
+    start = time.perf_counter()
+    results = run_batch(jobs, parallel=parallel, progress=progress, cancel=cancel, profile=profile,
+                        run_report=run_report)
+    report_file = write_batch_report(report_file or batch_report_path(batch_file), results, started,
+                                     time.perf_counter() - start)
+    return results, report_file
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark mit künstlichen Schülerlisten.
+
+Erzeugt Schülerlisten beliebiger Größe (z.B. 100 bis 50.000 Kinder) mit
+einstellbarer Geschwister- und Klassenverteilung, lässt die Pipeline ohne GUI
+laufen und schreibt Laufzeit, Spitzen-Speicher (RSS) und Durchsatz je Stufe
+als JSON, damit sich Läufe vor und nach einer Optimierung vergleichen lassen.
+
+Beispiel:
+    python -m quittungen.benchmark --kinder 100 1000 10000 --pdf --ergebnis bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from .stages import (STAGE_CLASS_DOCUMENTS, STAGE_DOCX_SAVE, STAGE_PDF_CLASSES, STAGE_PDF_CONVERT, STAGE_PDF_MERGE,
+                     STAGE_TEMPLATE_RENDER, STAGE_WORD_DOCUMENTS, StageTimes)
+
+DEFAULT_SIBLINGS = "55,30,12,3"
+DEFAULT_FEES = "360,220,170"
+SAMPLE_INTERVAL = 0.02
+
+# Stufen, die (auch) in Worker-Prozessen laufen, haben keinen eigenen Zeitraum im
+# Hauptprozess; ihr Speicher-Spitzenwert wird dem umgebenden Schritt entnommen.
+_PARENT_STAGES = {
+    STAGE_TEMPLATE_RENDER: STAGE_WORD_DOCUMENTS,
+    STAGE_DOCX_SAVE: STAGE_WORD_DOCUMENTS,
+    STAGE_CLASS_DOCUMENTS: STAGE_WORD_DOCUMENTS,
+    STAGE_PDF_CONVERT: STAGE_PDF_CLASSES,
+    STAGE_PDF_MERGE: STAGE_PDF_CLASSES,
+}
+
+_VORNAMEN = ["Anna", "Boris", "Dimitar", "Elena", "Georgi", "Ivana", "Jana", "Kalin", "Lea", "Maria",
+             "Nikola", "Petar", "Radost", "Stefan", "Teodora", "Viktor", "Zlatan", "Jörg", "Müge"]
+_NACHNAMEN = ["Petrov", "Ivanova", "Georgiev", "Dimitrova", "Nikolov", "Müller", "Schmidt", "Hadzhiev",
+              "Todorova", "Stoyanov", "Weiß", "Kostova", "Popov", "Angelova", "Vasilev"]
+_STANDORTE = ["Neubiberg", "Freiham", "Ottobrunn"]
+
+
+# ------------------------------------------
+# Testdaten
+# ------------------------------------------
+def _class_names(count):
+    names = []
+    for i in range(count):
+        standort = _STANDORTE[i % len(_STANDORTE)]
+        names.append(f"{standort} Klasse {i // len(_STANDORTE) + 1}{'abc'[i % 3]}")
+    return names
+
+
+def make_roster(path, children, sibling_weights, classes, skewed=False, waitlist_share=0.0, seed=1):
+    """Schreibt eine Schülerliste mit `children` Kindern; gibt die Anzahl Familien zurück."""
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    class_names = _class_names(classes)
+    # "schief": wenige große und viele kleine Klassen (Zipf-artig)
+    class_weights = [1.0 / (i + 1) for i in range(classes)] if skewed else None
+    sizes = list(range(1, len(sibling_weights) + 1))
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Eltern 1 - Name", "Name Kind", "In Klasse", "Eltern 1 - Emailadresse"])
+    written = 0
+    families = 0
+    while written < children:
+        families += 1
+        nachname = rng.choice(_NACHNAMEN)
+        parent = f"{rng.choice(_VORNAMEN)} {nachname}"
+        email = f"familie{families}@example.org"
+        klasse = rng.choices(class_names, weights=class_weights)[0]
+        if waitlist_share and rng.random() < waitlist_share:
+            klasse = "Warteliste"
+        for _ in range(min(rng.choices(sizes, weights=sibling_weights)[0], children - written)):
+            sheet.append([parent, f"{rng.choice(_VORNAMEN)} {nachname}", klasse, email])
+            written += 1
+    workbook.save(path)
+    return families
+
+
+def make_prices(path, fees, membership_fee=35, school_year="2024/2025"):
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    gebuehren = workbook.active
+    gebuehren.title = "Gebuehren"
+    gebuehren.append(["Kind_Nr", "Betrag"])
+    for i, fee in enumerate(fees, start=1):
+        gebuehren.append([i, fee])
+    beitraege = workbook.create_sheet("Beitraege")
+    beitraege.append(["Posten", "Betrag"])
+    beitraege.append(["Mitgliedsbeitrag", membership_fee])
+    konfiguration = workbook.create_sheet("Konfiguration")
+    konfiguration.append(["Eigenschaft", "Wert"])
+    konfiguration.append(["Schuljahr", school_year])
+    workbook.save(path)
+
+
+# ------------------------------------------
+# Speichermessung
+# ------------------------------------------
+def _rss_reader():
+    """Liefert eine Funktion für den aktuellen RSS (Bytes) inkl. Worker-Prozesse, oder None."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        process = psutil.Process()
+
+        def read():
+            total = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            return total
+        return read
+
+    if os.path.exists("/proc/self/statm"):
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        own_pid = os.getpid()
+
+        def read():
+            total = _proc_rss(own_pid)
+            for pid in _proc_descendants(own_pid):
+                # Worker können zwischen Auflisten und Lesen schon beendet sein
+                total += _proc_rss(pid) or 0
+            return total * page_size
+        return read
+    return None
+
+
+def _proc_rss(pid):
+    """Resident-Seiten eines Prozesses aus /proc/<pid>/statm, oder None."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _proc_descendants(pid):
+    """Alle (auch indirekten) Kind-Prozesse von pid, ermittelt über den Elternprozess in /proc/<pid>/stat."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            # Der Prozessname in Klammern kann Leerzeichen enthalten; danach folgen Status und Eltern-PID
+            parent = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    found = []
+    queue = [pid]
+    while queue:
+        for child in children.get(queue.pop(), []):
+            found.append(child)
+            queue.append(child)
+    return found
+
+
+class RssSampler(threading.Thread):
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._read = _rss_reader()
+        self._stop_event = threading.Event()
+
+    @property
+    def available(self):
+        return self._read is not None
+
+    def run(self):
+        while self._read is not None and not self._stop_event.is_set():
+            self.samples.append((time.perf_counter(), self._read()))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def peak(self, start, end):
+        values = [rss for t, rss in self.samples if start <= t <= end]
+        return max(values) if values else None
+
+
+def _peak_rss_total():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss ist unter Linux in KiB, unter macOS in Bytes
+    factor = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * factor
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * factor
+    return max(own, children)
+
+
+def _mb(value):
+    return None if value is None else round(value / (1024 * 1024), 1)
+
+
+# ------------------------------------------
+# Ablauf
+# ------------------------------------------
+def _stage_results(stage_times, sampler):
+    windows = {}
+    for name, start, end in stage_times.spans:
+        windows.setdefault(name, []).append((start, end))
+
+    results = {}
+    for name, entry in stage_times.as_dict().items():
+        spans = windows.get(name) or windows.get(_PARENT_STAGES.get(name), [])
+        peaks = [sampler.peak(start, end) for start, end in spans] if sampler.available else []
+        peaks = [peak for peak in peaks if peak is not None]
+        seconds = entry["seconds"]
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "items": entry["items"],
+            "throughput_per_s": round(entry["items"] / seconds, 2) if seconds > 0 and entry["items"] else None,
+            "peak_rss_mb": _mb(max(peaks)) if peaks else None,
+        }
+    return results
+
+
+def run_benchmark(children, template_path, work_dir, sibling_weights, classes, fees,
+                  skewed=False, waitlist_share=0.0, workers=1, with_pdf=False, backend=None, seed=1):
+    from .pipeline import generate_pdfs, generate_receipts
+
+    excel_path = os.path.join(work_dir, f"schuelerliste_{children}.xlsx")
+    prices_path = os.path.join(work_dir, "preise.xlsx")
+    output_dir = os.path.join(work_dir, f"out_{children}")
+    if os.path.exists(output_dir):
+        shutil.rmtree(output_dir)
+
+    families = make_roster(excel_path, children, sibling_weights, classes, skewed, waitlist_share, seed)
+    make_prices(prices_path, fees)
+
+    stage_times = StageTimes()
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    try:
+        word_report = generate_receipts(excel_path, prices_path, template_path, output_dir,
+                                        workers=workers, stage_times=stage_times)
+        pdf_report = None
+        if with_pdf:
+            pdf_report = generate_pdfs(output_dir, backend=backend, workers=workers, stage_times=stage_times)
+    finally:
+        wall = time.perf_counter() - start
+        sampler.stop()
+
+    stages = _stage_results(stage_times, sampler)
+    sampled_peak = max((rss for _, rss in sampler.samples), default=None)
+    return {
+        "children": children,
+        "families": families,
+        "classes": word_report.classes,
+        "receipts": word_report.receipts,
+        "class_pdfs": pdf_report.pdf_files if pdf_report else None,
+        "errors": len(word_report.errors) + (len(pdf_report.errors) if pdf_report else 0),
+        "workers": workers,
+        "wall_seconds": round(wall, 3),
+        "receipts_per_s": round(word_report.receipts / wall, 2) if wall > 0 else None,
+        "peak_rss_mb": _mb(sampled_peak),
+        "stages": stages,
+    }
+
+
+def _parse_numbers(text, convert=float):
+    return [convert(value) for value in text.split(",") if value.strip()]
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog="python -m quittungen.benchmark",
+                                     description="Benchmark des Quittungs-Generators mit künstlichen Schülerlisten")
+    parser.add_argument("--kinder", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Anzahl Kinder je Lauf (mehrere Werte = mehrere Läufe)")
+    parser.add_argument("--geschwister", default=DEFAULT_SIBLINGS,
+                        help="Anteile der Familien mit 1, 2, 3, ... Kindern (Standard: %(default)s)")
+    parser.add_argument("--klassen", type=int, default=30, help="Anzahl Klassen (Standard: %(default)s)")
+    parser.add_argument("--klassen-verteilung", choices=["gleich", "schief"], default="gleich",
+                        help="Kinder gleichmäßig oder Zipf-artig auf die Klassen verteilen")
+    parser.add_argument("--warteliste", type=float, default=0.02,
+                        help="Anteil der Familien auf der Warteliste (Standard: %(default)s)")
+    parser.add_argument("--gebuehren", default=DEFAULT_FEES,
+                        help="Gebühr für das 1., 2., 3., ... Kind (Standard: %(default)s)")
+    parser.add_argument("--vorlage", default="Quittung-Template.docx", help="Word-Vorlage")
+    parser.add_argument("--prozesse", type=int, default=1, help="Anzahl Worker-Prozesse (0 = automatisch)")
+    parser.add_argument("--pdf", action="store_true", help="Auch Schritt 2 (Sammel-PDFs) messen")
+    parser.add_argument("--backend", choices=["word", "native"], help="PDF-Backend für --pdf")
+    parser.add_argument("--seed", type=int, default=1, help="Startwert für die Zufallsdaten")
+    parser.add_argument("--arbeitsordner", help="Ordner für Testdaten und Ausgabe (Standard: temporär)")
+    parser.add_argument("--ergebnis", default="benchmark.json", help="JSON-Datei für die Ergebnisse")
+    return parser
+
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    from .rendering import default_worker_count
+
+    workers = default_worker_count() if args.prozesse == 0 else max(1, args.prozesse)
+    sibling_weights = _parse_numbers(args.geschwister)
+    fees = _parse_numbers(args.gebuehren)
+    template_path = os.path.abspath(args.vorlage)
+    if not os.path.exists(template_path):
+        sys.stderr.write(f"Vorlage nicht gefunden: {template_path}\n")
+        return 3
+
+    work_dir = args.arbeitsordner or tempfile.mkdtemp(prefix="quittungen_benchmark_")
+    os.makedirs(work_dir, exist_ok=True)
+    runs = []
+    try:
+        for children in args.kinder:
+            sys.stderr.write(f"Lauf mit {children} Kindern...\n")
+            run = run_benchmark(children, template_path, work_dir, sibling_weights, args.klassen, fees,
+                                skewed=args.klassen_verteilung == "schief", waitlist_share=args.warteliste,
+                                workers=workers, with_pdf=args.pdf, backend=args.backend, seed=args.seed)
+            runs.append(run)
+            for name, stage in run["stages"].items():
+                sys.stderr.write(f"  {name:<18} {stage['seconds']:>9.3f}s  {stage['items']:>7}  "
+                                 f"{stage['throughput_per_s'] or '-':>10}/s  {stage['peak_rss_mb'] or '-':>8} MB\n")
+            sys.stderr.write(f"  {'gesamt':<18} {run['wall_seconds']:>9.3f}s  "
+                             f"{run['receipts_per_s'] or '-':>10} Quittungen/s  {run['peak_rss_mb'] or '-'} MB\n")
+    finally:
+        if not args.arbeitsordner:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "siblings": sibling_weights,
+            "classes": args.klassen,
+            "class_distribution": args.klassen_verteilung,
+            "waitlist_share": args.warteliste,
+            "fees": fees,
+            "workers": workers,
+            "pdf": args.pdf,
+            "backend": args.backend,
+            "seed": args.seed,
+        },
+        "peak_rss_process_mb": _mb(_peak_rss_total()),
+        "runs": runs,
+    }
+    with open(args.ergebnis, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    sys.stderr.write(f"Ergebnisse gespeichert: {args.ergebnis}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+Kommandozeile für den Quittungs-Generator (ohne Tk).
+
+Beispiele:
+    python -m quittungen word --schuelerliste schuelerliste.xlsx --preise preise.xlsx \
+        --vorlage Quittung-Template.docx --ausgabe out
+    python -m quittungen pdf --ausgabe out
+    python -m quittungen alles --ausgabe out --backend native
+    python -m quittungen stapel auftraege.json --parallel 4
+    python -m quittungen vorlage --vorlage Quittung-Template.docx
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import threading
+
+EXIT_OK = 0
+EXIT_WARNINGS = 1
+EXIT_CANCELLED = 2
+EXIT_FAILED = 3
+
+# Auswahl auf der Kommandozeile -> Modus in quittungen.runreport
+PROFILE_CHOICES = {"cpu": "cpu", "speicher": "memory"}
+# Auswahl auf der Kommandozeile -> Modus in quittungen.duplicates
+DUPLICATE_CHOICES = {"melden": "report", "zusammenfuehren": "merge", "aus": "off"}
+# Wie quittungen.pdf.cache.DEFAULT_MAX_BYTES (hier ohne Import, damit --help schnell bleibt)
+DEFAULT_PDF_CACHE_MB = 512
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(prog="python -m quittungen",
+                                     description="Quittungs-Generator für Schulgebühren (ohne GUI)")
+    parser.add_argument("--json", action="store_true", help="Abschlussbericht als JSON ausgeben")
+    parser.add_argument("--quiet", "-q", action="store_true", help="Keine Fortschrittsanzeige")
+    parser.add_argument("--profil", choices=sorted(PROFILE_CHOICES),
+                        help="Lauf zusätzlich aufzeichnen: Rechenzeit je Funktion (cpu) oder Speicher je Zeile "
+                             "(speicher); Ergebnis im Laufbericht im Ausgabeordner")
+    parser.add_argument("--kein-laufbericht", action="store_true",
+                        help="Keinen Laufbericht (JSON/CSV) in den Ausgabeordner schreiben")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    word = commands.add_parser("word", help="Schritt 1: Word-Quittungen erzeugen")
+    _add_word_arguments(word)
+    word.add_argument("--ausgabe", default="out", help="Ausgabeordner")
+    word.add_argument("--prozesse", type=int, default=1,
+                      help="Anzahl Worker-Prozesse zum Rendern (0 = automatisch)")
+    word.add_argument("--inkrementell", action="store_true",
+                      help="Nur Quittungen mit geänderten Werten neu erstellen; setzt einen abgebrochenen Lauf fort")
+
+    pdf = commands.add_parser("pdf", help="Schritt 2: Sammel-PDFs je Klasse erzeugen")
+    pdf.add_argument("--ausgabe", default="out", help="Ausgabeordner aus Schritt 1")
+    _add_pdf_arguments(pdf)
+    pdf.add_argument("--prozesse", type=int, default=1,
+                     help="Anzahl Worker-Prozesse (nur integrierter Renderer, 0 = automatisch)")
+    pdf.add_argument("--inkrementell", action="store_true",
+                     help="Nur Klassen mit geänderten Quittungen neu zusammenfassen; setzt einen abgebrochenen Lauf fort")
+
+    both = commands.add_parser("alles", help="Schritt 1 und 2 überlappend: PDFs entstehen, während weitere "
+                                             "Klassen noch gerendert werden")
+    _add_word_arguments(both)
+    both.add_argument("--ausgabe", default="out", help="Ausgabeordner")
+    _add_pdf_arguments(both)
+    both.add_argument("--prozesse", type=int, default=1,
+                      help="Anzahl Worker-Prozesse zum Rendern (0 = automatisch)")
+    both.add_argument("--inkrementell", action="store_true",
+                      help="Nur geänderte Quittungen und Klassen neu erstellen; setzt einen abgebrochenen Lauf fort")
+
+    check = commands.add_parser("doppelte", help="Nur die Schülerliste auf doppelte Familien prüfen, "
+                                                 "ohne Quittungen zu erstellen")
+    check.add_argument("--schuelerliste", default="schuelerliste.xlsx",
+                       help="Schülerliste (.xlsx, .xls, .csv oder .parquet)")
+
+    template = commands.add_parser("vorlage", help="Nur die Word-Vorlage prüfen: alle Platzhalter mit Fundstelle, "
+                                                   "unbekannte und fehlende Platzhalter")
+    template.add_argument("--vorlage", default="Quittung-Template.docx", help="Word-Vorlage")
+    template.add_argument("--ausgabeform", choices=["familie", "klasse", "beides"], default="familie",
+                          help="Geplante Ausgabeform (bei 'klasse' müssen alle Platzhalter im Haupttext stehen)")
+
+    batch = commands.add_parser("stapel", help="Mehrere Aufträge (Schulen, Schuljahre) aus einer Auftragsdatei "
+                                               "ausführen, siehe quittungen.batch")
+    batch.add_argument("auftraege", help="Auftragsdatei (.json, mit PyYAML auch .yaml)")
+    batch.add_argument("--parallel", type=int, default=0,
+                       help="Anzahl gleichzeitig laufender Aufträge (0 = automatisch)")
+    batch.add_argument("--bericht", help="Pfad des Gesamtberichts (Standard: <Auftragsdatei>_Bericht.json)")
+    return parser
+
+
+def _add_word_arguments(command):
+    command.add_argument("--schuelerliste", default="schuelerliste.xlsx", help="Schülerliste (.xlsx, .xls, .csv oder .parquet)")
+    command.add_argument("--preise", default="preise.xlsx", help="Excel-Datei mit den Preisen")
+    command.add_argument("--vorlage", default="Quittung-Template.docx", help="Word-Vorlage")
+    command.add_argument("--ausgabeform", choices=["familie", "klasse", "beides"], default="familie",
+                         help="Eine Word-Datei pro Familie, eine pro Klasse (schneller in Schritt 2) oder beides")
+    command.add_argument("--doppelte", choices=list(DUPLICATE_CHOICES), default="melden",
+                         help="Doppelte Familien (z.B. E-Mail in anderer Schreibweise) als Warnung melden, "
+                              "Fälle mit gleicher E-Mail zusammenführen oder nicht prüfen")
+
+
+def _add_pdf_arguments(command):
+    command.add_argument("--backend", choices=["word", "native"],
+                         help="PDF-Erzeugung über Microsoft Word oder den integrierten Renderer "
+                              "(Standard: Word unter Windows, sonst integriert)")
+    command.add_argument("--einzel-pdfs", action="store_true",
+                         help="Zusätzlich eine PDF pro Quittung im Klassenordner behalten")
+    command.add_argument("--pdf-cache", metavar="ORDNER",
+                         help="Ordner des PDF-Caches für unveränderte Quittungen (Standard: Cache-Ordner des Benutzers)")
+    command.add_argument("--pdf-cache-groesse", type=int, metavar="MB",
+                         help=f"Höchstgröße des PDF-Caches in MB (Standard: {DEFAULT_PDF_CACHE_MB})")
+    command.add_argument("--kein-pdf-cache", action="store_true",
+                         help="Alle Quittungen neu umwandeln, ohne PDF-Cache")
+
+
+def _pdf_cache(args):
+    if args.kein_pdf_cache:
+        return False
+    from .pdf.cache import PdfCache
+
+    return PdfCache(args.pdf_cache, (args.pdf_cache_groesse or DEFAULT_PDF_CACHE_MB) * 1024 * 1024)
+
+
+def _print_progress(event):
+    sys.stderr.write(f"\r[{event.current}/{event.total}] {event.message}\x1b[K")
+    if event.total and event.current >= event.total:
+        sys.stderr.write("\n")
+    sys.stderr.flush()
+
+
+def _run_cancellable(target, **kwargs):
+    # Die Arbeit läuft in einem eigenen Thread, damit Strg+C sauber abbrechen kann
+    cancel = threading.Event()
+    finished = threading.Event()
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["report"] = target(cancel=cancel, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+        finally:
+            finished.set()
+
+    # Auf ein Event statt mit join() warten: ein Strg+C mitten in join() kann den
+    # Thread fälschlich als beendet markieren.
+    threading.Thread(target=worker, daemon=True).start()
+    try:
+        while not finished.wait(0.2):
+            pass
+    except KeyboardInterrupt:
+        sys.stderr.write("\nAbbruch wird eingeleitet... Bitte warten.\n")
+        cancel.set()
+        finished.wait()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["report"]
+
+
+def _print_batch_progress(name, event):
+    sys.stderr.write(f"\r[{name}] [{event.current}/{event.total}] {event.message}\x1b[K")
+    sys.stderr.flush()
+
+
+def _main_batch(args):
+    from .batch import STATUS_CANCELLED, STATUS_FAILED, STATUS_OK, run_batch_file
+    from .rendering import default_worker_count
+
+    parallel = args.parallel if args.parallel > 0 else default_worker_count()
+    try:
+        results, report_file = _run_cancellable(run_batch_file, batch_file=args.auftraege, parallel=parallel,
+                                                progress=None if args.quiet else _print_batch_progress,
+                                                profile=PROFILE_CHOICES.get(args.profil),
+                                                run_report=not args.kein_laufbericht, report_file=args.bericht)
+    except Exception as e:
+        sys.stderr.write(f"Ein Fehler hat die Verarbeitung gestoppt: {e}\n")
+        return EXIT_FAILED
+    if not args.quiet:
+        sys.stderr.write("\n")
+
+    if args.json:
+        with open(report_file, "r", encoding="utf-8") as f:
+            print(f.read())
+    else:
+        for result in results:
+            details = result.error or (f"{result.report.receipts} Quittungen, {result.report.pdf_files} Sammel-PDFs, "
+                                       f"{len(result.report.errors)} Warnungen" if result.report else "nicht gestartet")
+            print(f"{result.job.name}: {result.status} ({details})")
+        print(f"Gesamtbericht: {report_file}")
+
+    statuses = {result.status for result in results}
+    if STATUS_CANCELLED in statuses:
+        return EXIT_CANCELLED
+    if STATUS_FAILED in statuses:
+        return EXIT_FAILED
+    return EXIT_OK if statuses == {STATUS_OK} else EXIT_WARNINGS
+
+
+def _main_check_duplicates(args):
+    from .duplicates import describe, find_duplicates
+    from .roster import read_roster
+
+    try:
+        groups = find_duplicates(list(read_roster(args.schuelerliste)))
+    except Exception as e:
+        sys.stderr.write(f"Ein Fehler hat die Verarbeitung gestoppt: {e}\n")
+        return EXIT_FAILED
+
+    if args.json:
+        print(json.dumps([group._asdict() for group in groups], ensure_ascii=False, indent=2))
+    else:
+        for group in groups:
+            print(f"{describe(group)}{' (eindeutig, wird mit --doppelte zusammenfuehren zusammengeführt)' if group.merge else ''}\n")
+        print(f"{len(groups)} mögliche doppelte Familien gefunden.")
+    return EXIT_WARNINGS if groups else EXIT_OK
+
+
+def _main_check_template(args):
+    from .templatecheck import check_template
+
+    try:
+        check = check_template(args.vorlage)
+    except Exception as e:
+        sys.stderr.write(f"Ein Fehler hat die Verarbeitung gestoppt: {e}\n")
+        return EXIT_FAILED
+    problems = check.problems(class_documents=args.ausgabeform in ("klasse", "beides"))
+    warnings = check.warnings()
+
+    if args.json:
+        print(json.dumps({"placeholders": [use._asdict() for use in check.uses],
+                          "malformed": [entry._asdict() for entry in check.malformed],
+                          "unused": check.unused, "problems": problems, "warnings": warnings},
+                         ensure_ascii=False, indent=2))
+    else:
+        print(check.describe() or "Keine Platzhalter gefunden.")
+        if check.unused:
+            print(f"\nNicht verwendet: {', '.join(check.unused)}")
+        for text in problems:
+            print(f"\nFEHLER: {text}")
+        for text in warnings:
+            print(f"\nWARNUNG: {text}")
+    if problems:
+        return EXIT_FAILED
+    return EXIT_WARNINGS if warnings else EXIT_OK
+
+
+def main(argv=None):
+    args = _build_parser().parse_args(argv)
+    if args.command == "stapel":
+        return _main_batch(args)
+    if args.command == "doppelte":
+        return _main_check_duplicates(args)
+    if args.command == "vorlage":
+        return _main_check_template(args)
+    progress = None if args.quiet else _print_progress
+
+    from . import pipeline
+    from .rendering import default_worker_count
+
+    workers = args.prozesse if args.prozesse > 0 else default_worker_count()
+    options = {"output_dir": args.ausgabe, "workers": workers, "incremental": args.inkrementell,
+               "progress": progress, "profile": PROFILE_CHOICES.get(args.profil),
+               "run_report": not args.kein_laufbericht}
+    if args.command in ("word", "alles"):
+        options.update(excel_path=args.schuelerliste, prices_path=args.preise, template_path=args.vorlage,
+                       class_documents=args.ausgabeform in ("klasse", "beides"),
+                       family_files=args.ausgabeform in ("familie", "beides"),
+                       duplicates=DUPLICATE_CHOICES[args.doppelte])
+    if args.command in ("pdf", "alles"):
+        from .pdf import default_backend_name, get_backend
+
+        backend = get_backend(args.backend or default_backend_name())
+        if not backend.is_available():
+            sys.stderr.write(f"Bitte installiere die PDF-Erweiterungen: {backend.missing_packages_hint}\n")
+            return EXIT_FAILED
+        options.update(backend=backend.name, single_pdfs=args.einzel_pdfs, pdf_cache=_pdf_cache(args))
+
+    targets = {"word": pipeline.generate_receipts, "pdf": pipeline.generate_pdfs, "alles": pipeline.generate_all}
+    try:
+        report = _run_cancellable(targets[args.command], **options)
+    except Exception as e:
+        sys.stderr.write(f"Ein Fehler hat die Verarbeitung gestoppt: {e}\n")
+        return EXIT_FAILED
+
+    if args.json:
+        print(json.dumps(dataclasses.asdict(report), ensure_ascii=False, indent=2))
+    else:
+        if args.command in ("word", "alles"):
+            print(f"{report.receipts} Quittungen (Familien) in {report.classes} Klassen erstellt.")
+            if report.class_documents:
+                print(f"{report.class_documents} Word-Dateien pro Klasse geschrieben.")
+            if args.inkrementell:
+                print(f"Davon {report.unchanged} unverändert, {report.removed} entfernt; "
+                      f"veraltete Sammel-PDFs: {', '.join(report.stale_classes) or '-'}")
+            if report.duplicates:
+                merged = sum(1 for group in report.duplicates if group["merged"])
+                print(f"{len(report.duplicates)} mögliche doppelte Familien, davon {merged} zusammengeführt "
+                      f"(siehe Warnungen).")
+            if report.summary_file:
+                print(f"Übersichtstabelle: {report.summary_file}")
+            if args.command == "alles":
+                print(f"{report.pdf_files} Sammel-PDFs erstellt.")
+        else:
+            print(f"{report.docx_files} Word-Dateien verarbeitet, {report.pdf_files} Sammel-PDFs erstellt.")
+        if report.pdf_cached:
+            print(f"{report.pdf_cached} Word-Dateien aus dem PDF-Cache übernommen.")
+        if report.run_report:
+            print(f"Laufbericht: {report.run_report}")
+        for error in report.errors:
+            print(f"\nWARNUNG: {error}", file=sys.stderr)
+
+    if report.cancelled:
+        if not args.json:
+            print("Abgebrochen. Mit --inkrementell wird der Lauf fortgesetzt.", file=sys.stderr)
+        return EXIT_CANCELLED
+    return EXIT_WARNINGS if report.errors else EXIT_OK
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Doppelte Familien vor dem Rendern finden.
+
+Familien werden über die E-Mail in 'Eltern 1 - Emailadresse' gebildet. Steht
+dieselbe Familie mit abweichender Schreibweise oder mit der E-Mail des
+anderen Elternteils in der Liste, entstehen zwei Quittungen mit falschem
+Geschwisterrabatt.
+
+Für jede Familie (E-Mail-Gruppe) werden normalisierte Schlüssel gebildet und
+in Blöcke (Dict Schlüssel -> Familien) einsortiert; Familien im selben Block
+werden per Union-Find zu Gruppen verbunden. Es wird also nie jede Familie mit
+jeder verglichen, der Aufwand wächst linear mit der Schülerliste.
+
+Gründe (REASONS), nur der erste wird auf Wunsch zusammengeführt:
+
+- email:   E-Mail unterscheidet sich nur in Groß-/Kleinschreibung, Leerzeichen
+           oder Satzzeichen am Ende
+- parent:  gleicher Elternname (Reihenfolge, Akzente und Satzzeichen egal) und
+           ein gemeinsamer Nachname bei den Kindern (nur melden - bei häufigen
+           bulgarischen Namen trifft das auch verschiedene Familien)
+- child:   dasselbe Kind steht unter mehreren E-Mails (nur melden - beim
+           Zusammenführen stünde es doppelt auf der Quittung)
+- surname: genau zwei Familien mit gleichem Nachnamen bei Eltern und Kindern
+           (z.B. Mutter und Vater mit je eigener E-Mail; nur melden)
+
+Die Schülerliste hat keine Adress- oder Telefonspalte; automatisch
+zusammengeführt wird deshalb nur über die E-Mail. Steht dabei dasselbe Kind
+(gleicher Name in derselben Klasse) unter mehreren der E-Mails, zählt es nur
+einmal; die doppelten Einträge stehen in DuplicateGroup.children.
+"""
+
+import re
+import unicodedata
+from collections import namedtuple
+
+from .families import WAITLIST_VALUES
+
+MODE_REPORT = "report"
+MODE_MERGE = "merge"
+MODE_OFF = "off"
+MODES = (MODE_REPORT, MODE_MERGE, MODE_OFF)
+
+REASON_EMAIL = "email"
+REASON_PARENT = "parent"
+REASON_CHILD = "child"
+REASON_SURNAME = "surname"
+REASONS = {
+    REASON_EMAIL: "E-Mail unterscheidet sich nur in der Schreibweise",
+    REASON_PARENT: "gleicher Elternname und gemeinsamer Nachname der Kinder",
+    REASON_CHILD: "dasselbe Kind unter mehreren E-Mails",
+    REASON_SURNAME: "gleicher Nachname bei Eltern und Kindern",
+}
+MERGEABLE_REASONS = (REASON_EMAIL,)
+
+# Größere Blöcke sind keine Dubletten mehr, sondern häufige Namen (bzw. Platzhalter wie "Kind")
+_MAX_BLOCK = {REASON_EMAIL: None, REASON_PARENT: 4, REASON_CHILD: 4, REASON_SURNAME: 2}
+
+_WORD_RE = re.compile(r"[^\W\d_]+")
+# Bulgarische/slawische weibliche Nachnamen: Petrova -> petrov, Ivanova -> ivanov
+_FEMININE_ENDINGS = ("ova", "eva", "ina", "ska", "cka")
+
+# emails: die Original-E-Mails in Reihenfolge der Schülerliste; reasons: Schlüssel aus REASONS;
+# merge: über MERGEABLE_REASONS verbunden (sonst nur melden, kann zusammenführbare Gruppen enthalten);
+# children: Kinder, die beim Zusammenführen doppelt wären und weggelassen werden (nur bei merge)
+DuplicateGroup = namedtuple("DuplicateGroup", ["emails", "reasons", "merge", "children"], defaults=((),))
+
+
+def normalize_email(email):
+    text = unicodedata.normalize("NFKC", str(email)).casefold().strip()
+    if text.startswith("mailto:"):
+        text = text[len("mailto:"):]
+    return "".join(text.split()).strip("<>\"'").rstrip(".,;")
+
+
+def name_tokens(name):
+    """Kleingeschriebene Wörter ohne Akzente und Satzzeichen: 'Jörg-Peter Müller' -> ['jorg', 'peter', 'muller']."""
+    text = unicodedata.normalize("NFKD", str(name)).casefold()
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _WORD_RE.findall(text)
+
+
+def surname_stem(tokens):
+    if not tokens:
+        return ""
+    surname = tokens[-1]
+    if len(surname) > 4 and surname.endswith(_FEMININE_ENDINGS):
+        return surname[:-1]
+    return surname
+
+
+def _child_key(row):
+    # Dasselbe Kind: gleicher Name (Akzente und Satzzeichen egal) in derselben Klasse
+    return " ".join(name_tokens(row.child_name)), str(row.klasse).strip().casefold()
+
+
+def _doubled_rows(emails, members):
+    """Zeilen, deren Kind schon unter einer früheren E-Mail der Gruppe steht (in Reihenfolge der E-Mails)."""
+    seen = set()
+    doubled = []
+    for email in emails:
+        keys = set()
+        for row in members.get(email, ()):
+            if not isinstance(row.child_name, str):
+                continue
+            key = _child_key(row)
+            if key in seen:
+                doubled.append(row)
+            else:
+                keys.add(key)
+        # Doppelte Zeilen unter derselben E-Mail werden nicht angetastet, nur die der zusammengeführten
+        seen |= keys
+    return doubled
+
+
+class _UnionFind:
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # Die früher in der Liste stehende Familie bleibt Wurzel (und damit maßgebliche E-Mail)
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def find_duplicates(rows):
+    """
+    Gibt die Liste der DuplicateGroups für RosterRow-Zeilen zurück (siehe
+    quittungen.roster). Familien mit Wartelisten-Kindern werden nicht
+    berücksichtigt, da für sie ohnehin keine Quittung entsteht.
+    """
+    members = {}
+    for row in rows:
+        members.setdefault(row.email, []).append(row)
+    emails = [email for email, group in members.items()
+              if not any(row.klasse in WAITLIST_VALUES for row in group)]
+
+    blocks = {reason: {} for reason in REASONS}
+    for index, email in enumerate(emails):
+        group = members[email]
+        parent_tokens = name_tokens(group[0].parent_name or "")
+        parent_surname = surname_stem(parent_tokens)
+        children = [name_tokens(row.child_name) for row in group if isinstance(row.child_name, str)]
+        child_surnames = {surname_stem(tokens) for tokens in children if len(tokens) > 1}
+
+        keys = {REASON_EMAIL: [normalize_email(email)],
+                REASON_CHILD: {" ".join(tokens) for tokens in children if len(tokens) > 1}}
+        if parent_tokens:
+            keys[REASON_PARENT] = [(" ".join(sorted(parent_tokens)), surname) for surname in child_surnames]
+        if parent_surname in child_surnames:
+            keys[REASON_SURNAME] = [parent_surname]
+        for reason, reason_keys in keys.items():
+            for key in reason_keys:
+                if key:
+                    blocks[reason].setdefault(key, []).append(index)
+
+    def linked_blocks(reason):
+        limit = _MAX_BLOCK[reason]
+        for indexes in blocks[reason].values():
+            indexes = sorted(set(indexes))
+            if len(indexes) >= 2 and (limit is None or len(indexes) <= limit):
+                yield indexes
+
+    def components(union_find, links):
+        reasons = {}
+        for reason, indexes in links:
+            for other in indexes[1:]:
+                union_find.union(indexes[0], other)
+        for reason, indexes in links:
+            reasons.setdefault(union_find.find(indexes[0]), set()).add(reason)
+        members_of = {}
+        for index in range(len(emails)):
+            members_of.setdefault(union_find.find(index), []).append(index)
+        return members_of, reasons
+
+    # Erst die zusammenführbaren Gruppen, dann darüber hinaus nur zu meldende Verbindungen
+    merge_links = [(reason, indexes) for reason in MERGEABLE_REASONS for indexes in linked_blocks(reason)]
+    merged = _UnionFind(len(emails))
+    merged_members, merged_reasons = components(merged, merge_links)
+
+    reported = _UnionFind(len(emails))
+    report_links = [(reason, indexes) for reason in REASONS if reason not in MERGEABLE_REASONS
+                    for indexes in linked_blocks(reason)]
+    report_links += [(None, indexes) for indexes in merged_members.values() if len(indexes) > 1]
+    reported_members, reported_reasons = components(reported, report_links)
+
+    def ordered(reasons):
+        return sorted(reasons - {None}, key=list(REASONS).index)
+
+    groups = []
+    for root, indexes in merged_members.items():
+        if len(indexes) > 1:
+            group_emails = [emails[index] for index in indexes]
+            children = [row.child_name for row in _doubled_rows(group_emails, members)]
+            groups.append(DuplicateGroup(group_emails, ordered(merged_reasons[root]), True, children))
+    for root, indexes in reported_members.items():
+        if len({merged.find(index) for index in indexes}) > 1:
+            groups.append(DuplicateGroup([emails[index] for index in indexes], ordered(reported_reasons[root]), False))
+    return groups
+
+
+def merge_duplicates(rows, groups):
+    """
+    Ordnet die Zeilen zusammenführbarer Gruppen (merge=True) der E-Mail zu,
+    die zuerst in der Schülerliste steht. Ein Kind, das schon unter einer
+    früheren E-Mail der Gruppe steht, wird weggelassen (siehe DuplicateGroup.children),
+    sonst zählte es für den Geschwisterrabatt doppelt.
+    """
+    canonical = {}
+    merge_groups = [group for group in groups if group.merge]
+    for group in merge_groups:
+        for email in group.emails[1:]:
+            canonical[email] = group.emails[0]
+    if not canonical:
+        return list(rows)
+
+    members = {}
+    for row in rows:
+        members.setdefault(row.email, []).append(row)
+    dropped = {id(row) for group in merge_groups for row in _doubled_rows(group.emails, members)}
+    return [row._replace(email=canonical[row.email]) if row.email in canonical else row
+            for row in rows if id(row) not in dropped]
+
+
+def describe(group, merged=False):
+    reasons = ", ".join(REASONS[reason] for reason in group.reasons)
+    if merged:
+        text = (f"Familien zusammengeführt unter '{group.emails[0]}': {', '.join(group.emails)}\n"
+                f"Grund: {reasons}")
+        if group.children:
+            text += f"\nDoppelt eingetragen, nur einmal berechnet: {', '.join(group.children)}"
+        return text
+    text = f"Möglicherweise doppelte Familie: {', '.join(group.emails)}\nGrund: {reasons}"
+    if group.children:
+        text += f"\nDoppelt eingetragen: {', '.join(group.children)}"
+    return text
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Familien aus den Zeilen der Schülerliste in einem Durchgang zusammenfassen.
+
+Gültigkeit, Warteliste, Kinderzahl, Namen, Klasse und Beträge werden für alle
+Familien vorab berechnet. Die Quittungs-Schleife bekommt danach nur noch eine
+Liste einfacher Datensätze.
+"""
+
+from collections import namedtuple
+
+from .formatting import euro_words, fee_totals, format_euro
+
+WAITLIST_VALUES = ('Warteliste', ' ')
+
+Family = namedtuple("Family", [
+    "email", "parent_name", "children_names", "num_children", "klasse",
+    "school_fee", "total_amount", "school_fee_text", "total_amount_text",
+    "school_fee_words", "total_amount_words",
+])
+
+
+def join_children(names):
+    kinder_liste = [str(name) for name in names]
+    if len(kinder_liste) > 2:
+        return ", ".join(kinder_liste[:-1]) + " und " + kinder_liste[-1]
+    return " und ".join(kinder_liste)
+
+
+def _text(value):
+    # Leere Zellen erschienen früher als "nan" (pandas) - Ordner und Hashes bleiben so gleich
+    return "nan" if value is None else str(value)
+
+
+def _class_sort_key(row):
+    # Nach dem Klassen-Text sortieren wie früher mit pandas: leere Klassen als "nan" zwischen den anderen,
+    # sonst ändern sich die Quittungsnummern; sorted() ist stabil (Dateireihenfolge)
+    return _text(row.klasse)
+
+
+def aggregate_families(rows, child_fees, membership_fee):
+    """
+    Gibt (families, errors) für RosterRow-Zeilen zurück (siehe quittungen.roster).
+    Familien sind nach Klasse sortiert, in der Reihenfolge ihres ersten Auftretens.
+    """
+    groups = {}
+    for row in sorted(rows, key=_class_sort_key):
+        groups.setdefault(row.email, []).append(row)
+
+    totals = fee_totals(child_fees, max((len(members) for members in groups.values()), default=0))
+    families = []
+    errors = []
+    for email, members in groups.items():
+        parent_name = _text(members[0].parent_name).strip()
+
+        invalid = next((row for row in members if not isinstance(row.child_name, str)), None)
+        if invalid is not None:
+            errors.append(f"Mitglied: '{parent_name}' ({email})\nGrund: Ungültiger Datentyp in Spalte 'Name Kind' (Zeile {invalid.row}).")
+            continue
+        if any(row.klasse in WAITLIST_VALUES for row in members):
+            continue
+
+        # Beträge und ihre Texte kommen aus dem Cache von quittungen.formatting (prepare_amounts)
+        school_fee = totals[len(members)]
+        total_amount = school_fee + membership_fee
+        families.append(Family(
+            email, parent_name, join_children(row.child_name for row in members), len(members),
+            _text(members[0].klasse), school_fee, total_amount,
+            format_euro(school_fee), format_euro(total_amount),
+            euro_words(school_fee), euro_words(total_amount),
+        ))
+    return families, errors
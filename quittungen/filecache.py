@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Prozessweiter Cache für Objekte, die aus einer Datei geladen werden (kompilierte
+Vorlage, Preisliste).
+
+Laufen mehrere Aufträge im selben Prozess (Stapelbetrieb, siehe
+quittungen.batch), wird eine Datei, die mehrere Aufträge verwenden, nur einmal
+geladen. Schlüssel sind Pfad, Größe und Änderungszeit - eine geänderte Datei
+wird also neu geladen. Die Objekte werden geteilt und dürfen nicht verändert
+werden.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+class FileCache:
+
+    def __init__(self, loader, maxsize=8):
+        self._loader = loader
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Schlüssel -> Lock, damit parallele Aufträge dieselbe Datei nicht doppelt laden
+        self._loading = {}
+
+    @staticmethod
+    def _key(path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def get(self, path):
+        key = self._key(path)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    return self._entries[key]
+            try:
+                value = self._loader(path)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            with self._lock:
+                self._entries[key] = value
+                while len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Euro-Beträge als Text ("1.234,50 EUR") und in Worten ("... Euro und fünfzig Cent").
+
+Es gibt pro Lauf nur wenige verschiedene Beträge (eine Gebühr je Kinderzahl
+plus Mitgliedsbeitrag). prepare_amounts() berechnet sie einmal vorab, alle
+weiteren Aufrufe kommen aus dem Cache. num2words wird nur für neue Beträge
+aufgerufen.
+"""
+
+import functools
+from decimal import ROUND_HALF_UP, Decimal
+
+CACHE_SIZE = 1024
+
+
+def to_cents(amount):
+    """Betrag auf ganze Cent runden (kaufmännisch, nicht abschneiden)."""
+    cents = (Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+    return int(cents)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _format_cents(cents):
+    return f"{cents / 100:,.2f} EUR".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _number_words(number):
+    from num2words import num2words
+
+    # "ein Euro" / "einhundertein Euro" statt "eins" bzw. "einhunderteins"
+    words = num2words(number, lang='de')
+    return words[:-1] if words.endswith("eins") else words
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _words_cents(cents):
+    euros, rest = divmod(cents, 100)
+    if euros and rest:
+        return f"{_number_words(euros)} Euro und {_number_words(rest)} Cent"
+    if rest:
+        return f"{_number_words(rest)} Cent"
+    return f"{_number_words(euros)} Euro"
+
+
+def format_euro(amount):
+    return _format_cents(to_cents(amount))
+
+
+def euro_words(amount):
+    return _words_cents(to_cents(amount))
+
+
+def fee_totals(child_fees, max_children=None):
+    """totals[n] = Schulgebühr einer Familie mit n Kindern (totals[0] = 0)."""
+    if max_children is None:
+        max_children = max(child_fees, default=0)
+    totals = [0]
+    for i in range(1, max_children + 1):
+        totals.append(totals[-1] + child_fees.get(i, 0))
+    return totals
+
+
+def prepare_amounts(child_fees, membership_fee):
+    """Alle Beträge, die bei dieser Preisliste vorkommen können, vorab formatieren."""
+    for school_fee in fee_totals(child_fees):
+        for amount in (school_fee, school_fee + membership_fee):
+            format_euro(amount)
+            euro_words(amount)
+    format_euro(membership_fee)
+    euro_words(membership_fee)
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Manifest im Ausgabeordner für die inkrementelle Neuerstellung.
+
+Pro Familie (Schlüssel: Eltern 1 - Emailadresse) werden die Quittungsnummer,
+die Datei, die Klasse, das Ausstellungsdatum und ein Hash der eingesetzten
+Werte gespeichert. Ein erneuter Lauf erstellt damit nur Quittungen neu, deren
+Werte oder Vorlage sich geändert haben, und merkt sich, welche Sammel-PDFs
+veraltet sind.
+
+Während eines Laufs wird jede fertige Quittung und jede fertige Klasse sofort
+als Zeile an ein Journal angehängt. Bricht der Lauf ab oder stürzt er ab,
+übernimmt Manifest.load() das Journal, und ein inkrementeller Lauf setzt
+genau dort fort - mit den vorab vergebenen Quittungsnummern (`planned`).
+save() schreibt den vollständigen Stand und leert das Journal.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_NAME = ".quittungen_manifest.json"
+JOURNAL_NAME = ".quittungen_journal.jsonl"
+MANIFEST_VERSION = 1
+
+# Das Datum ändert sich bei jedem Lauf; eine unveränderte Quittung behält ihr ursprüngliches Datum
+# (issued_date), damit ihre Word-Datei byteweise gleich bleibt und der PDF-Cache trifft.
+_VOLATILE_PLACEHOLDERS = {"{{DATUM}}"}
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def values_hash(replacements):
+    stable = {k: v for k, v in replacements.items() if k not in _VOLATILE_PLACEHOLDERS}
+    payload = json.dumps(stable, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Manifest:
+
+    def __init__(self, output_dir, families=None, stale_classes=None, planned=None):
+        self.output_dir = output_dir
+        self.families = families or {}
+        self.stale_classes = set(stale_classes or ())
+        # Vorab vergebene Nummern eines noch nicht abgeschlossenen Laufs
+        self.planned = planned or {}
+        # Schritt 1 und 2 können gleichzeitig eintragen (generate_all)
+        self._lock = threading.RLock()
+        self._journaling = False
+        self._journal = None
+
+    @property
+    def path(self):
+        return os.path.join(self.output_dir, MANIFEST_NAME)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.output_dir, JOURNAL_NAME)
+
+    @classmethod
+    def load(cls, output_dir):
+        path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(output_dir)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(output_dir)
+        manifest = cls(output_dir, data.get("families"), data.get("stale_classes"), data.get("planned"))
+        manifest._replay_journal()
+        return manifest
+
+    def save(self):
+        with self._lock:
+            data = {
+                "version": MANIFEST_VERSION,
+                "families": self.families,
+                "stale_classes": sorted(self.stale_classes),
+                "planned": self.planned,
+            }
+            os.makedirs(self.output_dir, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+            # Alles Eingetragene steht jetzt im Manifest
+            self._close_journal()
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    # ------------------------------------------
+    # Journal
+    # ------------------------------------------
+    def start_journal(self):
+        """Ab jetzt wird jede Änderung sofort ins Journal geschrieben."""
+        self._journaling = True
+
+    def close(self):
+        with self._lock:
+            self._close_journal()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _log(self, record):
+        if not self._journaling:
+            return
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        # Eine Zeile pro Eintrag; flush() reicht, damit ein Programmabsturz nichts verliert
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Beim Absturz halb geschriebene letzte Zeile
+                break
+            operation = record["op"]
+            if operation == "family":
+                self.families[record["key"]] = record["entry"]
+                self.stale_classes.update(record["stale"])
+            elif operation == "removed":
+                self.families.pop(record["key"], None)
+                self.stale_classes.add(record["klasse"])
+            elif operation == "stale":
+                self.stale_classes.add(record["klasse"])
+            elif operation == "class_done":
+                self.stale_classes.discard(record["klasse"])
+
+    # ------------------------------------------
+    # Einträge
+    # ------------------------------------------
+    def next_number(self):
+        numbers = [entry["nr"] for entry in self.families.values()] + list(self.planned.values())
+        return max(numbers, default=0) + 1
+
+    def is_current(self, key, template_hash, hash_value, output_filename, require_file=True):
+        # Ohne Einzeldateien (nur eine Word-Datei pro Klasse) gibt es output_filename nicht
+        entry = self.families.get(key)
+        return (entry is not None
+                and entry["template"] == template_hash
+                and entry["hash"] == hash_value
+                and entry["file"] == os.path.relpath(output_filename, self.output_dir)
+                and (not require_file or self._file_complete(entry, output_filename)))
+
+    def issued_date(self, key, template_hash, hash_value):
+        """Datum der bisherigen Quittung, wenn sich Vorlage und Werte nicht geändert haben, sonst None."""
+        entry = self.families.get(key)
+        if entry is None or entry["template"] != template_hash or entry["hash"] != hash_value:
+            return None
+        return entry.get("datum")
+
+    @staticmethod
+    def _file_complete(entry, path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+        return entry.get("size") in (None, size)
+
+    def record(self, key, nr, template_hash, hash_value, output_filename, klasse, datum=None, size=None):
+        with self._lock:
+            previous = self.families.get(key)
+            relpath = os.path.relpath(output_filename, self.output_dir)
+            stale = {klasse}
+            if previous is not None and previous["file"] != relpath:
+                self._remove_files(previous)
+                stale.add(previous["klasse"])
+            entry = {"nr": nr, "template": template_hash, "hash": hash_value, "file": relpath, "klasse": klasse}
+            if datum is not None:
+                entry["datum"] = datum
+            if size is not None:
+                entry["size"] = size
+            self.families[key] = entry
+            self.stale_classes.update(stale)
+            self._log({"op": "family", "key": key, "entry": entry, "stale": sorted(stale)})
+
+    def mark_class_stale(self, klasse):
+        with self._lock:
+            self.stale_classes.add(klasse)
+            self._log({"op": "stale", "klasse": klasse})
+
+    def mark_class_done(self, klasse):
+        with self._lock:
+            self.stale_classes.discard(klasse)
+            self._log({"op": "class_done", "klasse": klasse})
+
+    def remove_missing(self, current_keys):
+        """Löscht Quittungen von Familien, die nicht mehr in der Schülerliste stehen."""
+        with self._lock:
+            removed = [key for key in self.families if key not in current_keys]
+            for key in removed:
+                entry = self.families.pop(key)
+                self._remove_files(entry)
+                self.stale_classes.add(entry["klasse"])
+                self._log({"op": "removed", "key": key, "klasse": entry["klasse"]})
+            return removed
+
+    def _remove_files(self, entry):
+        docx_path = os.path.join(self.output_dir, entry["file"])
+        # Auch die zugehörige Einzel-PDF aus Schritt 2, sonst landet sie weiter im Sammel-PDF
+        for path in (docx_path, os.path.splitext(docx_path)[0] + ".pdf"):
+            if os.path.exists(path):
+                os.remove(path)
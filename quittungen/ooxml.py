@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Schnelles Schreiben von .docx-Dateien aus einer vorbereiteten Vorlage.
+
+Eine .docx-Datei ist ein Zip-Archiv. Bei jeder Quittung ändern sich nur die
+Teile mit Platzhaltern (word/document.xml, ggf. Kopf-/Fußzeilen); Logo,
+Formatvorlagen, Design usw. sind byteweise gleich. PackageSkeleton hält diese
+Einträge deshalb bereits komprimiert im Speicher und kopiert sie unverändert
+in jede Ausgabedatei. Nur die geänderten Teile werden neu komprimiert.
+"""
+
+import io
+import os
+import struct
+import zipfile
+import zlib
+from collections import namedtuple
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_LOCAL_SIGNATURE = 0x04034B50
+_CENTRAL_SIGNATURE = 0x02014B50
+_END_SIGNATURE = 0x06054B50
+_VERSION = 20
+_UTF8_FLAG = 0x800
+_DATA_DESCRIPTOR_FLAG = 0x08
+# Feste Zeitstempel wie bei Word selbst: gleiche Werte ergeben eine byteweise gleiche
+# Datei, deren PDF der PDF-Cache (quittungen.pdf.cache) wiedererkennt
+_FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Ein Eintrag des Archivs; bei geänderten Teilen ist `compressed` None
+_Entry = namedtuple("_Entry", ["name", "flags", "compress_type", "dos_time", "dos_date",
+                               "crc", "compressed", "file_size", "external_attr"])
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time
+    return ((hour << 11) | (minute << 5) | (second // 2),
+            ((max(year, 1980) - 1980) << 9) | (month << 5) | day)
+
+
+def _deflate(data):
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class PackageSkeleton:
+    """
+    Archiv-Gerüst aus den Bytes einer gespeicherten Vorlage. `dynamic_names`
+    sind die Einträge, die bei jedem write() neu übergeben werden.
+    """
+
+    def __init__(self, package_bytes, dynamic_names):
+        self.dynamic_names = set(dynamic_names)
+        self._entries = []
+        with zipfile.ZipFile(io.BytesIO(package_bytes)) as archive:
+            for info in archive.infolist():
+                dos_time, dos_date = _dos_date_time(_FIXED_DATE_TIME)
+                flags = info.flag_bits & ~_DATA_DESCRIPTOR_FLAG
+                if info.filename in self.dynamic_names:
+                    self._entries.append(_Entry(info.filename, flags, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+                                                None, None, None, info.external_attr))
+                    continue
+                # Komprimierte Daten direkt hinter dem lokalen Header übernehmen
+                header = _LOCAL_HEADER.unpack_from(package_bytes, info.header_offset)
+                start = info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+                compressed = package_bytes[start:start + info.compress_size]
+                self._entries.append(_Entry(info.filename, flags, info.compress_type, dos_time, dos_date,
+                                            info.CRC, compressed, info.file_size, info.external_attr))
+        missing = self.dynamic_names - {entry.name for entry in self._entries}
+        if missing:
+            raise ValueError(f"Teile fehlen im Archiv: {', '.join(sorted(missing))}")
+
+    def build(self, blobs):
+        """Gibt das vollständige Archiv als Bytes zurück; `blobs` = {Eintragsname: unkomprimierte Bytes}."""
+        out = io.BytesIO()
+        central = []
+        for entry in self._entries:
+            if entry.compressed is None:
+                data = blobs[entry.name]
+                entry = entry._replace(crc=zlib.crc32(data), compressed=_deflate(data), file_size=len(data))
+            name = entry.name.encode("utf-8")
+            flags = entry.flags | (_UTF8_FLAG if not entry.name.isascii() else 0)
+            offset = out.tell()
+            out.write(_LOCAL_HEADER.pack(_LOCAL_SIGNATURE, _VERSION, flags, entry.compress_type,
+                                         entry.dos_time, entry.dos_date, entry.crc,
+                                         len(entry.compressed), entry.file_size, len(name), 0))
+            out.write(name)
+            out.write(entry.compressed)
+            central.append(_CENTRAL_HEADER.pack(_CENTRAL_SIGNATURE, _VERSION, _VERSION, flags, entry.compress_type,
+                                                entry.dos_time, entry.dos_date, entry.crc,
+                                                len(entry.compressed), entry.file_size, len(name), 0, 0, 0, 0,
+                                                entry.external_attr, offset) + name)
+
+        central_offset = out.tell()
+        for record in central:
+            out.write(record)
+        out.write(_END_RECORD.pack(_END_SIGNATURE, 0, 0, len(central), len(central),
+                                   out.tell() - central_offset, central_offset, 0))
+        return out.getvalue()
+
+    def write(self, output_filename, blobs):
+        # Unter temporärem Namen schreiben und erst dann umbenennen: nach einem
+        # Abbruch liegt nie eine halbe Datei unter dem endgültigen Namen.
+        data = self.build(blobs)
+        partial_filename = output_filename + ".part"
+        with open(partial_filename, "wb") as f:
+            f.write(data)
+        os.replace(partial_filename, output_filename)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+Austauschbare Backends für Schritt 2 (Word -> PDF).
+
+Ein Backend erstellt aus den Quittungen eines Klassenordners das Sammel-PDF:
+
+    backend.open()                      # einmal pro Thread/Prozess
+    backend.build_class(class_folder, docx_files, final_pdf_path, single_pdfs, stage_times, is_cancelled, cache)
+    backend.convert(class_folder, docx_files) -> Liste der Einzel-PDF-Dateinamen
+    backend.close()
+
+build_class() prüft is_cancelled() zwischen zwei Dateien und gibt nach einem
+Abbruch None zurück, ohne final_pdf_path zu schreiben.
+
+Einzel-PDFs pro Quittung entstehen nur mit single_pdfs=True (bzw. bei Word,
+das nicht anders kann; dort werden sie nach dem Zusammenfügen gelöscht).
+
+`parallel_safe` gibt an, ob mehrere Prozesse gleichzeitig umwandeln dürfen,
+`cache_version` geht in die Schlüssel des PDF-Caches ein (quittungen.pdf.cache);
+build_class() darf cache für Einzel-PDFs benutzen oder ignorieren.
+"""
+
+import sys
+
+from .native import NativeBackend
+from .word import WordComBackend
+
+BACKENDS = {
+    WordComBackend.name: WordComBackend,
+    NativeBackend.name: NativeBackend,
+}
+
+
+def get_backend(name):
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unbekanntes PDF-Backend '{name}' (verfügbar: {', '.join(BACKENDS)})") from None
+
+
+def default_backend_name():
+    # Word liefert unter Windows das originalgetreueste Ergebnis
+    if sys.platform.startswith("win") and WordComBackend.is_available():
+        return WordComBackend.name
+    return NativeBackend.name
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Inhaltsadressierter Cache für fertige PDFs.
+
+Die meisten Quittungen ändern sich zwischen zwei Nachdrucken nicht; ihre
+Word-Datei ist byteweise gleich (unverändert übernommen im inkrementellen
+Modus oder mit denselben Werten neu geschrieben - auch das Datum bleibt, siehe
+Manifest.issued_date). Der Cache legt jedes
+erzeugte PDF unter dem SHA-256 seiner Word-Datei(en) ab - zusammen mit Name
+und Version des Backends - und kopiert es beim nächsten Mal nur noch:
+
+- je Klasse (Schlüssel aus allen Word-Dateien der Klasse): ist keine Quittung
+  der Klasse geändert, wird das Sammel-PDF übernommen (nicht mit Einzel-PDFs);
+- je Quittung (nur Word): sonst werden nur die geänderten Dateien umgewandelt.
+  Der integrierte Renderer zeichnet eine Klasse in einem Dokument und hat
+  keine Einzel-PDFs, die sich übernehmen ließen.
+
+Der Ordner ist auf max_bytes begrenzt; prune() löscht die am längsten nicht
+benutzten Einträge (Treffer setzen die Änderungszeit neu). Einträge werden
+unter temporärem Namen geschrieben und dann umbenannt, mehrere Prozesse oder
+Aufträge können den Cache also gleichzeitig benutzen.
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import threading
+
+from ..manifest import file_hash
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_SUFFIX = ".pdf"
+
+
+def default_cache_dir():
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "quittungen", "pdf")
+
+
+class PdfCache:
+    """Nur Ordner und Größe - kann an Worker-Prozesse übergeben werden."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def digest(path):
+        return file_hash(path)
+
+    @staticmethod
+    def key(backend, *digests):
+        digest = hashlib.sha256(f"{backend.name}:{backend.cache_version}".encode("utf-8"))
+        for part in digests:
+            digest.update(b"\0" + part.encode("ascii"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + _SUFFIX)
+
+    def fetch(self, key, target_path):
+        """Kopiert das PDF zu key nach target_path; False, wenn es (nicht mehr) im Cache liegt."""
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, target_path)
+            os.utime(path)
+        except OSError:
+            # Nicht im Cache oder gerade von prune() eines anderen Laufs entfernt
+            return False
+        return True
+
+    def store(self, key, source_path):
+        path = self._path(key)
+        partial_path = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(source_path, partial_path)
+            os.replace(partial_path, path)
+        except OSError:
+            # Ein voller oder schreibgeschützter Cache darf die Umwandlung nicht stören
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def prune(self):
+        """Löscht die am längsten nicht benutzten Einträge, bis der Cache höchstens max_bytes groß ist."""
+        entries = []
+        total = 0
+        if not os.path.isdir(self.directory):
+            return 0
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if not entry.name.endswith(_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Sammel-PDF je Klasse: Quittungen eines Klassenordners umwandeln und
+zusammenfügen - nacheinander, (bei geeigneten Backends) in mehreren Prozessen
+oder als ClassPdfQueue parallel zu Schritt 1, sobald eine Klasse fertig ist.
+"""
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from ..runreport import stop_inherited_tracing
+from ..stages import SLOWEST_CLASSES, STAGE_PDF_BACKEND_OPEN, STAGE_PDF_CACHE, STAGE_PDF_MERGE, StageTimes
+from . import get_backend
+
+
+# Eine Word-Datei mit allen Quittungen der Klasse (Schritt 1 mit class_documents=True)
+CLASS_DOCX_PREFIX = "Alle_Quittungen_Klasse_"
+
+# Fertige Klassen, die höchstens auf ihre Umwandlung warten, bevor Schritt 1 gebremst wird
+DEFAULT_QUEUE_SIZE = 2
+
+_END_OF_CLASSES = object()
+
+
+class ConversionCancelled(Exception):
+    """Die Umwandlung einer Klasse wurde abgebrochen; es gibt (noch) kein Sammel-PDF."""
+
+
+def class_pdf_path(output_dir, klasse_name):
+    return os.path.join(output_dir, f"Sammel_PDF_Klasse_{klasse_name}.pdf")
+
+
+def class_docx_path(class_folder):
+    return os.path.join(class_folder, f"{CLASS_DOCX_PREFIX}{os.path.basename(class_folder)}.docx")
+
+
+def class_docx_files(class_folder):
+    """Die umzuwandelnden Word-Dateien: die Klassen-Datei, falls vorhanden, sonst alle Einzel-Quittungen."""
+    docx_files = sorted(f for f in os.listdir(class_folder) if f.endswith('.docx') and not f.startswith('~'))
+    class_files = [f for f in docx_files if f.startswith(CLASS_DOCX_PREFIX)]
+    return class_files or docx_files
+
+
+def build_class_pdf(backend, class_folder, output_dir, single_pdfs=False, stage_times=None, is_cancelled=None,
+                    cache=None):
+    """
+    Gibt den Pfad des Sammel-PDFs zurück (None, wenn der Ordner keine Word-Dateien
+    enthält). Das PDF entsteht unter temporärem Namen und wird erst fertig
+    umbenannt; nach einem Abbruch bleibt ein vorhandenes altes PDF unverändert.
+
+    Mit cache (quittungen.pdf.cache.PdfCache) wird das Sammel-PDF einer Klasse
+    mit unveränderten Word-Dateien aus dem Cache übernommen.
+    """
+    klasse_name = os.path.basename(class_folder)
+    docx_files = class_docx_files(class_folder)
+    if not docx_files:
+        return None
+    stage_times = stage_times if stage_times is not None else StageTimes()
+    target_path = class_pdf_path(output_dir, klasse_name)
+    partial_path = target_path + ".part"
+    start = time.perf_counter()
+    class_key = None
+    if cache is not None and not single_pdfs:
+        class_key = cache.key(backend, *(cache.digest(os.path.join(class_folder, f)) for f in docx_files))
+        if cache.fetch(class_key, partial_path):
+            os.replace(partial_path, target_path)
+            stage_times.add(STAGE_PDF_CACHE, time.perf_counter() - start, len(docx_files))
+            stage_times.note(SLOWEST_CLASSES, klasse_name, time.perf_counter() - start)
+            return target_path
+        stage_times.add(STAGE_PDF_CACHE, time.perf_counter() - start)
+    try:
+        final_pdf_path = backend.build_class(class_folder, docx_files, partial_path, single_pdfs, stage_times,
+                                             is_cancelled, cache)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    if final_pdf_path is None:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise ConversionCancelled(klasse_name)
+    if class_key is not None:
+        cache.store(class_key, partial_path)
+    os.replace(partial_path, target_path)
+    final_pdf_path = target_path
+    stage_times.note(SLOWEST_CLASSES, klasse_name, time.perf_counter() - start)
+    if final_pdf_path and os.path.exists(final_pdf_path):
+        stage_times.add_bytes(STAGE_PDF_MERGE, os.path.getsize(final_pdf_path))
+    return final_pdf_path
+
+
+_worker_backend = None
+_worker_cancel_event = None
+_worker_cache = None
+
+
+def _init_worker(backend_name, cancel_event, cache):
+    global _worker_backend, _worker_cancel_event, _worker_cache
+    stop_inherited_tracing()
+    # Strg+C trifft die ganze Prozessgruppe; abgebrochen wird über den Hauptprozess
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_backend = get_backend(backend_name)
+    _worker_backend.open()
+    _worker_cancel_event = cancel_event
+    _worker_cache = cache
+
+
+def _build_in_worker(class_folder, output_dir, single_pdfs):
+    # Rückgabe: (Ordner, PDF-Pfad, Fehlertext, Stufenzeiten, abgebrochen)
+    stage_times = StageTimes()
+    try:
+        final_pdf_path = build_class_pdf(_worker_backend, class_folder, output_dir, single_pdfs, stage_times,
+                                         _worker_cancel_event.is_set, _worker_cache)
+        return class_folder, final_pdf_path, None, stage_times.export(), False
+    except ConversionCancelled:
+        return class_folder, None, None, stage_times.export(), True
+    except Exception as e:
+        return class_folder, None, str(e), stage_times.export(), False
+
+
+def build_class_pdfs(backend_name, class_folders, output_dir, workers=1, single_pdfs=False,
+                     on_result=None, is_cancelled=None, stage_times=None, cache=None):
+    """
+    Erstellt die Sammel-PDFs und ruft für jede fertige Klasse
+    on_result(class_folder, pdf_path oder None, Fehlertext oder None) auf.
+    Eine durch Abbruch unvollständige Klasse wird nicht gemeldet.
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+    on_result = on_result or (lambda folder, path, error: None)
+    stage_times = stage_times if stage_times is not None else StageTimes()
+    backend = get_backend(backend_name)
+
+    if workers <= 1 or not backend.parallel_safe or len(class_folders) <= 1:
+        # Beim Word-Backend ist das der Start der COM-Sitzung
+        with stage_times.measure(STAGE_PDF_BACKEND_OPEN):
+            backend.open()
+        try:
+            for class_folder in class_folders:
+                if is_cancelled():
+                    break
+                try:
+                    final_pdf_path = build_class_pdf(backend, class_folder, output_dir, single_pdfs, stage_times,
+                                                     is_cancelled, cache)
+                except ConversionCancelled:
+                    break
+                except Exception as e:
+                    on_result(class_folder, None, str(e))
+                else:
+                    on_result(class_folder, final_pdf_path, None)
+        finally:
+            backend.close()
+        return
+
+    cancel_event = multiprocessing.Event()
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(class_folders)),
+                                   initializer=_init_worker, initargs=(backend_name, cancel_event, cache))
+    try:
+        pending = {executor.submit(_build_in_worker, folder, output_dir, single_pdfs) for folder in class_folders}
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                class_folder, final_pdf_path, error, class_times, cancelled = future.result()
+                stage_times.merge(class_times)
+                if not cancelled:
+                    on_result(class_folder, final_pdf_path, error)
+            if is_cancelled():
+                # Laufende Worker hören nach der aktuellen Word-Datei auf
+                cancel_event.set()
+                for future in pending:
+                    future.cancel()
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ClassPdfQueue:
+    """
+    Erstellt Sammel-PDFs in einem eigenen Thread, während Schritt 1 noch
+    weitere Klassen rendert. Die Warteschlange ist begrenzt: hängt die
+    Umwandlung hinterher, wartet put() und bremst damit das Rendern.
+
+    Nach einem Abbruch endet die laufende Klasse nach der aktuellen Word-Datei
+    (ohne Sammel-PDF), alle wartenden werden verworfen; finish() kehrt zurück,
+    sobald der Thread beendet ist.
+    """
+
+    def __init__(self, backend_name, output_dir, single_pdfs=False, on_result=None, is_cancelled=None,
+                 maxsize=DEFAULT_QUEUE_SIZE, cache=None):
+        self.backend_name = backend_name
+        self.cache = cache
+        self.output_dir = output_dir
+        self.single_pdfs = single_pdfs
+        self.on_result = on_result or (lambda folder, path, error: None)
+        self.is_cancelled = is_cancelled or (lambda: False)
+        # Eigenes Objekt, weil der Thread parallel zum Hauptprozess misst; danach mit merge() übernehmen
+        self.stage_times = StageTimes()
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def put(self, class_folder):
+        self._queue.put(class_folder)
+
+    def finish(self):
+        self._queue.put(_END_OF_CLASSES)
+        self._thread.join()
+
+    def _run(self):
+        backend = get_backend(self.backend_name)
+        opened = False
+        try:
+            while True:
+                class_folder = self._queue.get()
+                if class_folder is _END_OF_CLASSES:
+                    break
+                if self.is_cancelled():
+                    continue
+                try:
+                    if not opened:
+                        # Im Thread öffnen: COM muss im Thread initialisiert werden, der Word steuert
+                        with self.stage_times.measure(STAGE_PDF_BACKEND_OPEN):
+                            backend.open()
+                        opened = True
+                    final_pdf_path = build_class_pdf(backend, class_folder, self.output_dir, self.single_pdfs,
+                                                     self.stage_times, self.is_cancelled, self.cache)
+                except ConversionCancelled:
+                    continue
+                except Exception as e:
+                    self.on_result(class_folder, None, str(e))
+                else:
+                    self.on_result(class_folder, final_pdf_path, None)
+        finally:
+            if opened:
+                backend.close()
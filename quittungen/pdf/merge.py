@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Sammel-PDF Seite für Seite auf die Festplatte schreiben.
+
+PdfStreamWriter übernimmt die Seiten fertiger PDFs (Einzel-PDFs von Word oder
+Teil-Dokumente des integrierten Renderers) und schreibt jedes Objekt sofort in
+die Zieldatei. Im Speicher bleiben nur die Positionen der Objekte für die
+Querverweistabelle, die Seitennummern und die Verweise auf bereits
+geschriebene Bilder und Schriften - der Speicherbedarf hängt also nicht von
+der Größe der Klasse ab (pypdf.PdfWriter hielte dagegen alle Seiten bis zum
+Schluss im Speicher).
+
+Jede Quittung bringt ihr eigenes Logo und ihre eigenen Schriften mit. Bilder
+und Schriften mit identischem Inhalt werden auf das bereits geschriebene
+Objekt umgebogen und so nur einmal gespeichert.
+"""
+
+import hashlib
+import os
+
+_SHARED_RESOURCES = ("/XObject", "/Font")
+_MAX_DEPTH = 8
+
+# Feste Objektnummern für Katalog und Seitenbaum; beide werden erst in close() geschrieben
+_CATALOG = 1
+_PAGES = 2
+
+
+def _digest(obj, digest, depth=0):
+    from pypdf.generic import ArrayObject, DictionaryObject, StreamObject
+
+    obj = obj.get_object()
+    if depth > _MAX_DEPTH:
+        digest.update(b"?")
+    elif isinstance(obj, DictionaryObject):
+        digest.update(b"<<")
+        for key in sorted(obj):
+            if key in ("/Length", "/Parent"):
+                continue
+            digest.update(key.encode("latin-1"))
+            _digest(obj[key], digest, depth + 1)
+        if isinstance(obj, StreamObject):
+            digest.update(b"stream")
+            digest.update(obj._data)
+        digest.update(b">>")
+    elif isinstance(obj, ArrayObject):
+        digest.update(b"[")
+        for item in obj:
+            _digest(item, digest, depth + 1)
+        digest.update(b"]")
+    else:
+        digest.update(repr(obj).encode("utf-8", "replace"))
+
+
+def _resource_dicts(page):
+    resources = page.get("/Resources")
+    if resources is None:
+        return
+    resources = resources.get_object()
+    for category in _SHARED_RESOURCES:
+        entries = resources.get(category)
+        if entries is not None:
+            yield category, entries.get_object()
+
+
+class PdfStreamWriter:
+    """
+    Schreibt ein PDF aus den Seiten mehrerer Quell-PDFs:
+
+        with PdfStreamWriter(path) as writer:
+            writer.add_pdf(quelle)      # Pfad oder Datei-Objekt
+        # erst hier (ohne Ausnahme) sind Seitenbaum und Querverweise geschrieben
+
+    Nach einer Ausnahme bzw. abort() bleibt eine unvollständige Datei zurück,
+    die der Aufrufer löscht (build_class_pdf schreibt ohnehin unter .part).
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+        # Index = Objektnummer; 0 ist der freie Kopf-Eintrag der Querverweistabelle
+        self._offsets = [None, None, None]
+        self._pages = []
+        self._shared = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self):
+        """Schließt die (unvollständige) Datei, ohne Seitenbaum und Querverweise zu schreiben."""
+        self._file.close()
+
+    def _allocate(self):
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def _write_object(self, number, obj):
+        self._offsets[number] = self._file.tell()
+        self._file.write(f"{number} 0 obj\n".encode("ascii"))
+        obj.write_to_stream(self._file)
+        self._file.write(b"\nendobj\n")
+
+    def _copy(self, obj, mapping, pending):
+        """Kopie eines direkten Objekts mit neu nummerierten Verweisen; neue Ziele kommen nach pending."""
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+        if isinstance(obj, IndirectObject):
+            number = mapping.get(obj.idnum)
+            if number is None:
+                number = mapping[obj.idnum] = self._allocate()
+                pending.append(obj)
+            return IndirectObject(number, 0, None)
+        if isinstance(obj, DictionaryObject):
+            copy = StreamObject() if isinstance(obj, StreamObject) else DictionaryObject()
+            for key, value in obj.items():
+                copy[key] = self._copy(value, mapping, pending)
+            if isinstance(obj, StreamObject):
+                # Rohdaten mit /Filter unverändert übernehmen, ohne sie zu entpacken
+                copy._data = obj._data
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(item, mapping, pending) for item in obj)
+        return obj
+
+    def add_pdf(self, source):
+        from pypdf import PdfReader
+        from pypdf.generic import IndirectObject, NameObject, NullObject
+
+        reader = PdfReader(source)
+        # Objektnummer in der Quelle -> Objektnummer im Ziel; gilt nur für diese Quelle
+        mapping = {}
+        pages_root = reader.trailer["/Root"].raw_get("/Pages")
+        if isinstance(pages_root, IndirectObject):
+            mapping[pages_root.idnum] = _PAGES
+        pages = list(reader.pages)
+        # Seiten vorab nummerieren, damit Verweise zwischen ihnen (z.B. Links) stimmen
+        for page in pages:
+            mapping[page.indirect_reference.idnum] = self._allocate()
+
+        for page in pages:
+            new_digests = {}
+            for category, entries in _resource_dicts(page):
+                for name, ref in entries.items():
+                    if not isinstance(ref, IndirectObject) or ref.idnum in mapping:
+                        continue
+                    digest = hashlib.sha256()
+                    _digest(ref, digest)
+                    key = (category, digest.digest())
+                    if key in self._shared:
+                        mapping[ref.idnum] = self._shared[key]
+                    else:
+                        new_digests[ref.idnum] = key
+
+            pending = []
+            copy = self._copy(page, mapping, pending)
+            copy[NameObject("/Parent")] = IndirectObject(_PAGES, 0, None)
+            number = mapping[page.indirect_reference.idnum]
+            self._write_object(number, copy)
+            self._pages.append(number)
+            while pending:
+                ref = pending.pop()
+                target = ref.get_object()
+                self._write_object(mapping[ref.idnum],
+                                   self._copy(target, mapping, pending) if target is not None else NullObject())
+            for idnum, key in new_digests.items():
+                self._shared[key] = mapping[idnum]
+
+    def close(self):
+        from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                                   NumberObject)
+
+        pages = DictionaryObject()
+        pages[NameObject("/Type")] = NameObject("/Pages")
+        pages[NameObject("/Kids")] = ArrayObject(IndirectObject(n, 0, None) for n in self._pages)
+        pages[NameObject("/Count")] = NumberObject(len(self._pages))
+        self._write_object(_PAGES, pages)
+        catalog = DictionaryObject()
+        catalog[NameObject("/Type")] = NameObject("/Catalog")
+        catalog[NameObject("/Pages")] = IndirectObject(_PAGES, 0, None)
+        self._write_object(_CATALOG, catalog)
+
+        xref = self._file.tell()
+        lines = [f"xref\n0 {len(self._offsets)}\n", "0000000000 65535 f \n"]
+        lines += [f"{offset:010d} 00000 n \n" for offset in self._offsets[1:]]
+        lines.append(f"trailer\n<< /Size {len(self._offsets)} /Root {_CATALOG} 0 R >>\n"
+                     f"startxref\n{xref}\n%%EOF\n")
+        self._file.write("".join(lines).encode("ascii"))
+        self._file.close()
+
+
+def merge_pdf_files(pdf_paths, final_pdf_path, remove_sources=False):
+    with PdfStreamWriter(final_pdf_path) as writer:
+        for path in pdf_paths:
+            # Seiten sofort schreiben und die Datei wieder schließen, statt alle Quellen offen zu halten
+            with open(path, "rb") as f:
+                writer.add_pdf(f)
+            if remove_sources:
+                os.remove(path)
+    return final_pdf_path
@@ -0,0 +1,908 @@
+# -*- coding: utf-8 -*-
+"""
+Integrierter PDF-Renderer ohne Office-Installation.
+
+Liest eine befüllte Quittung (.docx) direkt aus dem Zip-Archiv und zeichnet
+Absätze, Text-Runs (fett/kursiv/Größe/Farbe), Tabstopps, Tabellen sowie
+Kopf- und Fußzeilen mit eingebetteten Bildern (Logo) per fpdf2 in ein PDF.
+Unterstützt wird genau der Umfang, den einfache Vorlagen wie
+Quittung-Template.docx benutzen - kein vollständiger Word-Ersatz.
+"""
+
+import functools
+import io
+import os
+import posixpath
+import sys
+import zipfile
+
+from lxml import etree
+
+from ..stages import STAGE_PDF_CONVERT, STAGE_PDF_MERGE, StageTimes
+from .merge import PdfStreamWriter
+
+try:
+    from fpdf import FPDF
+    HAS_FPDF = True
+except ImportError:
+    HAS_FPDF = False
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+WP = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}"
+PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+TWIP = 1 / 20.0
+EMU = 1 / 12700.0
+
+# Quittungen je fpdf2-Dokument; größere Klassen werden in Teilen in das Sammel-PDF geschrieben
+CHUNK_RECEIPTS = 200
+
+# Faktor zwischen Schriftgröße und einfachem Zeilenabstand (entspricht etwa Times New Roman/Calibri)
+LINE_HEIGHT_FACTOR = 1.15
+ASCENT_FACTOR = 0.9
+
+_SERIF_HINTS = ("times", "serif", "cambria", "georgia", "garamond", "antiqua", "roman")
+
+_FONT_FILES = {
+    ("serif", ""): ["times.ttf", "LiberationSerif-Regular.ttf", "DejaVuSerif.ttf"],
+    ("serif", "B"): ["timesbd.ttf", "LiberationSerif-Bold.ttf", "DejaVuSerif-Bold.ttf"],
+    ("serif", "I"): ["timesi.ttf", "LiberationSerif-Italic.ttf", "DejaVuSerif-Italic.ttf"],
+    ("serif", "BI"): ["timesbi.ttf", "LiberationSerif-BoldItalic.ttf", "DejaVuSerif-BoldItalic.ttf"],
+    ("sans", ""): ["arial.ttf", "LiberationSans-Regular.ttf", "DejaVuSans.ttf"],
+    ("sans", "B"): ["arialbd.ttf", "LiberationSans-Bold.ttf", "DejaVuSans-Bold.ttf"],
+    ("sans", "I"): ["ariali.ttf", "LiberationSans-Italic.ttf", "DejaVuSans-Oblique.ttf"],
+    ("sans", "BI"): ["arialbi.ttf", "LiberationSans-BoldItalic.ttf", "DejaVuSans-BoldOblique.ttf"],
+}
+_SYMBOL_FONT_FILES = ["seguisym.ttf", "DejaVuSans.ttf", "arialuni.ttf"]
+
+
+def _font_dirs():
+    dirs = []
+    if sys.platform.startswith("win"):
+        dirs.append(os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"))
+        local = os.environ.get("LOCALAPPDATA")
+        if local:
+            dirs.append(os.path.join(local, "Microsoft", "Windows", "Fonts"))
+    elif sys.platform == "darwin":
+        dirs += ["/Library/Fonts", "/System/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+    else:
+        dirs += ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+                 os.path.expanduser("~/.local/share/fonts")]
+    return dirs
+
+
+@functools.lru_cache(maxsize=1)
+def _installed_fonts():
+    found = {}
+    for font_dir in _font_dirs():
+        for dirpath, _, filenames in os.walk(font_dir):
+            for filename in filenames:
+                if filename.lower().endswith(".ttf"):
+                    found.setdefault(filename.lower(), os.path.join(dirpath, filename))
+    return found
+
+
+def _find_font_file(kind, style):
+    installed = _installed_fonts()
+    # Fehlt ein Schnitt, wird auf den normalen Schnitt derselben Familie ausgewichen
+    for wanted_style in (style, style.replace("I", ""), ""):
+        for filename in _FONT_FILES[(kind, wanted_style)]:
+            path = installed.get(filename.lower())
+            if path:
+                return path
+    return None
+
+
+def _is_on(element):
+    return element is not None and element.get(W + "val") not in ("0", "false", "off")
+
+
+def _int_attr(element, name, default=None):
+    if element is None or element.get(W + name) is None:
+        return default
+    try:
+        return int(element.get(W + name))
+    except ValueError:
+        return default
+
+
+# --- Formatvorlagen ---
+def _parse_rpr(rpr, props):
+    if rpr is None:
+        return props
+    for tag, key in (("b", "bold"), ("i", "italic"), ("caps", "caps")):
+        element = rpr.find(W + tag)
+        if element is not None:
+            props[key] = _is_on(element)
+    size = _int_attr(rpr.find(W + "sz"), "val")
+    if size:
+        props["size"] = size / 2.0
+    fonts = rpr.find(W + "rFonts")
+    if fonts is not None:
+        if fonts.get(W + "ascii"):
+            props["font"] = fonts.get(W + "ascii")
+        elif fonts.get(W + "asciiTheme"):
+            props["font"] = "theme"
+    color = rpr.find(W + "color")
+    if color is not None and color.get(W + "val") not in (None, "auto"):
+        props["color"] = color.get(W + "val")
+    underline = rpr.find(W + "u")
+    if underline is not None:
+        props["underline"] = underline.get(W + "val") not in ("none", None)
+    vanish = rpr.find(W + "vanish")
+    if vanish is not None:
+        props["hidden"] = _is_on(vanish)
+    return props
+
+
+def _parse_ppr(ppr, props):
+    if ppr is None:
+        return props
+    jc = ppr.find(W + "jc")
+    if jc is not None:
+        props["align"] = jc.get(W + "val")
+    spacing = ppr.find(W + "spacing")
+    if spacing is not None:
+        for name in ("before", "after", "line"):
+            value = _int_attr(spacing, name)
+            if value is not None:
+                props[name] = value
+        if spacing.get(W + "lineRule"):
+            props["line_rule"] = spacing.get(W + "lineRule")
+    ind = ppr.find(W + "ind")
+    if ind is not None:
+        for name, key in (("left", "ind_left"), ("start", "ind_left"), ("right", "ind_right"),
+                          ("end", "ind_right"), ("firstLine", "ind_first")):
+            value = _int_attr(ind, name)
+            if value is not None:
+                props[key] = value
+        hanging = _int_attr(ind, "hanging")
+        if hanging is not None:
+            props["ind_first"] = -hanging
+    tabs = ppr.find(W + "tabs")
+    if tabs is not None:
+        stops = dict(props.get("tabs", ()))
+        for tab in tabs.findall(W + "tab"):
+            pos = _int_attr(tab, "pos")
+            if pos is None:
+                continue
+            if tab.get(W + "val") == "clear":
+                stops.pop(pos, None)
+            else:
+                stops[pos] = tab.get(W + "val")
+        props["tabs"] = tuple(sorted(stops.items()))
+    return props
+
+
+class _Styles:
+
+    def __init__(self, root):
+        self.by_id = {}
+        self.default_paragraph = None
+        self.default_ppr = {}
+        self.default_rpr = {"size": 11.0}
+        self._cache = {}
+        if root is None:
+            return
+        defaults = root.find(W + "docDefaults")
+        if defaults is not None:
+            _parse_rpr(defaults.find(f"{W}rPrDefault/{W}rPr"), self.default_rpr)
+            _parse_ppr(defaults.find(f"{W}pPrDefault/{W}pPr"), self.default_ppr)
+        for style in root.findall(W + "style"):
+            self.by_id[style.get(W + "styleId")] = style
+            if style.get(W + "type") == "paragraph" and style.get(W + "default") in ("1", "true"):
+                self.default_paragraph = style.get(W + "styleId")
+
+    def properties(self, style_id):
+        """(Absatz-, Zeichen-)Eigenschaften einer Formatvorlage inklusive basedOn-Kette."""
+        if style_id in self._cache:
+            return self._cache[style_id]
+        chain = []
+        seen = set()
+        current = style_id
+        while current and current in self.by_id and current not in seen:
+            seen.add(current)
+            style = self.by_id[current]
+            chain.append(style)
+            based_on = style.find(W + "basedOn")
+            current = based_on.get(W + "val") if based_on is not None else None
+        ppr, rpr = {}, {}
+        for style in reversed(chain):
+            _parse_ppr(style.find(W + "pPr"), ppr)
+            _parse_rpr(style.find(W + "rPr"), rpr)
+        self._cache[style_id] = (ppr, rpr)
+        return ppr, rpr
+
+    def table_borders(self, style_id):
+        borders = {}
+        current = style_id
+        chain = []
+        while current and current in self.by_id and current not in chain:
+            chain.append(current)
+            based_on = self.by_id[current].find(W + "basedOn")
+            current = based_on.get(W + "val") if based_on is not None else None
+        for sid in reversed(chain):
+            _parse_borders(self.by_id[sid].find(f"{W}tblPr/{W}tblBorders"), borders)
+        return borders
+
+
+def _parse_borders(element, borders):
+    if element is None:
+        return borders
+    for child in element:
+        side = etree.QName(child).localname
+        if child.get(W + "val") in ("nil", "none"):
+            borders[side] = None
+        else:
+            borders[side] = max(_int_attr(child, "sz", 4), 2) / 8.0
+    return borders
+
+
+# --- Dokumentstruktur ---
+class _Paragraph:
+    def __init__(self, props, mark_props, items):
+        self.props = props
+        self.mark_props = mark_props
+        self.items = items
+
+
+class _Table:
+    def __init__(self, col_widths, rows, borders):
+        self.col_widths = col_widths
+        self.rows = rows
+        self.borders = borders
+
+
+class _Part:
+    """Ein XML-Teil der .docx (Hauptdokument, Kopf- oder Fußzeile) mit seinen Bildern."""
+
+    def __init__(self, package, name):
+        self.package = package
+        self.name = name
+        self.root = etree.fromstring(package.read(name))
+        self.rels = package.relationships(name)
+
+    def image(self, rel_id):
+        target = self.rels.get(rel_id)
+        if target is None:
+            return None
+        return self.package.read(target)
+
+
+class _Package:
+    """Das Zip-Archiv der .docx; nur innerhalb von `with` geöffnet (unter Windows sperrt ein offenes Handle die Datei)."""
+
+    def __init__(self, source):
+        self.zip = zipfile.ZipFile(source)
+        self.names = set(self.zip.namelist())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def close(self):
+        self.zip.close()
+
+    def read(self, name):
+        return self.zip.read(name)
+
+    def relationships(self, part_name):
+        folder, filename = posixpath.split(part_name)
+        rels_name = posixpath.join(folder, "_rels", filename + ".rels")
+        rels = {}
+        if rels_name not in self.names:
+            return rels
+        for rel in etree.fromstring(self.read(rels_name)).iter(PKG_REL + "Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            rels[rel.get("Id")] = posixpath.normpath(posixpath.join(folder, rel.get("Target")))
+        return rels
+
+
+# Ende eines Abschnitts im Haupttext (z.B. zwischen den Quittungen einer Klassen-Datei): neue Seite
+_SECTION_BREAK = object()
+
+
+class _Document:
+    """Liest alles Benötigte (auch Bilder) im Konstruktor; danach ist die .docx wieder geschlossen."""
+
+    def __init__(self, source):
+        with _Package(source) as self.package:
+            self._read()
+        self.package = None
+
+    def _read(self):
+        main = "word/document.xml"
+        self.main = _Part(self.package, main)
+        styles_name = next((t for t in self.main.rels.values() if t.endswith("styles.xml")), None)
+        self.styles = _Styles(etree.fromstring(self.package.read(styles_name)) if styles_name else None)
+
+        settings_name = next((t for t in self.main.rels.values() if t.endswith("settings.xml")), None)
+        self.default_tab = 720
+        if settings_name:
+            tab = etree.fromstring(self.package.read(settings_name)).find(W + "defaultTabStop")
+            self.default_tab = _int_attr(tab, "val", 720) or 720
+
+        body = self.main.root.find(W + "body")
+        sect = body.find(W + "sectPr")
+        if sect is None:
+            sect = etree.Element(W + "sectPr")
+        page_size = sect.find(W + "pgSz")
+        margins = sect.find(W + "pgMar")
+        self.page_width = _int_attr(page_size, "w", 11906) * TWIP
+        self.page_height = _int_attr(page_size, "h", 16838) * TWIP
+        self.margin_top = abs(_int_attr(margins, "top", 1417)) * TWIP
+        self.margin_bottom = abs(_int_attr(margins, "bottom", 1134)) * TWIP
+        self.margin_left = _int_attr(margins, "left", 1417) * TWIP
+        self.margin_right = _int_attr(margins, "right", 1417) * TWIP
+        self.header_distance = _int_attr(margins, "header", 708) * TWIP
+        self.footer_distance = _int_attr(margins, "footer", 708) * TWIP
+
+        self.body = self._blocks(body, self.main, {}, {})
+        self.header = self._header_footer(sect, "headerReference")
+        self.footer = self._header_footer(sect, "footerReference")
+
+    def _header_footer(self, sect, tag):
+        refs = {ref.get(W + "type"): ref.get(R + "id") for ref in sect.findall(W + tag)}
+        rel_id = refs.get("default")
+        if sect.find(W + "titlePg") is not None and _is_on(sect.find(W + "titlePg")):
+            rel_id = refs.get("first", rel_id)
+        target = self.main.rels.get(rel_id)
+        if not target:
+            return []
+        part = _Part(self.package, target)
+        return self._blocks(part.root, part, {}, {})
+
+    def _blocks(self, container, part, base_ppr, base_rpr):
+        blocks = []
+        for child in container:
+            tag = child.tag
+            if tag == W + "p":
+                blocks.append(self._paragraph(child, part, base_ppr, base_rpr))
+                ppr = child.find(W + "pPr")
+                if ppr is not None and ppr.find(W + "sectPr") is not None:
+                    blocks.append(_SECTION_BREAK)
+            elif tag == W + "tbl":
+                blocks.append(self._table(child, part))
+            elif tag == W + "sdt":
+                content = child.find(W + "sdtContent")
+                if content is not None:
+                    blocks.extend(self._blocks(content, part, base_ppr, base_rpr))
+        return blocks
+
+    def _paragraph(self, p, part, base_ppr, base_rpr):
+        ppr_element = p.find(W + "pPr")
+        style_element = ppr_element.find(W + "pStyle") if ppr_element is not None else None
+        style_id = style_element.get(W + "val") if style_element is not None else self.styles.default_paragraph
+        style_ppr, style_rpr = self.styles.properties(style_id)
+
+        props = dict(self.styles.default_ppr)
+        props.update(base_ppr)
+        props.update(style_ppr)
+        _parse_ppr(ppr_element, props)
+
+        run_base = dict(self.styles.default_rpr)
+        run_base.update(base_rpr)
+        run_base.update(style_rpr)
+
+        mark_props = dict(run_base)
+        if ppr_element is not None:
+            _parse_rpr(ppr_element.find(W + "rPr"), mark_props)
+
+        items = []
+        for run in self._runs(p):
+            rpr = dict(run_base)
+            rpr_element = run.find(W + "rPr")
+            if rpr_element is not None:
+                char_style = rpr_element.find(W + "rStyle")
+                if char_style is not None:
+                    rpr.update(self.styles.properties(char_style.get(W + "val"))[1])
+                _parse_rpr(rpr_element, rpr)
+            if rpr.get("hidden"):
+                continue
+            for child in run:
+                tag = child.tag
+                if tag == W + "t":
+                    text = child.text or ""
+                    if rpr.get("caps"):
+                        text = text.upper()
+                    items.append(("text", text, rpr))
+                elif tag == W + "tab":
+                    items.append(("tab", None, rpr))
+                elif tag in (W + "br", W + "cr"):
+                    items.append(("break", None, rpr))
+                elif tag == W + "noBreakHyphen":
+                    items.append(("text", "-", rpr))
+                elif tag == W + "drawing":
+                    image = self._image(child, part)
+                    if image is not None:
+                        items.append(("image", image, rpr))
+        return _Paragraph(props, mark_props, items)
+
+    def _runs(self, p):
+        for child in p:
+            tag = child.tag
+            if tag == W + "r":
+                yield child
+            elif tag in (W + "hyperlink", W + "ins", W + "smartTag", W + "fldSimple", W + "customXml"):
+                yield from self._runs(child)
+            elif tag == W + "sdt":
+                content = child.find(W + "sdtContent")
+                if content is not None:
+                    yield from self._runs(content)
+
+    def _image(self, drawing, part):
+        extent = drawing.find(f".//{WP}extent")
+        blip = drawing.find(f".//{A}blip")
+        if extent is None or blip is None:
+            return None
+        data = part.image(blip.get(R + "embed"))
+        if data is None:
+            return None
+        return (data, int(extent.get("cx")) * EMU, int(extent.get("cy")) * EMU)
+
+    def _table(self, tbl, part):
+        tbl_pr = tbl.find(W + "tblPr")
+        style_element = tbl_pr.find(W + "tblStyle") if tbl_pr is not None else None
+        style_id = style_element.get(W + "val") if style_element is not None else None
+        borders = self.styles.table_borders(style_id) if style_id else {}
+        if tbl_pr is not None:
+            _parse_borders(tbl_pr.find(W + "tblBorders"), borders)
+        table_ppr, table_rpr = self.styles.properties(style_id) if style_id else ({}, {})
+
+        col_widths = [_int_attr(col, "w", 0) * TWIP for col in tbl.findall(f"{W}tblGrid/{W}gridCol")]
+        rows = []
+        for tr in tbl.findall(W + "tr"):
+            cells = []
+            for tc in tr.findall(W + "tc"):
+                span = _int_attr(tc.find(f"{W}tcPr/{W}gridSpan"), "val", 1)
+                cells.append((span, self._blocks(tc, part, table_ppr, table_rpr)))
+            rows.append(cells)
+        return _Table(col_widths, rows, borders)
+
+
+# --- Satz und Ausgabe ---
+class _Fonts:
+    """
+    Bindet TrueType-Schriften erst bei der ersten Verwendung ins PDF ein (das Einlesen
+    einer TTF-Datei ist teuer). Ohne TTF wird auf die PDF-Standardschriften ausgewichen.
+    """
+
+    def __init__(self, pdf):
+        self.pdf = pdf
+        self._families = {}
+        self._fallback_enabled = False
+        self.unicode = any(_find_font_file(kind, "") for kind in ("serif", "sans"))
+
+    def _register(self, path):
+        family = os.path.splitext(os.path.basename(path))[0].lower()
+        if family not in self.pdf.fonts:
+            self.pdf.add_font(family, "", path)
+        return family
+
+    def _family(self, kind, style):
+        key = (kind, style)
+        if key not in self._families:
+            other = "sans" if kind == "serif" else "serif"
+            path = _find_font_file(kind, style) or _find_font_file(other, style)
+            self._families[key] = self._register(path)
+        return self._families[key]
+
+    def _enable_fallback(self):
+        # Zeichen wie ✆ oder ✉ fehlen z.B. in Times/Arial
+        self._fallback_enabled = True
+        installed = _installed_fonts()
+        families = []
+        for filename in _SYMBOL_FONT_FILES:
+            path = installed.get(filename.lower())
+            if path:
+                families.append(self._register(path))
+        if families:
+            self.pdf.set_fallback_fonts(families, exact_match=False)
+
+    def use(self, props, text=""):
+        font = (props.get("font") or "").lower()
+        kind = "serif" if any(hint in font for hint in _SERIF_HINTS) else "sans"
+        style = ("B" if props.get("bold") else "") + ("I" if props.get("italic") else "")
+        size = props.get("size", 11.0)
+        if not self.unicode:
+            self.pdf.set_font("Times" if kind == "serif" else "Helvetica", style, size)
+            return size
+
+        self.pdf.set_font(self._family(kind, style), "", size)
+        if text and not self._fallback_enabled:
+            cmap = self.pdf.current_font.cmap
+            if any(ord(char) not in cmap for char in text if not char.isspace()):
+                self._enable_fallback()
+                self.pdf.set_font(self._family(kind, style), "", size)
+        return size
+
+    def clean(self, text):
+        if self.unicode:
+            return text
+        return text.encode("latin-1", "replace").decode("latin-1")
+
+
+class _Layout:
+
+    def __init__(self, pdf, fonts, document):
+        self.pdf = pdf
+        self.fonts = fonts
+        self.document = document
+
+    def blocks(self, blocks, width):
+        """Setzt Blöcke in die gegebene Breite. Ergebnis: (Höhe, Zeichenbefehle relativ zu 0/0)."""
+        ops = []
+        y = 0.0
+        for block in blocks:
+            if isinstance(block, _Paragraph):
+                height, block_ops = self.paragraph(block, width)
+            else:
+                height, block_ops = self.table(block, width)
+            ops.extend(_shift(block_ops, 0, y))
+            y += height
+        return y, ops
+
+    def _tokens(self, paragraph):
+        tokens = []
+        for kind, value, props in paragraph.items:
+            if kind == "text":
+                text = self.fonts.clean(value)
+                word = ""
+                for char in text:
+                    if char == " ":
+                        if word:
+                            tokens.append(("word", word, props))
+                            word = ""
+                        tokens.append(("space", " ", props))
+                    else:
+                        word += char
+                if word:
+                    tokens.append(("word", word, props))
+            else:
+                tokens.append((kind, value, props))
+        return tokens
+
+    def paragraph(self, paragraph, width):
+        props = paragraph.props
+        left = props.get("ind_left", 0) * TWIP
+        right = props.get("ind_right", 0) * TWIP
+        first = props.get("ind_first", 0) * TWIP
+        available = max(width - left - right, 1.0)
+        tab_stops = [(pos * TWIP - left, kind) for pos, kind in props.get("tabs", ()) if kind != "clear"]
+
+        lines = []
+        line = []
+        x = 0.0
+
+        def finish_line(forced):
+            lines.append((line[:], forced))
+            line.clear()
+
+        def line_width_limit():
+            return available - (first if not lines else 0.0)
+
+        for kind, value, run_props in self._tokens(paragraph):
+            if kind == "break":
+                finish_line(True)
+                x = 0.0
+                continue
+            if kind == "tab":
+                x = self._next_tab(x, tab_stops, line_width_limit())
+                line.append(["tab", None, run_props, x, 0.0])
+                continue
+            if kind == "image":
+                data, image_w, image_h = value
+                if line and x + image_w > line_width_limit():
+                    finish_line(False)
+                    x = 0.0
+                line.append(["image", value, run_props, x, image_w])
+                x += image_w
+                continue
+            self.fonts.use(run_props, value)
+            token_width = self.pdf.get_string_width(value)
+            if kind == "word" and line and x + token_width > line_width_limit():
+                # Wörter, die über mehrere Runs gehen (z.B. "Euro" + ")"), gemeinsam umbrechen
+                start = len(line)
+                while start > 0 and line[start - 1][0] == "word":
+                    start -= 1
+                if start > 0:
+                    carried = line[start:]
+                    del line[start:]
+                    finish_line(False)
+                    x = 0.0
+                    for item in carried:
+                        item[3] = x
+                        x += item[4]
+                        line.append(item)
+            if kind == "space" and not line and lines:
+                continue
+            line.append([kind, value, run_props, x, token_width])
+            x += token_width
+        finish_line(True)
+
+        align = props.get("align", "left")
+        ops = []
+        y = props.get("before", 0) * TWIP
+        for index, (items, forced) in enumerate(lines):
+            while items and items[-1][0] == "space":
+                items.pop()
+            sizes = [item[2].get("size", 11.0) for item in items if item[0] in ("word", "space")]
+            max_size = max(sizes) if sizes else paragraph.mark_props.get("size", 11.0)
+            image_height = max((item[1][2] for item in items if item[0] == "image"), default=0.0)
+            ascent = max(max_size * ASCENT_FACTOR, image_height)
+            natural = max(max_size * LINE_HEIGHT_FACTOR, image_height + max_size * (LINE_HEIGHT_FACTOR - ASCENT_FACTOR))
+            line_height = self._line_height(props, natural)
+
+            line_width = items[-1][3] + items[-1][4] if items else 0.0
+            offset = left + (first if index == 0 else 0.0)
+            has_tabs = any(item[0] == "tab" for item in items)
+            extra_per_space = 0.0
+            if not has_tabs:
+                if align == "center":
+                    offset += (available - line_width) / 2
+                elif align in ("right", "end"):
+                    offset += available - line_width
+                elif align in ("both", "distribute") and not forced:
+                    spaces = sum(1 for item in items if item[0] == "space")
+                    if spaces:
+                        extra_per_space = (available - line_width) / spaces
+
+            shift = 0.0
+            baseline = y + ascent
+            for kind, value, run_props, item_x, item_w in items:
+                draw_x = offset + item_x + shift
+                if kind == "space":
+                    shift += extra_per_space
+                    if run_props.get("underline"):
+                        ops.append(("line", draw_x, baseline + 1.5, draw_x + item_w + extra_per_space, baseline + 1.5, 0.5))
+                elif kind == "word":
+                    ops.append(("text", draw_x, baseline, value, run_props))
+                    if run_props.get("underline"):
+                        ops.append(("line", draw_x, baseline + 1.5, draw_x + item_w, baseline + 1.5, 0.5))
+                elif kind == "image":
+                    data, image_w, image_h = value
+                    ops.append(("image", draw_x, baseline - image_h, image_w, image_h, data))
+            y += line_height
+
+        y += props.get("after", 0) * TWIP
+        return y, ops
+
+    def _line_height(self, props, natural):
+        line = props.get("line")
+        rule = props.get("line_rule", "auto")
+        if line is None:
+            return natural
+        if rule == "exact":
+            return line * TWIP
+        if rule == "atLeast":
+            return max(natural, line * TWIP)
+        return natural * line / 240.0
+
+    def _next_tab(self, x, tab_stops, available):
+        for position, kind in tab_stops:
+            if position > x + 0.5:
+                return min(position, available)
+        interval = self.document.default_tab * TWIP
+        return min((int(x / interval) + 1) * interval, available)
+
+    def table(self, table, width):
+        col_widths = table.col_widths or [width]
+        cell_margin = 108 * TWIP
+        ops = []
+        y = 0.0
+        borders = table.borders
+        row_count = len(table.rows)
+        table_width = sum(col_widths)
+        for row_index, cells in enumerate(table.rows):
+            row_ops = []
+            row_height = 0.0
+            x = 0.0
+            column = 0
+            cell_edges = [0.0]
+            for span, blocks in cells:
+                cell_width = sum(col_widths[column:column + span]) or width
+                height, cell_ops = self.blocks(blocks, max(cell_width - 2 * cell_margin, 1.0))
+                row_ops.extend(_shift(cell_ops, x + cell_margin, 0))
+                row_height = max(row_height, height)
+                x += cell_width
+                column += span
+                cell_edges.append(x)
+            ops.extend(_shift(row_ops, 0, y))
+
+            top = borders.get("top") if row_index == 0 else borders.get("insideH")
+            if top:
+                ops.append(("line", 0, y, table_width, y, top))
+            if row_index == row_count - 1 and borders.get("bottom"):
+                ops.append(("line", 0, y + row_height, table_width, y + row_height, borders["bottom"]))
+            for edge_index, edge in enumerate(cell_edges):
+                if edge_index == 0:
+                    side = borders.get("left")
+                elif edge_index == len(cell_edges) - 1:
+                    side = borders.get("right")
+                else:
+                    side = borders.get("insideV")
+                if side:
+                    ops.append(("line", edge, y, edge, y + row_height, side))
+            y += row_height
+        return y, ops
+
+
+def _shift(ops, dx, dy):
+    shifted = []
+    for op in ops:
+        if op[0] == "text":
+            shifted.append(("text", op[1] + dx, op[2] + dy, op[3], op[4]))
+        elif op[0] == "image":
+            shifted.append(("image", op[1] + dx, op[2] + dy, op[3], op[4], op[5]))
+        else:
+            shifted.append(("line", op[1] + dx, op[2] + dy, op[3] + dx, op[4] + dy, op[5]))
+    return shifted
+
+
+def _draw(pdf, fonts, ops, dx, dy):
+    for op in ops:
+        if op[0] == "text":
+            _, x, y, text, props = op
+            fonts.use(props, text)
+            color = props.get("color")
+            if color and len(color) == 6:
+                pdf.set_text_color(int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16))
+            else:
+                pdf.set_text_color(0, 0, 0)
+            pdf.text(x + dx, y + dy, text)
+        elif op[0] == "image":
+            _, x, y, w, h, data = op
+            pdf.image(io.BytesIO(data), x + dx, y + dy, w, h)
+        else:
+            _, x1, y1, x2, y2, line_width = op
+            pdf.set_line_width(line_width)
+            pdf.line(x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+
+
+def new_pdf():
+    pdf = FPDF(unit="pt")
+    pdf.set_auto_page_break(False)
+    pdf.set_creator("Quittungs-Generator")
+    return pdf, _Fonts(pdf)
+
+
+def layout_docx(pdf, fonts, source):
+    """
+    Setzt die befüllte Quittung `source` (Pfad oder Datei-Objekt); gemessen wird
+    mit den Schriften von `pdf`. Ergebnis: Seiten als (Breite, Höhe, [(Zeichenbefehle,
+    dx, dy), ...]), die draw_pages() in beliebig viele PDFs zeichnen kann.
+    """
+    document = _Document(source)
+    layout = _Layout(pdf, fonts, document)
+    text_width = document.page_width - document.margin_left - document.margin_right
+
+    _, header_ops = layout.blocks(document.header, text_width)
+    footer_height, footer_ops = layout.blocks(document.footer, text_width)
+    body_bottom = document.page_height - document.margin_bottom
+    footer_top = document.page_height - document.footer_distance - footer_height
+    pages = []
+
+    def new_page():
+        pages.append((document.page_width, document.page_height, [
+            (header_ops, document.margin_left, document.header_distance),
+            (footer_ops, document.margin_left, footer_top),
+        ]))
+
+    new_page()
+    y = document.margin_top
+    for block in document.body:
+        if block is _SECTION_BREAK:
+            new_page()
+            y = document.margin_top
+            continue
+        height, ops = layout.blocks([block], text_width)
+        if y + height > body_bottom and y > document.margin_top:
+            new_page()
+            y = document.margin_top
+        pages[-1][2].append((ops, document.margin_left, y))
+        y += height
+    return pages
+
+
+def draw_pages(pdf, fonts, pages):
+    for width, height, draws in pages:
+        pdf.add_page(format=(width, height))
+        for ops, dx, dy in draws:
+            _draw(pdf, fonts, ops, dx, dy)
+
+
+def render_docx(pdf, fonts, source):
+    """Hängt die Seiten der befüllten Quittung `source` (Pfad oder Datei-Objekt) an `pdf` an."""
+    draw_pages(pdf, fonts, layout_docx(pdf, fonts, source))
+
+
+class NativeBackend:
+    name = "native"
+    label = "Integriert (ohne Word)"
+    parallel_safe = True
+    missing_packages_hint = "pip install fpdf2 pypdf"
+    # Teil der Schlüssel im PDF-Cache (quittungen.pdf.cache); erhöhen, wenn sich die Ausgabe des Renderers ändert
+    cache_version = 1
+
+    @classmethod
+    def is_available(cls):
+        if not HAS_FPDF:
+            return False
+        try:
+            import pypdf  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def convert(self, class_folder, docx_files):
+        pdf_files = []
+        for docx_file in docx_files:
+            pdf, fonts = new_pdf()
+            render_docx(pdf, fonts, os.path.join(class_folder, docx_file))
+            pdf_file = os.path.splitext(docx_file)[0] + ".pdf"
+            pdf.output(os.path.join(class_folder, pdf_file))
+            pdf_files.append(pdf_file)
+        return pdf_files
+
+    def build_class(self, class_folder, docx_files, final_pdf_path, single_pdfs=False, stage_times=None,
+                    is_cancelled=None, cache=None):
+        """
+        Zeichnet die Quittungen der Klasse in ein gemeinsames fpdf2-Dokument: Schriften
+        werden einmal eingebettet, das Logo über den Bild-Cache von fpdf2 nur einmal
+        gespeichert. fpdf2 kann ein Dokument nur als Ganzes schreiben (und verändert
+        dabei die geladenen Schriften); große Klassen werden deshalb in Teilen zu je
+        CHUNK_RECEIPTS Quittungen gezeichnet und über PdfStreamWriter sofort in die
+        Datei geschrieben. So bleibt der Speicherbedarf begrenzt; jeder weitere Teil
+        bringt nur seine eigenen Schrift-Teilmengen mit.
+
+        Mit single_pdfs wird jede Quittung nur einmal gesetzt und in beide PDFs gezeichnet.
+        cache: nur das Sammel-PDF wird zwischengespeichert (in build_class_pdf), siehe quittungen.pdf.cache
+        """
+        stage_times = stage_times if stage_times is not None else StageTimes()
+        is_cancelled = is_cancelled or (lambda: False)
+        chunks = [docx_files[i:i + CHUNK_RECEIPTS] for i in range(0, len(docx_files), CHUNK_RECEIPTS)]
+        writer = PdfStreamWriter(final_pdf_path) if len(chunks) > 1 else None
+        single_paths = []
+        finished = False
+        try:
+            for chunk in chunks:
+                pdf, fonts = new_pdf()
+                with stage_times.measure(STAGE_PDF_CONVERT, len(chunk)):
+                    for docx_file in chunk:
+                        # Abbruch zwischen zwei Dateien; die Klasse bleibt dann ohne Sammel-PDF
+                        if is_cancelled():
+                            return None
+                        pages = layout_docx(pdf, fonts, os.path.join(class_folder, docx_file))
+                        draw_pages(pdf, fonts, pages)
+                        if single_pdfs:
+                            single_pdf, single_fonts = new_pdf()
+                            draw_pages(single_pdf, single_fonts, pages)
+                            single_paths.append(os.path.join(class_folder, os.path.splitext(docx_file)[0] + ".pdf"))
+                            single_pdf.output(single_paths[-1])
+                with stage_times.measure(STAGE_PDF_MERGE, 1):
+                    if writer is None:
+                        pdf.output(final_pdf_path)
+                    else:
+                        writer.add_pdf(io.BytesIO(pdf.output()))
+            if writer is not None:
+                with stage_times.measure(STAGE_PDF_MERGE):
+                    writer.close()
+            finished = True
+        finally:
+            if not finished:
+                if writer is not None:
+                    writer.abort()
+                for path in single_paths:
+                    os.remove(path)
+        return final_pdf_path
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+PDF-Erzeugung über Microsoft Word (COM, pywin32). Nur unter Windows mit
+installiertem Word; es kann immer nur eine Word-Instanz gleichzeitig arbeiten.
+
+Word wird einmal pro open() gestartet und wandelt die Dateien einzeln um, so
+dass ein Abbruch nach der aktuellen Datei greift statt erst nach der Klasse.
+"""
+
+import os
+import time
+
+from ..stages import STAGE_PDF_CACHE, STAGE_PDF_CONVERT, STAGE_PDF_MERGE, StageTimes
+from .merge import merge_pdf_files
+
+# Word.WdSaveFormat.wdFormatPDF bzw. WdSaveOptions.wdDoNotSaveChanges
+_WD_FORMAT_PDF = 17
+_WD_DO_NOT_SAVE = 0
+
+
+class WordComBackend:
+    name = "word"
+    label = "Microsoft Word (COM)"
+    parallel_safe = False
+    missing_packages_hint = "pip install pywin32 pypdf"
+    # Teil der Schlüssel im PDF-Cache (quittungen.pdf.cache); erhöhen, wenn sich die Umwandlung ändert
+    cache_version = 1
+
+    def __init__(self):
+        self._word = None
+
+    @classmethod
+    def is_available(cls):
+        try:
+            import pypdf  # noqa: F401
+            import pythoncom  # noqa: F401
+            import win32com.client  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def open(self):
+        import pythoncom
+        pythoncom.CoInitialize()
+
+    def close(self):
+        import pythoncom
+        if self._word is not None:
+            try:
+                self._word.Quit()
+            finally:
+                self._word = None
+        pythoncom.CoUninitialize()
+
+    def _application(self):
+        if self._word is None:
+            import win32com.client
+
+            # Eigene, unsichtbare Instanz, damit geöffnete Dokumente des Benutzers unberührt bleiben
+            self._word = win32com.client.DispatchEx("Word.Application")
+            self._word.Visible = False
+            self._word.DisplayAlerts = 0
+        return self._word
+
+    def convert(self, class_folder, docx_files, is_cancelled=None, cache=None):
+        """
+        Gibt die Einzel-PDFs zurück; nach einem Abbruch None. Nach einem Abbruch
+        oder Fehler werden die bereits erzeugten PDFs gelöscht. Mit cache werden
+        die PDFs im PDF-Cache abgelegt.
+        """
+        is_cancelled = is_cancelled or (lambda: False)
+        word = self._application()
+        pdf_files = []
+        finished = False
+        try:
+            for docx_file in docx_files:
+                if is_cancelled():
+                    return None
+                pdf_file = os.path.splitext(docx_file)[0] + ".pdf"
+                docx_path = os.path.join(class_folder, docx_file)
+                pdf_path = os.path.join(class_folder, pdf_file)
+                # Vor SaveAs eintragen: auch ein halb geschriebenes PDF wird wieder gelöscht
+                pdf_files.append(pdf_file)
+                document = word.Documents.Open(os.path.abspath(docx_path), ReadOnly=True)
+                try:
+                    document.SaveAs(os.path.abspath(pdf_path), FileFormat=_WD_FORMAT_PDF)
+                finally:
+                    document.Close(_WD_DO_NOT_SAVE)
+                if cache is not None:
+                    cache.store(cache.key(self, cache.digest(docx_path)), pdf_path)
+            finished = True
+            return pdf_files
+        finally:
+            if not finished:
+                _remove_pdfs(class_folder, pdf_files)
+
+    def _fetch_cached(self, class_folder, docx_files, cache):
+        # Einzel-PDFs unveränderter Quittungen aus dem Cache; Rückgabe: {Word-Datei: PDF-Datei}
+        cached = {}
+        for docx_file in docx_files:
+            pdf_file = os.path.splitext(docx_file)[0] + ".pdf"
+            key = cache.key(self, cache.digest(os.path.join(class_folder, docx_file)))
+            if cache.fetch(key, os.path.join(class_folder, pdf_file)):
+                cached[docx_file] = pdf_file
+        return cached
+
+    def build_class(self, class_folder, docx_files, final_pdf_path, single_pdfs=False, stage_times=None,
+                    is_cancelled=None, cache=None):
+        stage_times = stage_times if stage_times is not None else StageTimes()
+        cached = {}
+        if cache is not None:
+            start = time.perf_counter()
+            cached = self._fetch_cached(class_folder, docx_files, cache)
+            stage_times.add(STAGE_PDF_CACHE, time.perf_counter() - start, len(cached))
+        missing = [f for f in docx_files if f not in cached]
+        converted = []
+        pdf_files = list(cached.values())
+        finished = False
+        try:
+            if missing:
+                # Sind alle Quittungen im Cache, wird Word gar nicht erst gestartet
+                with stage_times.measure(STAGE_PDF_CONVERT, len(missing)):
+                    converted = self.convert(class_folder, missing, is_cancelled, cache)
+            if converted is None:
+                return None
+            converted = dict(zip(missing, converted))
+            pdf_files = [cached.get(f) or converted[f] for f in docx_files]
+            paths = [os.path.join(class_folder, f) for f in pdf_files]
+            with stage_times.measure(STAGE_PDF_MERGE, 1):
+                merge_pdf_files(paths, final_pdf_path, remove_sources=not single_pdfs)
+            finished = True
+            return final_pdf_path
+        finally:
+            if not finished:
+                # Abbruch oder Fehler (Word, Zusammenfügen): keine Einzel-PDFs im Klassenordner zurücklassen
+                _remove_pdfs(class_folder, pdf_files)
+
+
+def _remove_pdfs(class_folder, pdf_files):
+    for pdf_file in pdf_files:
+        try:
+            os.remove(os.path.join(class_folder, pdf_file))
+        except FileNotFoundError:
+            pass
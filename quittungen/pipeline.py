@@ -0,0 +1,711 @@
+# -*- coding: utf-8 -*-
+"""
+Quittungs-Erstellung ohne GUI.
+
+Die beiden Phasen (Word-Quittungen erzeugen, PDFs je Klasse zusammenfassen)
+können aus der GUI, von der Kommandozeile (python -m quittungen) oder aus
+eigenen Skripten aufgerufen werden. Fortschritt wird über einen Callback
+gemeldet, ein Abbruch über ein Objekt mit is_set() (z.B. threading.Event).
+"""
+
+import os
+import time
+from collections import namedtuple
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from .filecache import FileCache
+
+ProgressEvent = namedtuple("ProgressEvent", ["phase", "current", "total", "message"])
+
+PHASE_WORD = "word"
+PHASE_PDF = "pdf"
+PHASE_ALL = "all"
+
+
+@dataclass
+class Report:
+    receipts: int = 0
+    classes: int = 0
+    docx_files: int = 0
+    pdf_files: int = 0
+    summary_file: str = None
+    # Inkrementeller Modus: unveränderte Quittungen (Schritt 1) bzw. Klassen (Schritt 2)
+    unchanged: int = 0
+    removed: int = 0
+    stale_classes: list = field(default_factory=list)
+    # Schritt 1 mit class_documents=True: geschriebene Word-Dateien pro Klasse
+    class_documents: int = 0
+    errors: list = field(default_factory=list)
+    cancelled: bool = False
+    # Laufzeit und Anzahl je Verarbeitungsstufe, siehe quittungen.stages
+    stages: dict = field(default_factory=dict)
+    # Pfad des Laufberichts (JSON), siehe quittungen.runreport
+    run_report: str = None
+    # Schritt 1: gefundene doppelte Familien {emails, reasons, merged, children}, siehe quittungen.duplicates
+    duplicates: list = field(default_factory=list)
+    # Schritt 2: Word-Dateien, deren PDF aus dem PDF-Cache übernommen wurde (quittungen.pdf.cache)
+    pdf_cached: int = 0
+
+
+class _NeverCancelled:
+    def is_set(self):
+        return False
+
+
+def _emit(progress, phase, current, total, message):
+    if progress is not None:
+        progress(ProgressEvent(phase, current, total, message))
+
+
+def pdf_tools_available(backend=None):
+    from .pdf import default_backend_name, get_backend
+
+    return get_backend(backend or default_backend_name()).is_available()
+
+
+def _pdf_cache(pdf_cache):
+    # True: Cache im Standardordner, False/None: ohne Cache, sonst ein PdfCache-Objekt
+    from .pdf.cache import PdfCache
+
+    if pdf_cache is True:
+        return PdfCache()
+    return pdf_cache or None
+
+
+def _pdf_cache_setting(pdf_cache):
+    return pdf_cache.directory if pdf_cache is not None else None
+
+
+def _run_step(target, title, output_dir, profile, run_report, settings, **kwargs):
+    from .runreport import run_instrumented
+
+    return run_instrumented(target, output_dir, title, profile=profile, run_report=run_report,
+                            settings=settings, **kwargs)
+
+
+def load_prices(filepath):
+    """Gebühren je Kind, Mitgliedsbeitrag und Schuljahr aus der Preisliste (prozessweit zwischengespeichert)."""
+    return _PRICES.get(filepath)
+
+
+def _read_prices(filepath):
+    from .formatting import prepare_amounts
+    from .roster import read_records
+
+    fee_rows = read_records(filepath, 'Gebuehren', ('Kind_Nr', 'Betrag'))
+    child_fees = {row['Kind_Nr']: row['Betrag'] for row in fee_rows}
+
+    contributions = read_records(filepath, 'Beitraege', ('Posten', 'Betrag'))
+    membership_fee = next((row['Betrag'] for row in contributions if row['Posten'] == 'Mitgliedsbeitrag'), None)
+    if membership_fee is None:
+        raise ValueError("In der Preisliste fehlt der Posten 'Mitgliedsbeitrag' (Blatt 'Beitraege').")
+
+    config = read_records(filepath, 'Konfiguration', ('Eigenschaft', 'Wert'))
+    school_year = next((row['Wert'] for row in config if row['Eigenschaft'] == 'Schuljahr'), None)
+    if school_year is None:
+        raise ValueError("In der Preisliste fehlt die Eigenschaft 'Schuljahr' (Blatt 'Konfiguration').")
+
+    prepare_amounts(child_fees, float(membership_fee))
+    return child_fees, float(membership_fee), str(school_year)
+
+
+_PRICES = FileCache(_read_prices)
+
+
+# ==========================================
+# PHASE 1: WORD-DOKUMENTE GENERIEREN
+# ==========================================
+def generate_receipts(excel_path, prices_path, template_path, output_dir, workers=1,
+                      incremental=False, progress=None, cancel=None, stage_times=None,
+                      class_documents=False, family_files=True, profile=None, run_report=True,
+                      duplicates="report"):
+    """
+    Erstellt die Word-Quittungen. Mit family_files entsteht eine Datei pro
+    Familie, mit class_documents zusätzlich (oder stattdessen) eine Datei pro
+    Klasse mit allen Quittungen der Klasse, die Schritt 2 in einem Zug umwandelt.
+
+    Vorher wird die Schülerliste auf doppelte Familien geprüft (quittungen.duplicates):
+    duplicates="report" meldet sie als Warnung, "merge" führt eindeutige Fälle
+    zusammen, "off" prüft nicht.
+
+    Mit run_report wird ein Laufbericht in output_dir geschrieben, profile
+    ("cpu" oder "memory") zeichnet den Lauf zusätzlich auf (quittungen.runreport).
+    """
+    settings = {"workers": workers, "incremental": incremental,
+                "class_documents": class_documents, "family_files": family_files, "profile": profile,
+                "duplicates": duplicates}
+    return _run_step(_generate_receipts, "Word", output_dir, profile, run_report, settings,
+                     excel_path=excel_path, prices_path=prices_path, template_path=template_path,
+                     workers=workers, incremental=incremental, progress=progress, cancel=cancel,
+                     stage_times=stage_times, class_documents=class_documents, family_files=family_files,
+                     duplicates=duplicates)
+
+
+def _generate_receipts(excel_path, prices_path, template_path, output_dir, workers, incremental,
+                       progress, cancel, stage_times, class_documents, family_files, duplicates="report",
+                       on_class_ready=None, manifest=None):
+    # on_class_ready(Klassenordner, geändert) meldet Klassen, deren Word-Dateien fertig sind (siehe generate_all)
+    from .duplicates import MODE_MERGE, MODE_OFF, describe, find_duplicates, merge_duplicates
+    from .families import aggregate_families
+    from .formatting import euro_words, format_euro
+    from .manifest import Manifest, file_hash, values_hash
+    from .pdf.classes import class_docx_path
+    from .rendering import ClassJob, ReceiptJob, render_receipts
+    from .roster import read_roster
+    from .stages import (STAGE_DUPLICATES, STAGE_EXCEL_LOAD, STAGE_GROUPING, STAGE_PRICES_LOAD, STAGE_ROSTER_READ,
+                         STAGE_SUMMARY, STAGE_TEMPLATE_CHECK, STAGE_WORD_DOCUMENTS)
+    from .summary import SummaryWorkbook
+    from .templatecheck import validate_template
+
+    if not (class_documents or family_files):
+        raise ValueError("Es muss mindestens eine Word-Ausgabe (pro Familie oder pro Klasse) gewählt sein.")
+
+    cancel = cancel or _NeverCancelled()
+    report = Report()
+    class_folders = set()
+    quittungs_nr = 1
+
+    # Eine fehlerhafte Vorlage bricht sofort ab, nicht erst nach dem Rendern aller Quittungen
+    with stage_times.measure(STAGE_TEMPLATE_CHECK):
+        template_hash = file_hash(template_path)
+        template_check = validate_template(template_path, class_documents, template_hash)
+
+    stage_times.begin(STAGE_EXCEL_LOAD)
+    with stage_times.measure(STAGE_PRICES_LOAD):
+        child_fees, membership_fee, school_year = load_prices(prices_path)
+
+    # Im inkrementellen Modus behalten bekannte Familien ihre Quittungsnummer
+    # und nur Quittungen mit geänderten Werten werden neu geschrieben. Nach
+    # einem Abbruch setzt er den Lauf fort (siehe quittungen.manifest).
+    if manifest is None:
+        manifest = Manifest.load(output_dir) if incremental else Manifest(output_dir)
+    if incremental:
+        quittungs_nr = manifest.next_number()
+    # Auch ohne "inkrementell" behalten unveränderte Quittungen ihr Datum aus dem letzten Lauf
+    previous = manifest if incremental else Manifest.load(output_dir)
+
+    with stage_times.measure(STAGE_ROSTER_READ):
+        rows = list(read_roster(excel_path))
+    stage_times.set_items(STAGE_ROSTER_READ, len(rows))
+    stage_times.end(STAGE_EXCEL_LOAD, len(rows))
+
+    # Doppelte Familien vor dem Gruppieren melden bzw. zusammenführen
+    duplicate_warnings = []
+    if duplicates != MODE_OFF:
+        with stage_times.measure(STAGE_DUPLICATES):
+            duplicate_groups = find_duplicates(rows)
+            if duplicates == MODE_MERGE:
+                rows = merge_duplicates(rows, duplicate_groups)
+        for group in duplicate_groups:
+            merged = duplicates == MODE_MERGE and group.merge
+            report.duplicates.append({"emails": group.emails, "reasons": group.reasons, "merged": merged,
+                                      "children": list(group.children)})
+            duplicate_warnings.append(describe(group, merged))
+
+    stage_times.begin(STAGE_GROUPING)
+    families, report.errors = aggregate_families(rows, child_fees, membership_fee)
+    report.errors.extend(template_check.warnings())
+    report.errors.extend(duplicate_warnings)
+    membership_text = format_euro(membership_fee)
+    membership_words = euro_words(membership_fee)
+
+    total_parents = len(families)
+
+    _emit(progress, PHASE_WORD, 0, total_parents, f"Bereite {total_parents} Word-Quittungen vor...")
+
+    # Schritt A: Nummern, Ordner und Übersichtszeilen vorab festlegen,
+    # damit die Ausgabe nicht von der Render-Reihenfolge abhängt.
+    jobs = []
+    summary_rows = {}
+    manifest_records = {}
+    planned_numbers = {}
+    # Klassenordner -> [(Quittungsnummer, E-Mail, Ersetzungen)] für die Word-Datei pro Klasse
+    class_members = {}
+    # Word-Datei pro Klasse -> E-Mails ihrer Familien
+    class_job_members = {}
+
+    for family in families:
+        if cancel.is_set():
+            break
+
+        parent_email = family.email
+        try:
+            parent_full_name = family.parent_name
+            klasse = family.klasse
+            safe_klasse = klasse.replace("/", "_").replace("\\", "_")
+
+            if incremental and parent_email in manifest.families:
+                receipt_nr = manifest.families[parent_email]["nr"]
+            elif incremental and parent_email in manifest.planned:
+                # Im abgebrochenen Lauf vergeben, aber noch nicht geschrieben
+                receipt_nr = manifest.planned[parent_email]
+            else:
+                receipt_nr = quittungs_nr
+                quittungs_nr += 1
+            planned_numbers[parent_email] = receipt_nr
+            eindeutige_nummer = f"{receipt_nr:03d}"
+
+            # Schlüssel siehe templatecheck.RECEIPT_PLACEHOLDERS
+            replacements = {
+                "{{ELTERN_NAME}}": parent_full_name,
+                "{{KINDER_NAMEN}}": family.children_names,
+                "{{NR}}": eindeutige_nummer,
+                "{{DATUM}}": datetime.now().strftime("%d.%m.%Y"),
+                "{{SCHULJAHR}}": str(school_year),
+                "{{BETRAG_GEBUEHR}}": family.school_fee_text,
+                "{{GESAMTBETRAG}}": family.total_amount_text,
+                "{{BETRAG_GEBUEHR_WORT}}": family.school_fee_words,
+                "{{GESAMTBETRAG_WORT}}": family.total_amount_words,
+                "{{BETRAG_MITGLIED}}": membership_text,
+                "{{BETRAG_MITGLIED_WORT}}": membership_words,
+            }
+
+            outdir_class = os.path.join(output_dir, safe_klasse)
+
+            if not os.path.exists(outdir_class):
+                os.makedirs(outdir_class)
+            class_folders.add(outdir_class)
+
+            safe_parent_name = parent_full_name.replace(" ", "_").replace("/", "_")
+
+            jahr_erstellung = datetime.now().strftime("%Y")
+            dateiname = f"{jahr_erstellung}_Quittung_{eindeutige_nummer}_{safe_parent_name}.docx"
+            output_filename = os.path.join(outdir_class, dateiname)
+
+            replacements = {k: str(v) for k, v in replacements.items()}
+            hash_value = values_hash(replacements)
+            issued = previous.issued_date(parent_email, template_hash, hash_value)
+            if issued is not None:
+                replacements["{{DATUM}}"] = issued
+            if incremental and manifest.is_current(parent_email, template_hash, hash_value, output_filename,
+                                                   require_file=family_files):
+                report.unchanged += 1
+            else:
+                if family_files:
+                    jobs.append(ReceiptJob(parent_email, replacements, output_filename))
+                manifest_records[parent_email] = (receipt_nr, template_hash, hash_value, output_filename, safe_klasse,
+                                                  replacements["{{DATUM}}"])
+            class_members.setdefault(outdir_class, []).append((receipt_nr, parent_email, replacements))
+
+            summary_rows[parent_email] = {
+                'Quittung Nr.': eindeutige_nummer,
+                'Eltern 1 - Name': parent_full_name,
+                'Eltern 1 - Emailadresse': parent_email,
+                'In Klasse': klasse,
+                'Rechnungsbeitrag (€)': family.total_amount,
+                'Namen aller Kinder': family.children_names
+            }
+
+        except Exception as e:
+            report.errors.append(f"Mitglied: '{parent_email}'\nGrund: Unerwarteter Fehler -> {e}")
+            continue
+
+    planning_complete = not cancel.is_set()
+
+    # Klassen, deren Inhalt sich geändert hat (neue, geänderte, umgezogene oder entfernte Familien)
+    touched_classes = set()
+    for key, record in manifest_records.items():
+        touched_classes.add(record[4])
+        if key in manifest.families:
+            touched_classes.add(manifest.families[key]["klasse"])
+    if planning_complete:
+        touched_classes.update(entry["klasse"] for key, entry in manifest.families.items() if key not in summary_rows)
+        report.removed = len(manifest.remove_missing(summary_rows))
+
+    class_jobs = {}
+    if planning_complete:
+        for klasse_name in touched_classes:
+            outdir_class = os.path.join(output_dir, klasse_name)
+            combined_path = class_docx_path(outdir_class)
+            # Ohne Datei pro Klasse würde eine alte Klassen-Datei in Schritt 2 die Einzeldateien verdecken
+            if os.path.exists(combined_path) and (not class_documents or outdir_class not in class_members):
+                os.remove(combined_path)
+        if class_documents:
+            for outdir_class, members in sorted(class_members.items()):
+                combined_path = class_docx_path(outdir_class)
+                if incremental and os.path.basename(outdir_class) not in touched_classes and os.path.exists(combined_path):
+                    continue
+                members.sort(key=lambda member: member[0])
+                class_jobs[combined_path] = ClassJob(combined_path, [member[2] for member in members], combined_path)
+                class_job_members[combined_path] = [parent_email for _, parent_email, _ in members]
+    jobs.extend(class_jobs.values())
+
+    if planning_complete:
+        # Sicherungspunkt: Nummern stehen fest, ab jetzt wird jede fertige Datei sofort eingetragen
+        manifest.planned = planned_numbers
+        manifest.save()
+        manifest.start_journal()
+
+    # Offene Jobs je Klassenordner; eine Klasse ist fertig, wenn alle ihre Dateien geschrieben sind
+    folder_of_job = {job.key: os.path.dirname(job.output_filename) for job in jobs}
+    open_jobs = {}
+    for class_folder in folder_of_job.values():
+        open_jobs[class_folder] = open_jobs.get(class_folder, 0) + 1
+
+    # Übersichtstabelle: jede erstellte Quittung wird sofort angehängt, unveränderte gleich zu Beginn
+    summary = None
+    if planning_complete and summary_rows:
+        jahr_erstellung = datetime.now().strftime("%Y")
+        try:
+            summary = SummaryWorkbook(os.path.join(output_dir, f"{jahr_erstellung}_Quittungen_Uebersicht.xlsx"))
+        except Exception as e:
+            report.errors.append(f"Fehler beim Erstellen der Übersichtstabelle: {e}")
+
+    # Zeilen stehen in der Reihenfolge der Familien, egal in welcher Reihenfolge die Worker fertig
+    # werden: eine fertige Zeile wartet nur, bis alle Quittungen davor fertig oder fehlgeschlagen sind.
+    row_order = list(summary_rows)
+    next_row = 0
+    # Fertige, noch nicht geschriebene Zeilen: True = schreiben, False = übersprungen (Fehler)
+    pending_rows = {}
+
+    def write_summary_row(key):
+        if summary is not None:
+            start = time.perf_counter()
+            summary.add(summary_rows[key])
+            stage_times.add(STAGE_SUMMARY, time.perf_counter() - start, 1)
+
+    def flush_summary_rows():
+        nonlocal next_row
+        while next_row < len(row_order) and row_order[next_row] in pending_rows:
+            if pending_rows.pop(row_order[next_row]):
+                write_summary_row(row_order[next_row])
+            next_row += 1
+
+    def add_summary_row(key):
+        report.receipts += 1
+        pending_rows[key] = True
+        flush_summary_rows()
+
+    def skip_summary_row(key):
+        pending_rows[key] = False
+        flush_summary_rows()
+
+    if planning_complete:
+        for key in summary_rows:
+            if key not in manifest_records:
+                add_summary_row(key)
+
+    # Eine Familie gilt als erstellt, sobald ihre Einzeldatei bzw. (ohne Einzeldateien) ihre Klassen-Datei steht
+    created = set()
+
+    def job_done(key, error):
+        if key in class_jobs:
+            klasse_name = os.path.basename(os.path.dirname(key))
+            if error is None:
+                report.class_documents += 1
+                manifest.mark_class_stale(klasse_name)
+                if not family_files:
+                    for member in class_job_members[key]:
+                        if member in manifest_records:
+                            manifest.record(member, *manifest_records[member])
+                            created.add(member)
+                            add_summary_row(member)
+            else:
+                report.errors.append(f"Word-Datei für Klasse {klasse_name}\n"
+                                     f"Grund: Unerwarteter Fehler -> {error}")
+                if not family_files:
+                    for member in class_job_members[key]:
+                        if member in manifest_records:
+                            skip_summary_row(member)
+        elif error is None:
+            output_filename = manifest_records[key][3]
+            manifest.record(key, *manifest_records[key], size=os.path.getsize(output_filename))
+            created.add(key)
+            add_summary_row(key)
+        else:
+            report.errors.append(f"Mitglied: '{key}'\nGrund: Unerwarteter Fehler -> {error}")
+            skip_summary_row(key)
+
+        class_folder = folder_of_job[key]
+        open_jobs[class_folder] -= 1
+        if open_jobs[class_folder] == 0 and on_class_ready is not None:
+            on_class_ready(class_folder, True)
+
+    stage_times.end(STAGE_GROUPING, len(families))
+
+    if planning_complete and on_class_ready is not None:
+        for class_folder in sorted(class_folders - set(open_jobs)):
+            on_class_ready(class_folder, os.path.basename(class_folder) in touched_classes)
+
+    # Schritt B: Dokumente rendern und speichern (optional in mehreren Prozessen)
+    total_jobs = len(jobs)
+
+    _emit(progress, PHASE_WORD, 0, total_jobs, f"Starte Generierung von {total_jobs} Word-Quittungen...")
+
+    def report_progress(current_progress):
+        _emit(progress, PHASE_WORD, current_progress, total_jobs,
+              f"Erstelle Word-Dokumente... ({current_progress}/{total_jobs})")
+
+    render_results = {}
+    try:
+        if planning_complete:
+            with stage_times.measure(STAGE_WORD_DOCUMENTS):
+                render_results = render_receipts(template_path, jobs, workers=workers,
+                                                 on_progress=report_progress,
+                                                 is_cancelled=cancel.is_set,
+                                                 stage_times=stage_times,
+                                                 on_result=job_done)
+            stage_times.set_items(STAGE_WORD_DOCUMENTS, len(render_results))
+
+        if planning_complete and not cancel.is_set():
+            manifest.planned = {}
+        manifest.save()
+    finally:
+        # Nach einem Abbruch fehlen Quittungen mitten in der Reihenfolge; die fertigen trotzdem übernehmen
+        for key in row_order[next_row:]:
+            if pending_rows.get(key):
+                write_summary_row(key)
+
+        # Auch nach einem Abbruch oder Fehler (z.B. Prozess-Pool) mit allen bis dahin erstellten Quittungen
+        if summary is not None and summary.rows:
+            try:
+                with stage_times.measure(STAGE_SUMMARY):
+                    report.summary_file = summary.close()
+                stage_times.add_bytes(STAGE_SUMMARY, os.path.getsize(report.summary_file))
+            except Exception as e:
+                report.errors.append(f"Fehler beim Erstellen der Übersichtstabelle: {e}")
+
+    report.classes = len(class_folders)
+    report.stale_classes = sorted(manifest.stale_classes)
+    report.stages = stage_times.as_dict()
+
+    if cancel.is_set():
+        report.cancelled = True
+        return report
+
+    _emit(progress, PHASE_WORD, total_jobs, total_jobs, "Word-Generierung abgeschlossen.")
+    return report
+
+
+# ==========================================
+# PHASE 2: PDFS GENERIEREN
+# ==========================================
+def find_class_folders(output_dir):
+    from .pdf.classes import class_docx_files
+
+    class_folders = []
+    total_docx_files = 0
+
+    if os.path.exists(output_dir):
+        for element in os.listdir(output_dir):
+            element_path = os.path.join(output_dir, element)
+            if os.path.isdir(element_path):
+                docx_files = class_docx_files(element_path)
+                if docx_files:
+                    class_folders.append(element_path)
+                    total_docx_files += len(docx_files)
+    return class_folders, total_docx_files
+
+
+def generate_pdfs(output_dir, backend=None, workers=1, incremental=False, single_pdfs=False,
+                  progress=None, cancel=None, stage_times=None, profile=None, run_report=True, pdf_cache=True):
+    """
+    Erstellt die Sammel-PDFs je Klasse. PDFs unveränderter Word-Dateien kommen
+    aus dem PDF-Cache (quittungen.pdf.cache): pdf_cache=True benutzt den
+    Standardordner, False schaltet ihn ab, ein PdfCache-Objekt gibt Ordner und
+    Größe vor.
+    """
+    pdf_cache = _pdf_cache(pdf_cache)
+    settings = {"backend": backend, "workers": workers, "incremental": incremental,
+                "single_pdfs": single_pdfs, "profile": profile, "pdf_cache": _pdf_cache_setting(pdf_cache)}
+    return _run_step(_generate_pdfs, "PDF", output_dir, profile, run_report, settings,
+                     backend=backend, workers=workers, incremental=incremental, single_pdfs=single_pdfs,
+                     progress=progress, cancel=cancel, stage_times=stage_times, pdf_cache=pdf_cache)
+
+
+def _generate_pdfs(output_dir, backend, workers, incremental, single_pdfs, progress, cancel, stage_times,
+                   pdf_cache=None):
+    from .manifest import MANIFEST_NAME, Manifest
+    from .pdf import default_backend_name, get_backend
+    from .pdf.classes import build_class_pdfs, class_pdf_path
+    from .stages import STAGE_PDF_CACHE, STAGE_PDF_CLASSES
+
+    backend_name = backend or default_backend_name()
+    backend_hint = get_backend(backend_name).label
+    cancel = cancel or _NeverCancelled()
+    report = Report()
+    has_manifest = os.path.exists(os.path.join(output_dir, MANIFEST_NAME))
+    manifest = Manifest.load(output_dir)
+    if has_manifest:
+        # Fertige Klassen sofort festhalten, damit ein abgebrochener Lauf inkrementell fortgesetzt werden kann
+        manifest.start_journal()
+
+    try:
+        class_folders, total_docx_files = find_class_folders(output_dir)
+        report.docx_files = total_docx_files
+        if not class_folders:
+            return report
+
+        if incremental and has_manifest:
+            # Nur Klassen neu zusammenfassen, deren Quittungen sich seit dem letzten Lauf geändert haben
+            current_classes = {os.path.basename(folder) for folder in class_folders}
+            for klasse_name in manifest.stale_classes - current_classes:
+                stale_pdf = class_pdf_path(output_dir, klasse_name)
+                if os.path.exists(stale_pdf):
+                    os.remove(stale_pdf)
+                manifest.mark_class_done(klasse_name)
+            stale_folders = [
+                folder for folder in class_folders
+                if os.path.basename(folder) in manifest.stale_classes
+                or not os.path.exists(class_pdf_path(output_dir, os.path.basename(folder)))
+            ]
+            report.unchanged = len(class_folders) - len(stale_folders)
+            class_folders = stale_folders
+
+        anzahl_klassen = len(class_folders)
+        report.classes = anzahl_klassen
+
+        _emit(progress, PHASE_PDF, 0, anzahl_klassen, f"Starte PDF-Konvertierung für {anzahl_klassen} Klassen ({backend_hint})...")
+
+        finished = []
+
+        def class_done(class_folder, final_pdf_path, error):
+            klasse_name = os.path.basename(class_folder)
+            if error is not None:
+                hint = "\n(Ist Microsoft Word geschlossen und bereit?)" if backend_name == "word" else ""
+                report.errors.append(f"Fehler bei PDF-Erstellung für Klasse {klasse_name}: {error}{hint}")
+                return
+            if final_pdf_path:
+                report.pdf_files += 1
+            manifest.mark_class_done(klasse_name)
+            finished.append(klasse_name)
+            _emit(progress, PHASE_PDF, len(finished), anzahl_klassen,
+                  f"Klasse {klasse_name} in PDFs umgewandelt... ({len(finished)}/{anzahl_klassen})")
+
+        with stage_times.measure(STAGE_PDF_CLASSES):
+            build_class_pdfs(backend_name, class_folders, output_dir, workers=workers, single_pdfs=single_pdfs,
+                             on_result=class_done, is_cancelled=cancel.is_set, stage_times=stage_times,
+                             cache=pdf_cache)
+        stage_times.set_items(STAGE_PDF_CLASSES, len(finished))
+        report.pdf_cached = stage_times.items.get(STAGE_PDF_CACHE, 0)
+        report.cancelled = cancel.is_set()
+        if pdf_cache is not None:
+            pdf_cache.prune()
+    finally:
+        if has_manifest:
+            manifest.save()
+        manifest.close()
+
+    report.stale_classes = sorted(manifest.stale_classes)
+    report.stages = stage_times.as_dict()
+    return report
+
+
+# ==========================================
+# PHASE 1 + 2 IN EINEM DURCHLAUF
+# ==========================================
+def generate_all(excel_path, prices_path, template_path, output_dir, backend=None, workers=1,
+                 incremental=False, single_pdfs=False, progress=None, cancel=None, stage_times=None,
+                 class_documents=False, family_files=True, profile=None, run_report=True, duplicates="report",
+                 pdf_cache=True):
+    """
+    Schritt 1 und 2 überlappend: Die Sammel-PDF einer Klasse wird erstellt,
+    sobald ihre letzte Word-Datei geschrieben ist, während Schritt 1 schon die
+    nächsten Klassen rendert. Ohne Möglichkeit, die Word-Dateien vorher zu
+    kontrollieren, aber mit deutlich kürzerer Gesamtzeit. pdf_cache wie bei
+    generate_pdfs().
+    """
+    pdf_cache = _pdf_cache(pdf_cache)
+    settings = {"backend": backend, "workers": workers, "incremental": incremental, "single_pdfs": single_pdfs,
+                "class_documents": class_documents, "family_files": family_files, "profile": profile,
+                "duplicates": duplicates, "pdf_cache": _pdf_cache_setting(pdf_cache)}
+    return _run_step(_generate_all, "Gesamt", output_dir, profile, run_report, settings,
+                     excel_path=excel_path, prices_path=prices_path, template_path=template_path,
+                     backend=backend, workers=workers, incremental=incremental, single_pdfs=single_pdfs,
+                     progress=progress, cancel=cancel, stage_times=stage_times,
+                     class_documents=class_documents, family_files=family_files, duplicates=duplicates,
+                     pdf_cache=pdf_cache)
+
+
+def _generate_all(excel_path, prices_path, template_path, output_dir, backend, workers, incremental, single_pdfs,
+                  progress, cancel, stage_times, class_documents, family_files, duplicates, pdf_cache=None):
+    import threading
+
+    from .manifest import Manifest
+    from .pdf import default_backend_name
+    from .pdf.classes import ClassPdfQueue, class_pdf_path
+    from .stages import STAGE_PDF_CACHE, STAGE_PDF_CLASSES
+
+    backend_name = backend or default_backend_name()
+    cancel = cancel or _NeverCancelled()
+    # Schritt 1 und die PDF-Umwandlung tragen in dasselbe Manifest ein, damit ein
+    # abgebrochener Lauf auch die schon fertigen Sammel-PDFs kennt
+    manifest = Manifest.load(output_dir) if incremental else Manifest(output_dir)
+    previous_stale = set(manifest.stale_classes)
+    lock = threading.Lock()
+    state = {"word_current": 0, "word_total": 0, "queued": 0}
+    finished = []
+    pdf_errors = []
+
+    # Word- und PDF-Fortschritt kommen aus zwei Threads und werden zu einer Anzeige zusammengefasst
+    def emit(message):
+        current = state["word_current"] + len(finished)
+        total = state["word_total"] + max(state["queued"], len(finished))
+        _emit(progress, PHASE_ALL, current, total, message)
+
+    def word_progress(event):
+        with lock:
+            state["word_current"], state["word_total"] = event.current, event.total
+            emit(event.message)
+
+    def class_done(class_folder, final_pdf_path, error):
+        klasse_name = os.path.basename(class_folder)
+        with lock:
+            if error is not None:
+                hint = "\n(Ist Microsoft Word geschlossen und bereit?)" if backend_name == "word" else ""
+                pdf_errors.append(f"Fehler bei PDF-Erstellung für Klasse {klasse_name}: {error}{hint}")
+                return
+            finished.append((klasse_name, final_pdf_path))
+            manifest.mark_class_done(klasse_name)
+            emit(f"Klasse {klasse_name} in PDFs umgewandelt... ({len(finished)} Klassen)")
+
+    pdf_queue = ClassPdfQueue(backend_name, output_dir, single_pdfs, on_result=class_done, is_cancelled=cancel.is_set,
+                              cache=pdf_cache)
+
+    def class_ready(class_folder, changed):
+        klasse_name = os.path.basename(class_folder)
+        if (changed or not incremental or klasse_name in previous_stale
+                or not os.path.exists(class_pdf_path(output_dir, klasse_name))):
+            with lock:
+                state["queued"] += 1
+            # Blockiert, solange die Umwandlung im Rückstand ist
+            pdf_queue.put(class_folder)
+
+    pdf_queue.start()
+    try:
+        with stage_times.measure(STAGE_PDF_CLASSES):
+            try:
+                report = _generate_receipts(excel_path, prices_path, template_path, output_dir, workers, incremental,
+                                            word_progress, cancel, stage_times, class_documents, family_files,
+                                            duplicates, on_class_ready=class_ready, manifest=manifest)
+            finally:
+                pdf_queue.finish()
+    finally:
+        stage_times.merge(pdf_queue.stage_times.export())
+    stage_times.set_items(STAGE_PDF_CLASSES, len(finished))
+
+    # Sammel-PDFs entfernter Klassen löschen
+    if not cancel.is_set():
+        class_folders, report.docx_files = find_class_folders(output_dir)
+        current_classes = {os.path.basename(folder) for folder in class_folders}
+        for klasse_name in manifest.stale_classes - current_classes:
+            stale_pdf = class_pdf_path(output_dir, klasse_name)
+            if os.path.exists(stale_pdf):
+                os.remove(stale_pdf)
+            manifest.mark_class_done(klasse_name)
+    manifest.save()
+    manifest.close()
+
+    if pdf_cache is not None:
+        pdf_cache.prune()
+
+    report.pdf_files = sum(1 for _, final_pdf_path in finished if final_pdf_path)
+    report.pdf_cached = stage_times.items.get(STAGE_PDF_CACHE, 0)
+    report.errors.extend(pdf_errors)
+    report.stale_classes = sorted(manifest.stale_classes)
+    report.cancelled = cancel.is_set()
+    report.stages = stage_times.as_dict()
+    if not report.cancelled:
+        _emit(progress, PHASE_ALL, 1, 1, "Word-Dateien und Sammel-PDFs fertig.")
+    return report
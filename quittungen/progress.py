@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Fortschritt aus Worker-Threads gesammelt an eine Oberfläche übergeben.
+
+Die Pipeline meldet Fortschritt bei jeder Quittung. Würde jede Meldung
+sofort in den Tk-Thread gereicht (root.after), liefe dessen Warteschlange bei
+tausenden Familien mit winzigen Aufrufen voll und das Fenster ruckelt.
+ProgressChannel nimmt die Meldungen stattdessen nur entgegen (report() ist
+ein einfacher Zugriff unter einer Sperre); die Oberfläche ruft poll() in
+festem Takt auf und bekommt je Bild nur den neuesten Stand - mit Durchsatz
+und geschätzter Restzeit - sowie die seitdem angemeldeten Aufrufe (z.B.
+Abschlussmeldungen), die im GUI-Thread auszuführen sind.
+
+Laufen mehrere Aufträge gleichzeitig (Stapel, source = Auftragsname), wird
+der neueste Stand je Auftrag gehalten und gemessen; poll() liefert dann die
+Summe über alle Aufträge, mit der Meldung des zuletzt gemeldeten.
+"""
+
+import threading
+import time
+from collections import deque, namedtuple
+
+# rate: erledigte Einheiten pro Sekunde (None, solange es zu wenige Messpunkte gibt);
+# eta: geschätzte Restzeit in Sekunden (None, wenn unbekannt)
+ProgressSnapshot = namedtuple("ProgressSnapshot", ["phase", "current", "total", "message", "rate", "eta"])
+
+# Phase der Pipeline -> Einheit in der Anzeige
+UNITS = {"word": "Quittungen", "pdf": "Klassen", "all": "Schritte"}
+
+# Durchsatz über die letzten Sekunden, damit er einer Änderung (z.B. Word-Start) schnell folgt
+_WINDOW_SECONDS = 10.0
+_MIN_SPAN_SECONDS = 0.5
+
+
+class ThroughputMeter:
+    """Durchsatz und Restzeit aus (Zeit, Stand)-Messpunkten eines gleitenden Fensters."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._samples = deque()
+        self._phase = None
+
+    def update(self, phase, current, total):
+        now = self._clock()
+        # Neue Phase oder zurückgesetzter Zähler: alte Messpunkte passen nicht mehr
+        if phase != self._phase or (self._samples and current < self._samples[-1][1]):
+            self._samples.clear()
+            self._phase = phase
+        self._samples.append((now, current))
+        while len(self._samples) > 2 and now - self._samples[1][0] >= _WINDOW_SECONDS:
+            self._samples.popleft()
+
+        first_time, first_current = self._samples[0]
+        span = now - first_time
+        if span < _MIN_SPAN_SECONDS or current <= first_current:
+            return None, None
+        rate = (current - first_current) / span
+        return rate, max(total - current, 0) / rate
+
+
+class ProgressChannel:
+    """
+    Thread-sicherer Kanal zwischen Worker-Threads und GUI. report() passt als
+    progress-Callback der Pipeline; mit source lassen sich gleichzeitige
+    Aufträge (Stapel) getrennt messen.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        # source -> neuestes Ereignis seit dem letzten poll(), zuletzt gemeldete Quelle am Ende
+        self._latest = {}
+        self._calls = deque()
+        self._meters = {}
+        # source -> (Ereignis, Durchsatz, Restzeit) beim letzten poll(), auch für gerade stille Quellen
+        self._states = {}
+
+    def report(self, event, source=None):
+        with self._lock:
+            self._latest.pop(source, None)
+            self._latest[source] = event
+
+    def call(self, func, *args):
+        """Merkt einen Aufruf vor, der beim nächsten poll() im GUI-Thread ausgeführt wird."""
+        self._calls.append((func, args))
+
+    def reset(self):
+        with self._lock:
+            self._latest = {}
+            self._meters.clear()
+            self._states.clear()
+
+    def poll(self):
+        """
+        Gibt (ProgressSnapshot oder None, [(func, args), ...]) zurück: den neuesten
+        Stand seit dem letzten Aufruf und die vorgemerkten Aufrufe in Reihenfolge.
+        """
+        with self._lock:
+            latest, self._latest = self._latest, {}
+        calls = []
+        while self._calls:
+            calls.append(self._calls.popleft())
+        if not latest:
+            return None, calls
+
+        for source, event in latest.items():
+            meter = self._meters.get(source)
+            if meter is None:
+                meter = self._meters[source] = ThroughputMeter(self._clock)
+            rate, eta = meter.update(event.phase, event.current, event.total)
+            self._states[source] = (event, rate, eta)
+        if len(self._states) == 1:
+            event, rate, eta = self._states[source]
+            return ProgressSnapshot(event.phase, event.current, event.total, event.message, rate, eta), calls
+        return self._combined(event.message), calls
+
+    def _combined(self, message):
+        # Gleichzeitige Aufträge: ein gemeinsamer Balken über alle; die Restzeit ist die des langsamsten
+        states = list(self._states.values())
+        phases = {event.phase for event, _, _ in states}
+        running = [(rate, eta) for event, rate, eta in states if event.current < event.total]
+        rates = [rate for rate, _ in running if rate is not None]
+        etas = [eta for _, eta in running]
+        return ProgressSnapshot(phases.pop() if len(phases) == 1 else None,
+                                sum(event.current for event, _, _ in states),
+                                sum(event.total for event, _, _ in states),
+                                message,
+                                sum(rates) if rates else None,
+                                max(etas) if etas and None not in etas else None)
+
+
+def format_eta(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d} h"
+    return f"{seconds // 60}:{seconds % 60:02d} min"
+
+
+def describe_throughput(snapshot):
+    """Kurzer Text für die Anzeige, z.B. '12,5 Quittungen/s - noch ca. 0:42 min'; leer, solange unbekannt."""
+    if snapshot is None or snapshot.rate is None:
+        return ""
+    unit = UNITS.get(snapshot.phase, "Schritte")
+    if snapshot.rate >= 1:
+        rate = f"{snapshot.rate:.1f} {unit}/s"
+    else:
+        rate = f"{snapshot.rate * 60:.1f} {unit}/min"
+    text = rate.replace(".", ",")
+    if snapshot.eta is not None and snapshot.current < snapshot.total:
+        text += f" - noch ca. {format_eta(snapshot.eta)}"
+    return text
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Rendern und Speichern der Word-Quittungen - wahlweise im aktuellen Thread
+oder verteilt auf mehrere Prozesse.
+
+Nummerierung, Klassenordner und Übersichtsdaten werden vorher im Hauptprozess
+festgelegt; die Worker befüllen nur noch die Vorlage und schreiben die Datei.
+Dadurch ist die Ausgabe unabhängig davon, wie viele Prozesse verwendet werden.
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .runreport import stop_inherited_tracing
+from .stages import (SLOWEST_CLASSES, SLOWEST_RECEIPTS, STAGE_CLASS_DOCUMENTS, STAGE_DOCX_SAVE, STAGE_TEMPLATE_RENDER,
+                     StageTimes)
+from .template import load_template
+
+ReceiptJob = namedtuple("ReceiptJob", ["key", "replacements", "output_filename"])
+# Alle Quittungen einer Klasse in einer Word-Datei (ein Abschnitt je Quittung)
+ClassJob = namedtuple("ClassJob", ["key", "replacements_list", "output_filename"])
+
+# Kleine Pakete halten den Abbruch schnell und die Fortschrittsanzeige flüssig
+DEFAULT_CHUNK_SIZE = 8
+# Pakete je Worker, die gleichzeitig vergeben sind. Weitere werden erst nachgereicht,
+# wenn der Hauptprozess Ergebnisse abgeholt hat (Gegendruck, z.B. von der PDF-Umwandlung).
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+_worker_template = None
+_worker_cancel_event = None
+
+
+def _init_worker(template_path, cancel_event):
+    global _worker_template, _worker_cancel_event
+    stop_inherited_tracing()
+    # Strg+C trifft die ganze Prozessgruppe; abgebrochen wird über den Hauptprozess
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_template = load_template(template_path)
+    _worker_cancel_event = cancel_event
+
+
+def _render_job(template, job, stage_times):
+    try:
+        start = time.perf_counter()
+        if isinstance(job, ClassJob):
+            template.save_combined(job.replacements_list, job.output_filename)
+            seconds = time.perf_counter() - start
+            stage_times.add(STAGE_CLASS_DOCUMENTS, seconds, len(job.replacements_list))
+            stage_times.add_bytes(STAGE_CLASS_DOCUMENTS, os.path.getsize(job.output_filename))
+            stage_times.note(SLOWEST_CLASSES, os.path.basename(os.path.dirname(job.output_filename)), seconds)
+            return job.key, None
+        rendered = template.render_parts(job.replacements)
+        rendered_at = time.perf_counter()
+        template.save_parts(rendered, job.output_filename)
+        saved_at = time.perf_counter()
+        stage_times.add(STAGE_TEMPLATE_RENDER, rendered_at - start, 1)
+        stage_times.add(STAGE_DOCX_SAVE, saved_at - rendered_at, 1)
+        stage_times.add_bytes(STAGE_DOCX_SAVE, os.path.getsize(job.output_filename))
+        stage_times.note(SLOWEST_RECEIPTS, os.path.basename(job.output_filename), saved_at - start)
+        return job.key, None
+    except Exception as e:
+        return job.key, str(e)
+
+
+def _render_chunk(jobs):
+    results = []
+    stage_times = StageTimes()
+    for job in jobs:
+        if _worker_cancel_event.is_set():
+            break
+        results.append(_render_job(_worker_template, job, stage_times))
+    return results, stage_times.export()
+
+
+def default_worker_count():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+
+def render_receipts(template_path, jobs, workers=1, on_progress=None, is_cancelled=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, stage_times=None, on_result=None):
+    """
+    Rendert alle Jobs und gibt ein Dict {job.key: Fehlertext oder None} zurück.
+    Jobs, die wegen eines Abbruchs nicht mehr gerendert wurden, fehlen im Ergebnis.
+    Render- und Speicherzeiten werden (falls angegeben) in stage_times summiert.
+    on_result(key, Fehlertext oder None) wird im aufrufenden Thread nach jedem Job
+    aufgerufen; solange er blockiert, werden keine neuen Pakete vergeben.
+    """
+    is_cancelled = is_cancelled or (lambda: False)
+    stage_times = stage_times if stage_times is not None else StageTimes()
+    on_progress = on_progress or (lambda done: None)
+    on_result = on_result or (lambda key, error: None)
+    results = {}
+
+    if workers <= 1 or len(jobs) <= chunk_size:
+        template = load_template(template_path)
+        for job in jobs:
+            if is_cancelled():
+                break
+            key, error = _render_job(template, job, stage_times)
+            results[key] = error
+            on_result(key, error)
+            on_progress(len(results))
+        return results
+
+    cancel_event = multiprocessing.Event()
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    max_workers = min(workers, len(chunks))
+    executor = ProcessPoolExecutor(max_workers=max_workers,
+                                   initializer=_init_worker,
+                                   initargs=(template_path, cancel_event))
+    queued = iter(chunks)
+    try:
+        pending = set()
+        while True:
+            while len(pending) < max_workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                chunk = next(queued, None)
+                if chunk is None:
+                    break
+                pending.add(executor.submit(_render_chunk, chunk))
+            if not pending:
+                break
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk_results, chunk_times = future.result()
+                stage_times.merge(chunk_times)
+                for key, error in chunk_results:
+                    results[key] = error
+                    on_result(key, error)
+            if done:
+                on_progress(len(results))
+            if is_cancelled():
+                # Laufende Worker brechen nach der aktuellen Quittung ab,
+                # noch nicht gestartete Pakete werden verworfen.
+                cancel_event.set()
+                for future in pending:
+                    future.cancel()
+                break
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return results
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Einlesen der Schülerliste und der Preisliste ohne DataFrame.
+
+.xlsx-Dateien werden Zeile für Zeile direkt aus dem Tabellen-XML gestreamt;
+Zellen in nicht benötigten Spalten werden übersprungen, bevor ihr Wert
+umgewandelt wird, und kosten so weder Zeit noch Speicher. Als Datum
+formatierte Zahlen kommen wie früher bei pandas als datetime zurück, nicht als
+Excel-Seriennummer. Neben .xlsx werden
+CSV- und Parquet-Exporte der Schulverwaltung gelesen, alte .xls-Dateien
+weiterhin über pandas.
+"""
+
+import csv
+import os
+import posixpath
+import zipfile
+from collections import namedtuple
+from datetime import datetime
+
+from lxml import etree
+
+ROSTER_COLUMNS = ('Eltern 1 - Name', 'Name Kind', 'In Klasse', 'Eltern 1 - Emailadresse')
+
+# Eine Zeile der Schülerliste; `row` ist die Zeilennummer wie in Excel (Kopfzeile = 1)
+RosterRow = namedtuple("RosterRow", ["row", "parent_name", "child_name", "klasse", "email"])
+
+_CSV_SAMPLE_SIZE = 64 * 1024
+
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PR = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def _is_missing(value):
+    return value is None or value == "" or (isinstance(value, float) and value != value)
+
+
+def _column_indexes(header, columns, source):
+    positions = {}
+    for index, name in enumerate(header):
+        if name is not None:
+            positions.setdefault(str(name).strip(), index)
+    missing = [name for name in columns if name not in positions]
+    if missing:
+        raise ValueError(f"Spalte(n) {', '.join(repr(name) for name in missing)} fehlen in {os.path.basename(source)}.")
+    return [positions[name] for name in columns]
+
+
+def _project(rows, columns, source):
+    """Erwartet die Kopfzeile als erstes Element; liefert (Zeilennummer, Werte der Spalten)."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError(f"{os.path.basename(source)} ist leer.")
+    indexes = _column_indexes(header, columns, source)
+    for row_number, row in enumerate(rows, start=2):
+        yield row_number, tuple(row[i] if i < len(row) else None for i in indexes)
+
+
+# ------------------------------------------
+# Dateiformate
+# ------------------------------------------
+def _column_number(reference):
+    """'C12' -> 2 (0-basiert)."""
+    number = 0
+    for char in reference:
+        if char.isdigit():
+            break
+        number = number * 26 + ord(char.upper()) - 64
+    return number - 1
+
+
+def _sheet_path(archive, sheet_name):
+    workbook = etree.fromstring(archive.read("xl/workbook.xml"))
+    sheets = workbook.find(f"{_S}sheets")
+    if sheet_name is None:
+        sheet = sheets[0] if len(sheets) else None
+    else:
+        sheet = next((s for s in sheets if s.get("name") == sheet_name), None)
+    if sheet is None:
+        raise ValueError(f"Tabellenblatt '{sheet_name}' fehlt in {os.path.basename(archive.filename)}.")
+
+    rels = etree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    target = next(rel.get("Target") for rel in rels.iter(f"{_PR}Relationship") if rel.get("Id") == sheet.get(f"{_R}id"))
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join("xl", target))
+
+
+def _shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, item in etree.iterparse(f, tag=f"{_S}si"):
+            # Phonetische Hilfen (rPh) gehören nicht zum Text
+            strings.append("".join(t.text or "" for t in item.iter(f"{_S}t") if t.getparent().tag != f"{_S}rPh"))
+            item.clear()
+    return strings
+
+
+def _workbook_epoch(archive):
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+    workbook = etree.fromstring(archive.read("xl/workbook.xml"))
+    properties = workbook.find(f"{_S}workbookPr")
+    if properties is not None and properties.get("date1904") in ("1", "true"):
+        return CALENDAR_MAC_1904
+    return CALENDAR_WINDOWS_1900
+
+
+def _date_styles(archive):
+    """Indizes der Zellformate (Attribut s), die eine Zahl als Datum oder Uhrzeit anzeigen."""
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+
+    if "xl/styles.xml" not in archive.namelist():
+        return frozenset()
+    styles = etree.fromstring(archive.read("xl/styles.xml"))
+    formats = dict(BUILTIN_FORMATS)
+    num_fmts = styles.find(f"{_S}numFmts")
+    if num_fmts is not None:
+        for fmt in num_fmts.iterchildren(f"{_S}numFmt"):
+            formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode")
+    cell_xfs = styles.find(f"{_S}cellXfs")
+    if cell_xfs is None:
+        return frozenset()
+    return frozenset(index for index, xf in enumerate(cell_xfs.iterchildren(f"{_S}xf"))
+                     if is_date_format(formats.get(int(xf.get("numFmtId", 0))) or ""))
+
+
+def _cell_value(cell, shared, date_styles=frozenset(), epoch=None):
+    kind = cell.get("t", "n")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{_S}t")) or None
+    value = cell.find(f"{_S}v")
+    if value is None or value.text is None:
+        return None
+    text = value.text
+    if kind == "s":
+        return shared[int(text)]
+    if kind == "str":
+        return text
+    if kind == "b":
+        return text == "1"
+    if kind == "e":
+        # Fehlerwerte wie #N/A zählen als leere Zelle
+        return None
+    if kind == "d":
+        # Datum als ISO-8601-Text (z.B. aus LibreOffice oder strengem OOXML)
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            return text
+    number = float(text) if "." in text or "E" in text or "e" in text else int(text)
+    style = cell.get("s")
+    if style is not None and int(style) in date_styles:
+        # Als Datum formatierte Zahl: wie openpyxl/pandas als datetime (bzw. time) statt Excel-Seriennummer
+        from openpyxl.utils.datetime import from_excel
+
+        return from_excel(number, epoch)
+    return number
+
+
+def _xlsx_rows(path, columns, sheet_name=None):
+    with zipfile.ZipFile(path) as archive:
+        sheet_path = _sheet_path(archive, sheet_name)
+        shared = _shared_strings(archive)
+        date_styles = _date_styles(archive)
+        epoch = _workbook_epoch(archive)
+        with archive.open(sheet_path) as f:
+            wanted = None
+            for _, row in etree.iterparse(f, tag=f"{_S}row"):
+                values = {}
+                for position, cell in enumerate(row.iter(f"{_S}c")):
+                    reference = cell.get("r")
+                    index = _column_number(reference) if reference else position
+                    if wanted is None or index in wanted:
+                        values[index] = _cell_value(cell, shared, date_styles, epoch)
+                row_number = int(row.get("r", 0))
+                # Bereits gelesene Zeilen freigeben, damit der Speicher nicht mit der Datei wächst
+                row.clear()
+                while row.getprevious() is not None:
+                    del row.getparent()[0]
+
+                if wanted is None:
+                    header = [values.get(i) for i in range(max(values, default=-1) + 1)]
+                    if not any(value is not None for value in header):
+                        continue
+                    indexes = _column_indexes(header, columns, path)
+                    wanted = set(indexes)
+                    continue
+                yield row_number, tuple(values.get(i) for i in indexes)
+    if wanted is None:
+        raise ValueError(f"{os.path.basename(path)} ist leer.")
+
+
+def _xls_rows(path, sheet_name=None):
+    # Altes Excel-Format kann openpyxl nicht lesen
+    import pandas as pd
+
+    df = pd.read_excel(path, sheet_name=sheet_name or 0, header=None, dtype=object)
+    for row in df.itertuples(index=False, name=None):
+        yield tuple(None if _is_missing(value) else value for value in row)
+
+
+def _csv_encoding(path):
+    with open(path, "rb") as f:
+        sample = f.read(_CSV_SAMPLE_SIZE)
+    try:
+        sample.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # Abgeschnittenes Mehrbyte-Zeichen am Ende der Stichprobe ist kein Fehler
+        if e.start >= len(sample) - 3:
+            return "utf-8-sig"
+        return "cp1252"
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding=_csv_encoding(path)) as f:
+        sample = f.read(_CSV_SAMPLE_SIZE)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(f, dialect)
+
+
+def _parquet_rows(path, columns):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Für Parquet-Dateien wird pyarrow benötigt (pip install pyarrow).") from None
+
+    parquet = pq.ParquetFile(path)
+    names = parquet.schema_arrow.names
+    _column_indexes(names, columns, path)
+    row_number = 1
+    # Nur die benötigten Spalten werden gelesen
+    for batch in parquet.iter_batches(columns=list(columns)):
+        values = [batch.column(name).to_pylist() for name in columns]
+        for row in zip(*values):
+            row_number += 1
+            yield row_number, tuple(None if _is_missing(value) else value for value in row)
+
+
+def read_table(path, columns, sheet_name=None):
+    """Liefert (Zeilennummer, Werte) für die angegebenen Spalten, ohne die Datei ganz zu laden."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".parquet":
+        return _parquet_rows(path, columns)
+    if extension == ".csv":
+        return _project(_csv_rows(path), columns, path)
+    if extension == ".xls":
+        return _project(_xls_rows(path, sheet_name), columns, path)
+    return _xlsx_rows(path, columns, sheet_name)
+
+
+# ------------------------------------------
+# Schülerliste und Preise
+# ------------------------------------------
+def read_roster(path):
+    """
+    Liest die Schülerliste als RosterRow-Objekte. Zeilen ohne E-Mail oder Kind
+    werden übersprungen; die E-Mail wird als bereinigter Text geliefert. Ob
+    'Name Kind' wirklich Text ist, prüft aggregate_families().
+    """
+    for row_number, (parent_name, child_name, klasse, email) in read_table(path, ROSTER_COLUMNS):
+        if _is_missing(email) or _is_missing(child_name):
+            continue
+        yield RosterRow(row_number,
+                        None if _is_missing(parent_name) else parent_name,
+                        child_name,
+                        None if _is_missing(klasse) else klasse,
+                        str(email).strip())
+
+
+def read_records(path, sheet_name, columns):
+    """Zeilen eines Tabellenblatts als Dicts {Spalte: Wert}; leere Zeilen werden übersprungen."""
+    for _, values in read_table(path, columns, sheet_name):
+        if all(_is_missing(value) for value in values):
+            continue
+        yield dict(zip(columns, values))
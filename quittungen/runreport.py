@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Laufbericht und optionales Profiling.
+
+Nach jedem Schritt liegt neben der Übersichtstabelle ein Laufbericht im
+Ausgabeordner: `<Jahr>_Laufbericht_<Schritt>.json` mit Laufzeit, Anzahl und
+geschriebenen Bytes je Stufe sowie den langsamsten Quittungen bzw. Klassen,
+dazu dieselben Stufen als CSV für Excel. Damit lässt sich bei einem langsamen
+Lauf erkennen, ob Word, die Festplatte oder das Befüllen der Vorlage bremst.
+
+Auf Wunsch wird der Lauf zusätzlich mit cProfile (Rechenzeit je Funktion,
+Rohdaten als .prof für snakeviz/pstats) oder tracemalloc (Speicher je
+Quelltextzeile) aufgezeichnet. Gemessen wird nur der aufrufende Prozess bzw.
+Thread, nicht die Worker-Prozesse.
+"""
+
+import csv
+import io
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+PROFILE_CPU = "cpu"
+PROFILE_MEMORY = "memory"
+PROFILE_MODES = (PROFILE_CPU, PROFILE_MEMORY)
+
+PROFILE_TOP = 30
+
+_CSV_COLUMNS = ["Stufe", "Sekunden", "Anzahl", "Bytes", "ms pro Stück"]
+
+
+def report_path(output_dir, title, extension):
+    jahr_erstellung = datetime.now().strftime("%Y")
+    return os.path.join(output_dir, f"{jahr_erstellung}_Laufbericht_{title}{extension}")
+
+
+class Profiler:
+    """Zeichnet zwischen start() und stop() Rechenzeit (cProfile) oder Speicher (tracemalloc) auf."""
+
+    def __init__(self, mode):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unbekannter Profiling-Modus '{mode}' (erlaubt: {', '.join(PROFILE_MODES)}).")
+        self.mode = mode
+        self._profile = None
+        self._snapshot = None
+        self._peak = 0
+
+    def start(self):
+        if self.mode == PROFILE_CPU:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def stop(self):
+        if self.mode == PROFILE_CPU:
+            self._profile.disable()
+        else:
+            import tracemalloc
+
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    def results(self, output_dir, title):
+        """Ergebnis für den Laufbericht; beim CPU-Profil werden die Rohdaten als .prof gespeichert."""
+        if self.mode == PROFILE_CPU:
+            import pstats
+
+            raw_file = report_path(output_dir, title, ".prof")
+            self._profile.dump_stats(raw_file)
+            text = io.StringIO()
+            pstats.Stats(self._profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            return {"mode": self.mode, "file": raw_file, "top_cumulative": text.getvalue()}
+
+        top = self._snapshot.statistics("lineno")[:PROFILE_TOP]
+        return {
+            "mode": self.mode,
+            "peak_bytes": self._peak,
+            "top_lines": [{"line": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count} for stat in top],
+        }
+
+
+def stop_inherited_tracing():
+    """In Worker-Prozessen aufrufen: ein per fork geerbtes tracemalloc würde sie stark bremsen."""
+    import tracemalloc
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def write_run_report(output_dir, title, report, stage_times, started, duration, settings=None, profiler=None):
+    """Schreibt den Laufbericht als JSON und die Stufen als CSV; gibt den Pfad der JSON-Datei zurück."""
+    stages = stage_times.as_dict()
+    data = {
+        "step": title,
+        "started": started.isoformat(timespec="seconds"),
+        "duration_seconds": round(duration, 3),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": settings or {},
+        "result": {
+            "receipts": report.receipts,
+            "classes": report.classes,
+            "docx_files": report.docx_files,
+            "pdf_files": report.pdf_files,
+            "pdf_cached": report.pdf_cached,
+            "class_documents": report.class_documents,
+            "unchanged": report.unchanged,
+            "removed": report.removed,
+            "duplicates": len(report.duplicates),
+            "errors": len(report.errors),
+            "cancelled": report.cancelled,
+        },
+        "stages": stages,
+        "slowest": stage_times.slowest_items(),
+    }
+    if profiler is not None:
+        data["profile"] = profiler.results(output_dir, title)
+
+    json_file = report_path(output_dir, title, ".json")
+    with open(json_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+    # Semikolon und BOM, damit Excel die Datei in deutscher Einstellung direkt öffnet
+    with open(report_path(output_dir, title, ".csv"), "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(_CSV_COLUMNS)
+        for name, entry in stages.items():
+            per_item = entry["seconds"] * 1000 / entry["items"] if entry["items"] else None
+            writer.writerow([name, f"{entry['seconds']:.3f}".replace(".", ","), entry["items"], entry["bytes"],
+                             f"{per_item:.2f}".replace(".", ",") if per_item is not None else ""])
+    return json_file
+
+
+def run_instrumented(target, output_dir, title, profile=None, run_report=True, settings=None, **kwargs):
+    """
+    Führt einen Schritt der Pipeline aus (target erhält stage_times und die
+    übrigen Argumente) und schreibt danach den Laufbericht.
+    """
+    from .stages import StageTimes
+
+    stage_times = kwargs.pop("stage_times", None)
+    stage_times = stage_times if stage_times is not None else StageTimes()
+    profiler = Profiler(profile) if profile else None
+    started = datetime.now()
+    start = time.perf_counter()
+
+    if profiler is not None:
+        profiler.start()
+    try:
+        report = target(output_dir=output_dir, stage_times=stage_times, **kwargs)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    if run_report and os.path.isdir(output_dir):
+        try:
+            report.run_report = write_run_report(output_dir, title, report, stage_times, started,
+                                                 time.perf_counter() - start, settings, profiler)
+        except Exception as e:
+            report.errors.append(f"Fehler beim Schreiben des Laufberichts: {e}")
+    return report
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Laufzeit je Verarbeitungsstufe (Excel laden, Gruppieren, Rendern, Speichern,
+Übersicht, PDF).
+
+Die Pipeline trägt ihre Stufen in ein StageTimes-Objekt ein; das Ergebnis
+steht im Report (report.stages) und wird z.B. vom Benchmark ausgewertet.
+Stufen, die in Worker-Prozessen laufen, werden dort gemessen und im
+Hauptprozess aufsummiert (Summe über alle Worker, nicht Wandzeit).
+
+Zusätzlich werden die geschriebenen Bytes je Stufe und die langsamsten
+Quittungen bzw. Klassen festgehalten (für den Laufbericht, siehe
+quittungen.runreport).
+"""
+
+import heapq
+import time
+from contextlib import contextmanager
+
+STAGE_TEMPLATE_CHECK = "template_check"
+STAGE_EXCEL_LOAD = "excel_load"
+STAGE_PRICES_LOAD = "prices_load"
+STAGE_ROSTER_READ = "roster_read"
+STAGE_DUPLICATES = "duplicate_check"
+STAGE_GROUPING = "grouping"
+STAGE_WORD_DOCUMENTS = "word_documents"
+STAGE_TEMPLATE_RENDER = "template_render"
+STAGE_DOCX_SAVE = "docx_save"
+STAGE_CLASS_DOCUMENTS = "class_documents"
+STAGE_SUMMARY = "summary_workbook"
+STAGE_PDF_CLASSES = "pdf_classes"
+STAGE_PDF_BACKEND_OPEN = "pdf_backend_open"
+# Anzahl = aus dem PDF-Cache übernommene Word-Dateien (quittungen.pdf.cache)
+STAGE_PDF_CACHE = "pdf_cache"
+STAGE_PDF_CONVERT = "pdf_convert"
+STAGE_PDF_MERGE = "pdf_merge"
+
+# Kategorien für die langsamsten Einzelschritte
+SLOWEST_RECEIPTS = "receipts"
+SLOWEST_CLASSES = "classes"
+SLOWEST_LIMIT = 10
+
+
+class StageTimes:
+
+    def __init__(self):
+        self.seconds = {}
+        self.items = {}
+        self.bytes = {}
+        # Kategorie -> Min-Heap aus (Sekunden, Bezeichnung) mit höchstens SLOWEST_LIMIT Einträgen
+        self.slowest = {}
+        # (Stufe, Start, Ende) in time.perf_counter() für Stufen, die im Hauptprozess laufen
+        self.spans = []
+        self._open = {}
+
+    def add(self, name, seconds, items=0):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.items[name] = self.items.get(name, 0) + items
+
+    def begin(self, name):
+        self._open[name] = time.perf_counter()
+
+    def end(self, name, items=0):
+        start = self._open.pop(name)
+        end = time.perf_counter()
+        self.add(name, end - start, items)
+        self.spans.append((name, start, end))
+
+    @contextmanager
+    def measure(self, name, items=0):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name, items)
+
+    def set_items(self, name, items):
+        self.items[name] = items
+
+    def add_bytes(self, name, nbytes):
+        self.bytes[name] = self.bytes.get(name, 0) + nbytes
+
+    def note(self, category, label, seconds):
+        """Merkt sich einen Einzelschritt, falls er zu den langsamsten seiner Kategorie gehört."""
+        heap = self.slowest.setdefault(category, [])
+        if len(heap) < SLOWEST_LIMIT:
+            heapq.heappush(heap, (seconds, label))
+        elif seconds > heap[0][0]:
+            heapq.heapreplace(heap, (seconds, label))
+
+    def slowest_items(self):
+        return {category: [{"name": label, "seconds": round(seconds, 6)} for seconds, label in sorted(heap, reverse=True)]
+                for category, heap in self.slowest.items()}
+
+    def export(self):
+        """Alle Messwerte zur Übergabe aus einem Worker-Prozess, siehe merge()."""
+        return {"stages": self.as_dict(), "slowest": self.slowest_items()}
+
+    def merge(self, data):
+        """Übernimmt die Werte aus export() eines anderen Prozesses."""
+        for name, entry in data["stages"].items():
+            self.add(name, entry["seconds"], entry["items"])
+            self.add_bytes(name, entry["bytes"])
+        for category, entries in data["slowest"].items():
+            for entry in entries:
+                self.note(category, entry["name"], entry["seconds"])
+
+    def as_dict(self):
+        return {name: {"seconds": round(seconds, 6), "items": self.items.get(name, 0), "bytes": self.bytes.get(name, 0)}
+                for name, seconds in self.seconds.items()}
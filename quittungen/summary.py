@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Übersichtstabelle von Schritt 1, zeilenweise geschrieben.
+
+Statt alle Zeilen bis zum Ende zu sammeln, wird jede Quittung sofort an eine
+Excel-Datei im Nur-Schreiben-Modus von openpyxl angehängt (die Blätter liegen
+dabei in temporären Dateien, nicht im Speicher). Neben dem Blatt mit allen
+Quittungen bekommt jede Klasse ein eigenes Blatt mit Zwischensumme, dazu ein
+Blatt mit den Summen je Klasse. Die Summen werden beim Schreiben mitgezählt.
+
+close() schreibt die Datei unter temporärem Namen und benennt sie dann um;
+auch nach einem Abbruch enthält sie alle bis dahin fertigen Quittungen.
+"""
+
+import os
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+COLUMNS = ['Quittung Nr.', 'Eltern 1 - Name', 'Eltern 1 - Emailadresse', 'In Klasse', 'Rechnungsbeitrag (€)',
+           'Namen aller Kinder']
+AMOUNT_COLUMN = 'Rechnungsbeitrag (€)'
+
+MAIN_SHEET = "Übersicht"
+CLASS_TOTALS_SHEET = "Summen je Klasse"
+_CLASS_TOTALS_COLUMNS = ['In Klasse', 'Quittungen', AMOUNT_COLUMN]
+
+_COLUMN_WIDTHS = [13, 30, 34, 14, 22, 50]
+_AMOUNT_FORMAT = '#,##0.00'
+_BOLD = Font(bold=True)
+# In Excel nicht erlaubt in Blattnamen
+_INVALID_SHEET_CHARS = '[]:*?/\\'
+_MAX_SHEET_TITLE = 31
+
+
+def _sheet_title(name, used):
+    title = "".join("_" if c in _INVALID_SHEET_CHARS else c for c in str(name)).strip("'")[:_MAX_SHEET_TITLE]
+    title = title or "Klasse"
+    candidate, number = title, 2
+    # Excel unterscheidet bei Blattnamen nicht zwischen Groß- und Kleinschreibung
+    while candidate.lower() in used:
+        suffix = f" ({number})"
+        candidate = title[:_MAX_SHEET_TITLE - len(suffix)] + suffix
+        number += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _styled(sheet, values, font=None, amount_index=None):
+    cells = []
+    for index, value in enumerate(values):
+        cell = WriteOnlyCell(sheet, value=value)
+        if font is not None:
+            cell.font = font
+        if index == amount_index:
+            cell.number_format = _AMOUNT_FORMAT
+        cells.append(cell)
+    return cells
+
+
+class SummaryWorkbook:
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.total = 0
+        # Klasse -> [Blatt, Anzahl, Summe]
+        self._classes = {}
+        self._used_titles = {MAIN_SHEET.lower(), CLASS_TOTALS_SHEET.lower()}
+        self._workbook = Workbook(write_only=True)
+        self._main = self._new_sheet(MAIN_SHEET, COLUMNS)
+
+    def _new_sheet(self, title, columns):
+        sheet = self._workbook.create_sheet(title)
+        for index, width in enumerate(_COLUMN_WIDTHS[:len(columns)]):
+            sheet.column_dimensions[chr(ord("A") + index)].width = width
+        sheet.append(_styled(sheet, columns, _BOLD))
+        return sheet
+
+    def add(self, row):
+        """Hängt eine Quittung (Dict mit den Spalten aus COLUMNS) an die Übersicht und ihr Klassenblatt an."""
+        values = [row[column] for column in COLUMNS]
+        amount_index = COLUMNS.index(AMOUNT_COLUMN)
+        klasse = row['In Klasse']
+        entry = self._classes.get(klasse)
+        if entry is None:
+            entry = self._classes[klasse] = [self._new_sheet(_sheet_title(klasse, self._used_titles), COLUMNS), 0, 0]
+        self._main.append(_styled(self._main, values, amount_index=amount_index))
+        entry[0].append(_styled(entry[0], values, amount_index=amount_index))
+        amount = row[AMOUNT_COLUMN] or 0
+        entry[1] += 1
+        entry[2] += amount
+        self.rows += 1
+        self.total += amount
+
+    @staticmethod
+    def _totals_row(sheet, label, count, amount):
+        values = [label, f"{count} Quittungen", None, None, amount, None]
+        return _styled(sheet, values, _BOLD, COLUMNS.index(AMOUNT_COLUMN))
+
+    def close(self):
+        """Schreibt Summenzeilen und das Blatt mit den Summen je Klasse und speichert die Datei."""
+        self._main.append([])
+        self._main.append(self._totals_row(self._main, "Gesamt", self.rows, self.total))
+        for sheet, count, amount in self._classes.values():
+            sheet.append([])
+            sheet.append(self._totals_row(sheet, "Zwischensumme", count, amount))
+
+        totals = self._new_sheet(CLASS_TOTALS_SHEET, _CLASS_TOTALS_COLUMNS)
+        for klasse, (_, count, amount) in self._classes.items():
+            totals.append(_styled(totals, [klasse, count, amount], amount_index=2))
+        totals.append(_styled(totals, ["Gesamt", self.rows, self.total], _BOLD, 2))
+
+        partial_path = self.path + ".part"
+        try:
+            self._workbook.save(partial_path)
+            os.replace(partial_path, self.path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return self.path
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Vorkompilierte Word-Vorlage.
+
+Die Vorlage wird nur einmal geladen. Dabei wird für jeden {{...}}-Platzhalter
+gespeichert, in welchem <w:t>-Element er steht - auch wenn Word ihn beim
+Bearbeiten auf mehrere Runs verteilt hat. Jede Quittung entsteht danach aus
+einer Kopie des XML-Baums, in der nur diese Stellen direkt befüllt werden.
+Gespeichert wird über ein vorbereitetes Archiv-Gerüst (quittungen.ooxml), in
+dem nur die Teile mit Platzhaltern neu geschrieben werden.
+"""
+
+import copy
+import io
+import re
+
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.part import XmlPart
+from docx.oxml.ns import qn
+
+from .filecache import FileCache
+from .ooxml import PackageSkeleton
+
+PLACEHOLDER_RE = re.compile(r"(\{\{[A-Za-z0-9_]+\}\})")
+
+_W_P = qn("w:p")
+_W_T = qn("w:t")
+_W_BODY = qn("w:body")
+_W_PPR = qn("w:pPr")
+_W_PPR_CHANGE = qn("w:pPrChange")
+_W_SECT_PR = qn("w:sectPr")
+_W_BOOKMARKS = (qn("w:bookmarkStart"), qn("w:bookmarkEnd"))
+_WP_DOC_PR = qn("wp:docPr")
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+
+def _paragraph_texts(paragraph):
+    # Nur die <w:t> dieses Absatzes, nicht die von verschachtelten Absätzen (z.B. Textfelder)
+    return [t for t in paragraph.iter(_W_T) if next(t.iterancestors(_W_P), None) is paragraph]
+
+
+def _merge_split_placeholders(paragraph):
+    """Zieht Platzhalter, die über mehrere Runs verteilt sind, in den ersten Run zusammen."""
+    text_elements = _paragraph_texts(paragraph)
+    texts = [t.text or "" for t in text_elements]
+    full_text = "".join(texts)
+    if "{{" not in full_text:
+        return
+
+    offsets = []
+    position = 0
+    for text in texts:
+        offsets.append(position)
+        position += len(text)
+
+    def element_at(char_index):
+        for i, text in enumerate(texts):
+            if offsets[i] <= char_index < offsets[i] + len(text):
+                return i
+        return len(texts) - 1
+
+    # Von hinten nach vorne, damit die Offsets der vorderen Treffer gültig bleiben
+    for match in reversed(list(PLACEHOLDER_RE.finditer(full_text))):
+        first = element_at(match.start())
+        last = element_at(match.end() - 1)
+        if first == last:
+            continue
+
+        first_el, last_el = text_elements[first], text_elements[last]
+        first_el.text = (first_el.text or "")[:match.start() - offsets[first]] + match.group(0)
+        for i in range(first + 1, last):
+            text_elements[i].text = ""
+        last_el.text = (last_el.text or "")[match.end() - offsets[last]:]
+
+
+def _end_section(paragraph, sect_pr):
+    """Hängt die Abschnittseigenschaften an den Absatz: danach beginnt ein neuer Abschnitt (neue Seite)."""
+    ppr = paragraph.find(_W_PPR)
+    if ppr is None:
+        ppr = paragraph.makeelement(_W_PPR, {})
+        paragraph.insert(0, ppr)
+    change = ppr.find(_W_PPR_CHANGE)
+    if change is not None:
+        change.addprevious(sect_pr)
+    else:
+        ppr.append(sect_pr)
+
+
+def _element_path(root, element):
+    path = []
+    node = element
+    while node is not root:
+        parent = node.getparent()
+        path.append(parent.index(node))
+        node = parent
+    path.reverse()
+    return tuple(path)
+
+
+class CompiledTemplate:
+    """
+    Einmal geparste Word-Vorlage mit vorberechneter Platzhalter-Tabelle.
+
+    render_parts() und save() verändern die geladene Vorlage nicht; eine Instanz
+    kann daher auch von mehreren Threads gleichzeitig benutzt werden.
+    """
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+        self._document = Document(template_path)
+        self._parts = []
+        self.placeholders = set()
+
+        for part in self._document.part.package.iter_parts():
+            if not isinstance(part, XmlPart):
+                continue
+            slots = self._compile_part(part.element)
+            if slots:
+                self._parts.append((part, part.element, slots))
+
+        # Die Vorlage einmal (mit zusammengeführten Platzhaltern) speichern; alle
+        # übrigen Archiv-Einträge werden daraus komprimiert übernommen.
+        package = io.BytesIO()
+        self._document.save(package)
+        self._skeleton = PackageSkeleton(package.getvalue(),
+                                         [self._entry_name(part) for part, _, _ in self._parts])
+
+    def _compile_part(self, root):
+        for paragraph in root.iter(_W_P):
+            _merge_split_placeholders(paragraph)
+
+        slots = []
+        for t in root.iter(_W_T):
+            if not t.text or "{{" not in t.text:
+                continue
+            segments = PLACEHOLDER_RE.split(t.text)
+            keys = segments[1::2]
+            if not keys:
+                continue
+            self.placeholders.update(keys)
+            # Ersetzte Werte können mit Leerzeichen beginnen oder enden
+            t.set(_XML_SPACE, "preserve")
+            slots.append((_element_path(root, t), tuple(segments)))
+        return slots
+
+    def render_parts(self, replacements):
+        """Gibt für jeden Teil mit Platzhaltern eine befüllte Kopie seines XML-Baums zurück."""
+        rendered = {}
+        for part, element, slots in self._parts:
+            clone = copy.deepcopy(element)
+            for path, segments in slots:
+                node = clone
+                for index in path:
+                    node = node[index]
+                node.text = "".join(
+                    str(replacements.get(segment, segment)) if i % 2 else segment
+                    for i, segment in enumerate(segments)
+                )
+            rendered[part] = clone
+        return rendered
+
+    def save(self, replacements, output_filename):
+        self.save_parts(self.render_parts(replacements), output_filename)
+
+    def save_combined(self, replacements_list, output_filename):
+        """
+        Speichert mehrere Quittungen als ein Dokument mit einem Abschnitt
+        (neue Seite) je Quittung, z.B. eine Datei pro Klasse für die Druckerei.
+        """
+        main_part = self._document.part
+        if [part for part, _, _ in self._parts] != [main_part]:
+            raise ValueError("Für eine Datei pro Klasse dürfen Platzhalter nur im Haupttext stehen, "
+                             "nicht in Kopf-/Fußzeilen oder anderen Teilen der Vorlage.")
+
+        combined = copy.deepcopy(main_part.element)
+        combined_body = combined.find(_W_BODY)
+        for child in list(combined_body):
+            combined_body.remove(child)
+
+        doc_pr_id = 0
+        for number, replacements in enumerate(replacements_list):
+            body = self.render_parts(replacements)[main_part].find(_W_BODY)
+            blocks = list(body)
+            sect_pr = blocks.pop() if blocks and blocks[-1].tag == _W_SECT_PR else None
+
+            for block in blocks:
+                # IDs von Bildern und Lesezeichen müssen im ganzen Dokument eindeutig sein
+                for doc_pr in block.iter(_WP_DOC_PR):
+                    doc_pr_id += 1
+                    doc_pr.set("id", str(doc_pr_id))
+                if number:
+                    for bookmark in list(block.iter(*_W_BOOKMARKS)):
+                        bookmark.getparent().remove(bookmark)
+                combined_body.append(block)
+
+            if sect_pr is None:
+                continue
+            if number == len(replacements_list) - 1:
+                combined_body.append(sect_pr)
+            elif blocks and blocks[-1].tag == _W_P:
+                _end_section(blocks[-1], sect_pr)
+            else:
+                paragraph = combined_body.makeelement(_W_P, {})
+                _end_section(paragraph, sect_pr)
+                combined_body.append(paragraph)
+
+        self._skeleton.write(output_filename, {self._entry_name(main_part): serialize_part_xml(combined)})
+
+    @staticmethod
+    def _entry_name(part):
+        return part.partname.lstrip("/")
+
+    def save_parts(self, rendered, output_filename):
+        """Speichert das Dokument mit den Teilen aus render_parts()."""
+        blobs = {self._entry_name(part): serialize_part_xml(element) for part, element in rendered.items()}
+        self._skeleton.write(output_filename, blobs)
+
+
+_TEMPLATES = FileCache(CompiledTemplate, maxsize=4)
+
+
+def load_template(template_path):
+    """Kompilierte Vorlage aus dem prozessweiten Cache (für mehrere Aufträge mit derselben Vorlage)."""
+    return _TEMPLATES.get(template_path)
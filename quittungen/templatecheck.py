@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Prüfung der Word-Vorlage vor dem Lauf.
+
+Eine fehlerhafte Vorlage fällt sonst erst auf, wenn hunderte Quittungen
+gedruckt sind: ein Platzhalter mit Tippfehler ({{ELTERN_NAME }}, {NR}}) bleibt
+einfach als Text stehen. check_template() liest die Vorlage einmal direkt aus
+dem Archiv (ohne python-docx) und listet jeden Platzhalter mit Fundstelle
+(Haupttext, Tabelle, Textfeld, Kopf-/Fußzeile, ...) und der Zahl der Runs, auf
+die Word ihn verteilt hat. Gemeldet werden
+
+- Platzhalter, die die Quittung nicht befüllt (RECEIPT_PLACEHOLDERS),
+- fehlende Pflicht-Platzhalter (REQUIRED_PLACEHOLDERS),
+- Text, der wie ein Platzhalter aussieht, aber keiner ist,
+- Platzhalter außerhalb des Haupttexts, wenn eine Datei pro Klasse entstehen soll.
+
+Über mehrere Runs verteilte Platzhalter setzt die Vorlage (quittungen.template)
+selbst zusammen; unterschiedlich formatierte Runs sind nur eine Warnung, da der
+Wert die Formatierung des ersten Runs bekommt.
+
+Das Ergebnis wird je SHA-256 der Vorlagendatei zwischengespeichert, eine
+unveränderte Vorlage wird also nur einmal gelesen.
+"""
+
+import re
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass, field
+
+from lxml import etree
+
+from .manifest import file_hash
+from .template import PLACEHOLDER_RE
+
+# Muss zu den Ersetzungen in pipeline._generate_receipts passen
+RECEIPT_PLACEHOLDERS = ("{{ELTERN_NAME}}", "{{KINDER_NAMEN}}", "{{NR}}", "{{DATUM}}", "{{SCHULJAHR}}",
+                        "{{BETRAG_GEBUEHR}}", "{{GESAMTBETRAG}}", "{{BETRAG_GEBUEHR_WORT}}",
+                        "{{GESAMTBETRAG_WORT}}", "{{BETRAG_MITGLIED}}", "{{BETRAG_MITGLIED_WORT}}")
+# Ohne diese ist die Quittung nicht zu gebrauchen
+REQUIRED_PLACEHOLDERS = ("{{ELTERN_NAME}}", "{{KINDER_NAMEN}}", "{{NR}}", "{{GESAMTBETRAG}}")
+
+LOCATION_BODY = "body"
+LOCATION_TABLE = "table"
+LOCATION_TEXTBOX = "textbox"
+LOCATION_HEADER = "header"
+LOCATION_FOOTER = "footer"
+LOCATION_FOOTNOTE = "footnote"
+LOCATION_OTHER = "other"
+LOCATIONS = {
+    LOCATION_BODY: "Haupttext",
+    LOCATION_TABLE: "Tabelle",
+    LOCATION_TEXTBOX: "Textfeld",
+    LOCATION_HEADER: "Kopfzeile",
+    LOCATION_FOOTER: "Fußzeile",
+    LOCATION_FOOTNOTE: "Fuß-/Endnote",
+    LOCATION_OTHER: "sonstiger Teil",
+}
+# Nur diese Stellen landen in der Word-Datei pro Klasse (CompiledTemplate.save_combined)
+MAIN_DOCUMENT_LOCATIONS = (LOCATION_BODY, LOCATION_TABLE, LOCATION_TEXTBOX)
+
+_MAIN_PART = "word/document.xml"
+_PART_LOCATIONS = (("word/header", LOCATION_HEADER), ("word/footer", LOCATION_FOOTER),
+                   ("word/footnotes", LOCATION_FOOTNOTE), ("word/endnotes", LOCATION_FOOTNOTE))
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P = _W + "p"
+_W_R = _W + "r"
+_W_T = _W + "t"
+_W_RPR = _W + "rPr"
+# Unterscheiden Runs nur hierin (Rechtschreibprüfung), sieht der Platzhalter gleich aus
+_IGNORED_FORMAT = (_W + "lang", _W + "noProof", _W + "rPrChange")
+_W_TBL = _W + "tbl"
+_W_TXBX = _W + "txbxContent"
+# Textfelder stehen zusätzlich als VML-Ersatzdarstellung im Dokument
+_MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+
+# Alles mit doppelter Klammer auf einer Seite, z.B. {{ NR }}, {NR}}, {{NR}, {{Eltern-Name}}
+_LOOSE_RE = re.compile(r"\{+[^{}]{0,40}\}+|\{\{[^{}]{0,40}$")
+
+_CACHE_SIZE = 16
+
+# name: Platzhalter mit Klammern; part: Archiv-Eintrag; runs: Anzahl Runs, auf die er verteilt ist;
+# mixed_format: die Runs sind unterschiedlich formatiert
+PlaceholderUse = namedtuple("PlaceholderUse", ["name", "location", "part", "runs", "mixed_format"])
+# text: der verdächtige Text, z.B. '{{ NR }}'
+MalformedPlaceholder = namedtuple("MalformedPlaceholder", ["text", "location", "part"])
+
+
+@dataclass
+class TemplateCheck:
+    template_hash: str
+    uses: list = field(default_factory=list)
+    malformed: list = field(default_factory=list)
+
+    @property
+    def placeholders(self):
+        return {use.name for use in self.uses}
+
+    @property
+    def unknown(self):
+        return sorted(self.placeholders - set(RECEIPT_PLACEHOLDERS))
+
+    @property
+    def missing(self):
+        return [name for name in REQUIRED_PLACEHOLDERS if name not in self.placeholders]
+
+    @property
+    def unused(self):
+        """Platzhalter, die befüllt werden könnten, aber in der Vorlage nicht vorkommen (kein Fehler)."""
+        return [name for name in RECEIPT_PLACEHOLDERS
+                if name not in self.placeholders and name not in REQUIRED_PLACEHOLDERS]
+
+    def problems(self, class_documents=False):
+        """Fehler, mit denen kein Lauf gestartet werden sollte."""
+        problems = [f"Unbekannter Platzhalter {name} ({self._where(name)}) - er würde unverändert "
+                    f"auf jeder Quittung stehen." for name in self.unknown]
+        problems += [f"Pflicht-Platzhalter {name} fehlt in der Vorlage." for name in self.missing]
+        problems += [f"Fehlerhafter Platzhalter '{entry.text}' ({LOCATIONS[entry.location]}) - "
+                     f"erlaubt sind nur {{{{GROSSBUCHSTABEN_ZIFFERN}}}} ohne Leerzeichen."
+                     for entry in self.malformed]
+        if class_documents:
+            outside = sorted({use.name for use in self.uses if use.location not in MAIN_DOCUMENT_LOCATIONS})
+            if outside:
+                problems.append(f"Für eine Datei pro Klasse müssen alle Platzhalter im Haupttext stehen, "
+                                f"nicht in Kopf-/Fußzeilen o.ä.: {', '.join(outside)}")
+        return problems
+
+    def warnings(self):
+        names = sorted({use.name for use in self.uses if use.mixed_format})
+        return [f"Platzhalter {name} ist über unterschiedlich formatierte Textteile verteilt; "
+                f"der Wert bekommt die Formatierung des ersten Teils." for name in names]
+
+    def _where(self, name):
+        return ", ".join(sorted({LOCATIONS[use.location] for use in self.uses if use.name == name}))
+
+    def describe(self):
+        """Übersicht aller Platzhalter für die Kommandozeile."""
+        # (Name, Fundstelle, Teil) -> [Anzahl, größte Zahl an Runs]
+        grouped = {}
+        for use in self.uses:
+            entry = grouped.setdefault((use.name, use.location, use.part), [0, 1])
+            entry[0] += 1
+            entry[1] = max(entry[1], use.runs)
+        lines = []
+        for (name, location, part), (count, runs) in sorted(
+                grouped.items(), key=lambda item: (item[0][0], list(LOCATIONS).index(item[0][1]), item[0][2])):
+            details = [f"{count}x"] if count > 1 else []
+            if runs > 1:
+                details.append(f"verteilt auf bis zu {runs} Runs")
+            suffix = f" - {', '.join(details)}" if details else ""
+            lines.append(f"{name:<24} {LOCATIONS[location]} ({part}){suffix}")
+        return "\n".join(lines)
+
+
+def _part_location(part):
+    if part == _MAIN_PART:
+        return LOCATION_BODY
+    for prefix, location in _PART_LOCATIONS:
+        if part.startswith(prefix):
+            return location
+    return LOCATION_OTHER
+
+
+def _paragraph_location(paragraph, part_location):
+    if part_location != LOCATION_BODY:
+        return part_location
+    location = LOCATION_BODY
+    for ancestor in paragraph.iterancestors(_W_TXBX, _W_TBL):
+        if ancestor.tag == _W_TXBX:
+            return LOCATION_TEXTBOX
+        location = LOCATION_TABLE
+    return location
+
+
+def _run_format(text_element):
+    run = text_element.getparent()
+    rpr = run.find(_W_RPR) if run is not None and run.tag == _W_R else None
+    if rpr is None:
+        return ()
+    return tuple(sorted(etree.tostring(child) for child in rpr if child.tag not in _IGNORED_FORMAT))
+
+
+def _check_paragraph(paragraph, part, part_location, check):
+    # Wie in quittungen.template: nur die <w:t> dieses Absatzes, nicht die verschachtelter Absätze
+    texts = [t for t in paragraph.iter(_W_T) if next(t.iterancestors(_W_P), None) is paragraph]
+    full_text = "".join(t.text or "" for t in texts)
+    if "{" not in full_text and "}" not in full_text:
+        return
+    location = _paragraph_location(paragraph, part_location)
+
+    owners = []
+    for index, t in enumerate(texts):
+        owners.extend([index] * len(t.text or ""))
+    strict_spans = []
+    for match in PLACEHOLDER_RE.finditer(full_text):
+        strict_spans.append(match.span())
+        elements = sorted(set(owners[match.start():match.end()]))
+        runs = []
+        for index in elements:
+            run = texts[index].getparent()
+            if not any(run is other for other in runs):
+                runs.append(run)
+        formats = {_run_format(texts[index]) for index in elements}
+        check.uses.append(PlaceholderUse(match.group(0), location, part, len(runs), len(formats) > 1))
+
+    for match in _LOOSE_RE.finditer(full_text):
+        text = match.group(0)
+        if "{{" not in text and "}}" not in text:
+            continue
+        if any(start <= match.start() and match.end() <= end for start, end in strict_spans):
+            continue
+        check.malformed.append(MalformedPlaceholder(text, location, part))
+
+
+def analyze_template(template_path, template_hash=None):
+    """Liest die Vorlage und gibt ein TemplateCheck zurück (ohne Cache, siehe check_template)."""
+    check = TemplateCheck(template_hash)
+    with zipfile.ZipFile(template_path) as archive:
+        if _MAIN_PART not in archive.namelist():
+            raise zipfile.BadZipFile(f"{_MAIN_PART} fehlt")
+        for part in sorted(archive.namelist()):
+            if not (part.startswith("word/") and part.endswith(".xml")) or "/_rels/" in part:
+                continue
+            root = etree.fromstring(archive.read(part))
+            if root.find(f".//{_W_P}") is None:
+                continue
+            part_location = _part_location(part)
+            for paragraph in root.iter(_W_P):
+                # Ersatzdarstellung von Textfeldern nicht doppelt zählen
+                if next(paragraph.iterancestors(_MC_FALLBACK), None) is not None:
+                    continue
+                _check_paragraph(paragraph, part, part_location, check)
+    return check
+
+
+_CHECKS = OrderedDict()
+_CHECKS_LOCK = threading.Lock()
+
+
+def check_template(template_path, template_hash=None):
+    """
+    Wie analyze_template(), aber je Datei-Hash zwischengespeichert. Den Hash
+    kann übergeben, wer ihn ohnehin berechnet (z.B. für das Manifest).
+    """
+    if template_hash is None:
+        template_hash = file_hash(template_path)
+    with _CHECKS_LOCK:
+        if template_hash in _CHECKS:
+            _CHECKS.move_to_end(template_hash)
+            return _CHECKS[template_hash]
+    try:
+        check = analyze_template(template_path, template_hash)
+    except (zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        raise ValueError(f"Die Vorlage '{template_path}' ist keine gültige Word-Datei (.docx): {e}") from None
+    with _CHECKS_LOCK:
+        _CHECKS[template_hash] = check
+        while len(_CHECKS) > _CACHE_SIZE:
+            _CHECKS.popitem(last=False)
+    return check
+
+
+def validate_template(template_path, class_documents=False, template_hash=None):
+    """
+    Prüft die Vorlage und löst bei Fehlern einen ValueError mit allen Fehlern
+    aus. Gibt sonst das TemplateCheck zurück (Warnungen siehe warnings()).
+    """
+    check = check_template(template_path, template_hash)
+    problems = check.problems(class_documents)
+    if problems:
+        raise ValueError(f"Die Vorlage '{template_path}' ist fehlerhaft:\n" + "\n".join(problems))
+    return check
@@ -2,18 +2,18 @@
 """
 Quittungs-Generator für Schulgebühren - Threading, Cancelling & PDF/Word Edition
 Inklusive Excel-Übersichtstabelle
+
+Die eigentliche Verarbeitung steckt im Paket `quittungen` (auch ohne GUI
+nutzbar: python -m quittungen --help); diese Datei ist nur die Oberfläche.
 """
 
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import pandas as pd
-from docx import Document
 import os
 import sys
-import shutil
 import threading
-from datetime import datetime
-from num2words import num2words
+import traceback
+import multiprocessing
 
 # --- NEU: FIX FÜR DIE .EXE DATEI (NOCONSOLE) ---
 class DummyOutput:
@@ -26,22 +26,50 @@ if sys.stderr is None:
     sys.stderr = DummyOutput()
 # -----------------------------------------------
 
-# --- IMPORTE FÜR PDF ---
-try:
-    from docx2pdf import convert
-    from pypdf import PdfWriter
-    import pythoncom  
-    HAS_PDF_TOOLS = True
-except ImportError:
-    HAS_PDF_TOOLS = False
-
 try:
     from PIL import Image, ImageTk
     HAS_PILLOW = True
 except ImportError:
     HAS_PILLOW = False
 
-cancel_flag = False
+from quittungen.progress import ProgressChannel, describe_throughput
+
+cancel_event = threading.Event()
+# Fortschritt und Meldungen der Worker-Threads; poll_progress() holt sie im GUI-Thread ab
+progress_channel = ProgressChannel()
+# Takt der Fortschrittsanzeige (ca. 20 Bilder pro Sekunde)
+PROGRESS_FRAME_MS = 50
+
+# Anzeige im Auswahlfeld -> Name des PDF-Backends (None = automatisch)
+PDF_BACKEND_CHOICES = {
+    "Automatisch": None,
+    "Microsoft Word (COM)": "word",
+    "Integriert (ohne Word)": "native",
+}
+
+# Anzeige im Auswahlfeld -> (eine Datei pro Klasse, eine Datei pro Familie)
+WORD_OUTPUT_CHOICES = {
+    "Eine Datei pro Familie": (False, True),
+    "Eine Datei pro Klasse": (True, False),
+    "Beides": (True, True),
+}
+
+# Anzeige im Auswahlfeld -> Profiling-Modus für den Laufbericht (None = aus)
+PROFILE_CHOICES = {
+    "Aus": None,
+    "Rechenzeit (cProfile)": "cpu",
+    "Speicher (tracemalloc)": "memory",
+}
+
+# Anzeige im Auswahlfeld -> Umgang mit doppelten Familien (quittungen.duplicates)
+DUPLICATE_CHOICES = {
+    "Melden": "report",
+    "Gleiche E-Mail zusammenführen": "merge",
+    "Nicht prüfen": "off",
+}
+
+# Fertige Dateien stehen schon im Manifest, ein inkrementeller Lauf macht dort weiter
+CANCELLED_STATUS = "Prozess durch Benutzer abgebrochen. Mit „inkrementell“ lässt er sich fortsetzen."
 
 def initialize_paths():
     try:
@@ -79,52 +107,20 @@ def initialize_paths():
     except Exception as e:
         print(f"Fehler bei der Initialisierung der Pfade: {e}")
 
-def docx_replace_text(doc_obj, old_text, new_text):
-    for p in doc_obj.paragraphs:
-        if old_text in p.text:
-            inline = p.runs
-            for i in range(len(inline)):
-                if old_text in inline[i].text:
-                    text = inline[i].text.replace(old_text, new_text)
-                    inline[i].text = text
-                    for j in range(i + 1, len(inline)):
-                        if old_text in inline[j].text:
-                            inline[j].text = inline[j].text.replace(old_text, "")
-                    break 
-
-    for table in doc_obj.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                docx_replace_text(cell, old_text, new_text)
-
-def load_prices(filepath):
-    price_sheets = pd.read_excel(filepath, sheet_name=None)
-    
-    fee_df = price_sheets['Gebuehren']
-    fee_df.columns = fee_df.columns.str.strip() 
-    child_fees = pd.Series(fee_df.Betrag.values, index=fee_df.Kind_Nr).to_dict()
-
-    contribution_df = price_sheets['Beitraege']
-    contribution_df.columns = contribution_df.columns.str.strip()
-    membership_fee = contribution_df[contribution_df.Posten == 'Mitgliedsbeitrag']['Betrag'].iloc[0]
-    
-    config_df = price_sheets['Konfiguration']
-    config_df.columns = config_df.columns.str.strip()
-    school_year = config_df[config_df.Eigenschaft == 'Schuljahr']['Wert'].iloc[0]
-    
-    return child_fees, float(membership_fee), str(school_year)
-
 def toggle_buttons(running=False):
     state = tk.DISABLED if running else tk.NORMAL
     cancel_state = tk.NORMAL if running else tk.DISABLED
     
     btn_generate_word.config(state=state)
     btn_generate_pdf.config(state=state)
+    btn_generate_all.config(state=state)
+    btn_batch.config(state=state)
     btn_cancel.config(state=cancel_state)
+    if not running:
+        throughput_var.set("")
 
 def cancel_process():
-    global cancel_flag
-    cancel_flag = True
+    cancel_event.set()
     status_var.set("Abbruch wird eingeleitet... Bitte warten.")
     btn_cancel.config(state=tk.DISABLED)
 
@@ -137,12 +133,108 @@ def show_message_threadsafe(title, msg, is_error=False, is_warning=False):
         messagebox.showinfo(title, msg)
 
 
+def show_progress_threadsafe(event, source=None):
+    # Nur vormerken; angezeigt wird der neueste Stand beim nächsten poll_progress()
+    progress_channel.report(event, source)
+
+
+def poll_progress():
+    # Zuerst neu planen: ein fehlerhafter Aufruf darf die Anzeige nicht dauerhaft anhalten
+    root.after(PROGRESS_FRAME_MS, poll_progress)
+    snapshot, calls = progress_channel.poll()
+    if snapshot is not None:
+        progress_bar.config(maximum=max(snapshot.total, 1))
+        progress_var.set(snapshot.current)
+        status_var.set(snapshot.message)
+        throughput_var.set(describe_throughput(snapshot))
+    for func, args in calls:
+        try:
+            func(*args)
+        except Exception:
+            print(f"Fehler in der Oberfläche bei {getattr(func, '__name__', func)}:")
+            traceback.print_exc()
+
+
+def start_progress():
+    progress_channel.reset()
+    toggle_buttons(running=True)
+    progress_var.set(0)
+    throughput_var.set("")
+
+
+def show_report_window(title, summary, errors):
+    """Abschlussmeldung mit durchsuchbarer Liste der Fehler/Warnungen statt einer riesigen Messagebox."""
+    window = tk.Toplevel(root)
+    window.title(title)
+    window.geometry("760x560")
+    window.transient(root)
+
+    tk.Label(window, text=summary, justify=tk.LEFT, anchor="w", wraplength=730).pack(fill=tk.X, padx=10, pady=(10, 5))
+
+    filter_frame = tk.Frame(window)
+    filter_frame.pack(fill=tk.X, padx=10)
+    tk.Label(filter_frame, text="Filter:").pack(side=tk.LEFT)
+    filter_var = tk.StringVar()
+    filter_entry = tk.Entry(filter_frame, textvariable=filter_var)
+    filter_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+    count_var = tk.StringVar()
+    tk.Label(filter_frame, textvariable=count_var, fg="gray").pack(side=tk.LEFT)
+
+    list_frame = tk.Frame(window)
+    list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+    list_frame.grid_rowconfigure(0, weight=1)
+    list_frame.grid_columnconfigure(0, weight=1)
+    listbox = tk.Listbox(list_frame, activestyle="none")
+    y_scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=listbox.yview)
+    x_scroll = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL, command=listbox.xview)
+    listbox.config(yscrollcommand=y_scroll.set, xscrollcommand=x_scroll.set)
+    listbox.grid(row=0, column=0, sticky="nsew")
+    y_scroll.grid(row=0, column=1, sticky="ns")
+    x_scroll.grid(row=1, column=0, sticky="ew")
+
+    # Vollständiger Text des ausgewählten Eintrags (mehrzeilig)
+    detail = tk.Text(window, height=6, wrap="word", state=tk.DISABLED)
+    detail.pack(fill=tk.X, padx=10)
+    shown = []
+
+    def show_detail(_event=None):
+        selection = listbox.curselection()
+        detail.config(state=tk.NORMAL)
+        detail.delete("1.0", tk.END)
+        if selection:
+            detail.insert("1.0", shown[selection[0]])
+        detail.config(state=tk.DISABLED)
+
+    def refresh(*_):
+        needle = filter_var.get().casefold()
+        shown[:] = [error for error in errors if needle in error.casefold()]
+        listbox.delete(0, tk.END)
+        for error in shown:
+            listbox.insert(tk.END, " | ".join(line.strip() for line in error.splitlines() if line.strip()))
+        count_var.set(f"{len(shown)} von {len(errors)}")
+        show_detail()
+
+    def copy_shown():
+        root.clipboard_clear()
+        root.clipboard_append("\n\n".join(shown))
+
+    filter_var.trace_add("write", refresh)
+    listbox.bind("<<ListboxSelect>>", show_detail)
+
+    button_row = tk.Frame(window)
+    button_row.pack(pady=10)
+    tk.Button(button_row, text="Angezeigte kopieren", command=copy_shown).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_row, text="Schließen", command=window.destroy).pack(side=tk.LEFT, padx=5)
+
+    refresh()
+    filter_entry.focus_set()
+
+
 # ==========================================
 # PHASE 1: WORD-DOKUMENTE GENERIEREN (THREAD)
 # ==========================================
 def start_word_generation():
-    global cancel_flag
-    cancel_flag = False
+    cancel_event.clear()
     
     excel_path = excel_path_var.get()
     template_path = template_path_var.get()
@@ -153,180 +245,73 @@ def start_word_generation():
         messagebox.showerror("Fehler", "Bitte alle Pfade auswählen!")
         return
 
-    toggle_buttons(running=True)
-    progress_var.set(0)
+    start_progress()
     
-    threading.Thread(target=generate_word_receipts_task, args=(excel_path, template_path, prices_path, output_dir), daemon=True).start()
+    threading.Thread(target=generate_word_receipts_task, args=(excel_path, template_path, prices_path, output_dir, use_processes_var.get(), incremental_var.get(), word_output_var.get(), PROFILE_CHOICES[profile_var.get()], DUPLICATE_CHOICES[duplicates_var.get()]), daemon=True).start()
 
-def generate_word_receipts_task(excel_path, template_path, prices_path, output_dir):
-    global cancel_flag
-    errors_found = []
-    class_folders = set()
-    quittungs_nr = 1 
-    
-    # NEU: Liste für die Excel-Übersichtstabelle
-    summary_data = []
-    
+def generate_word_receipts_task(excel_path, template_path, prices_path, output_dir, use_processes=False, incremental=False,
+                                word_output="Eine Datei pro Familie", profile=None, duplicates="report"):
     try:
-        child_fees, membership_fee, school_year = load_prices(prices_path)
-        
-        df = pd.read_excel(excel_path)
-        df.dropna(subset=['Eltern 1 - Emailadresse', 'Name Kind'], inplace=True)
-        df['Eltern 1 - Emailadresse'] = df['Eltern 1 - Emailadresse'].astype(str).str.strip()
-        
-        df['In Klasse Sortierung'] = df['In Klasse'].astype(str)
-        df.sort_values(by='In Klasse Sortierung', inplace=True)
-        
-        grouped = df.groupby('Eltern 1 - Emailadresse', sort=False)
-        
-        total_parents = len(grouped)
-        
-        root.after(0, lambda: progress_bar.config(maximum=total_parents))
-        root.after(0, lambda: status_var.set(f"Starte Generierung von {total_parents} Word-Quittungen..."))
-        
-        current_progress = 0
-
-        for parent_email, group in grouped:
-            if cancel_flag:
-                break
-
-            try:
-                parent_full_name = str(group['Eltern 1 - Name'].iloc[0]).strip()
-                
-                is_group_valid = True
-                for index, row in group.iterrows():
-                    kind_value = row['Name Kind']
-                    if not isinstance(kind_value, str):
-                        excel_row_number = index + 2
-                        errors_found.append(f"Mitglied: '{parent_full_name}' ({parent_email})\nGrund: Ungültiger Datentyp in Spalte 'Name Kind' (Zeile {excel_row_number}).")
-                        is_group_valid = False
-                        break 
-                
-                if not is_group_valid: continue 
-                if group['In Klasse'].isin(['Warteliste', '', ' ']).any(): continue
-
-                doc = Document(template_path)
-                num_children = len(group)
-                
-                kinder_liste = [str(name) for name in group['Name Kind']]
-                if len(kinder_liste) > 2:
-                    children_names = ", ".join(kinder_liste[:-1]) + " und " + kinder_liste[-1]
-                else:
-                    children_names = " und ".join(kinder_liste)
-
-                total_school_fee = sum(child_fees.get(i, 0) for i in range(1, num_children + 1))
-                total_amount = total_school_fee + membership_fee
-                
-                klasse = str(group['In Klasse'].iloc[0])
-                safe_klasse = klasse.replace("/", "_").replace("\\", "_")
-                
-                eindeutige_nummer = f"{quittungs_nr:03d}"
-                
-                replacements = {
-                    "{{ELTERN_NAME}}": parent_full_name,
-                    "{{KINDER_NAMEN}}": children_names, 
-                    "{{NR}}": eindeutige_nummer, 
-                    "{{DATUM}}": datetime.now().strftime("%d.%m.%Y"), 
-                    "{{SCHULJAHR}}": str(school_year),
-                    "{{BETRAG_GEBUEHR}}": f"{total_school_fee:,.2f} EUR".replace(",", "X").replace(".", ",").replace("X", "."),
-                    "{{GESAMTBETRAG}}": f"{total_amount:,.2f} EUR".replace(",", "X").replace(".", ",").replace("X", "."),
-                    "{{BETRAG_GEBUEHR_WORT}}": f"{num2words(int(total_school_fee), lang='de')} Euro", 
-                    "{{GESAMTBETRAG_WORT}}": f"{num2words(int(total_amount), lang='de')} Euro",
-                    "{{BETRAG_MITGLIED}}": f"{membership_fee:,.2f} EUR".replace(",", "X").replace(".", ",").replace("X", "."),
-                    "{{BETRAG_MITGLIED_WORT}}": f"{num2words(int(membership_fee), lang='de')} Euro",
-                }
-
-                for old, new in replacements.items():
-                    docx_replace_text(doc, old, str(new))
-
-                outdir_class = os.path.join(output_dir, safe_klasse)
-                
-                if not os.path.exists(outdir_class):
-                    os.makedirs(outdir_class)
-                class_folders.add(outdir_class)
-
-                safe_parent_name = parent_full_name.replace(" ", "_").replace("/", "_")
-                
-                jahr_erstellung = datetime.now().strftime("%Y")
-                dateiname = f"{jahr_erstellung}_Quittung_{eindeutige_nummer}_{safe_parent_name}.docx"
-                output_filename = os.path.join(outdir_class, dateiname)
-                
-                doc.save(output_filename)
-
-                # NEU: Daten zur Übersichtstabelle hinzufügen
-                summary_data.append({
-                    'Quittung Nr.': eindeutige_nummer,
-                    'Eltern 1 - Name': parent_full_name,
-                    'Eltern 1 - Emailadresse': parent_email,
-                    'In Klasse': klasse,
-                    'Rechnungsbeitrag (€)': total_amount,
-                    'Namen aller Kinder': children_names
-                })
-
-                quittungs_nr += 1
-                
-                current_progress += 1
-                root.after(0, progress_var.set, current_progress)
-                root.after(0, status_var.set, f"Erstelle Word-Dokumente... ({current_progress}/{total_parents})")
-
-            except Exception as e:
-                errors_found.append(f"Mitglied: '{parent_email}'\nGrund: Unerwarteter Fehler -> {e}")
-                continue 
-
-        if cancel_flag:
-            root.after(0, status_var.set, "Prozess durch Benutzer abgebrochen.")
+        # Schwere Abhängigkeiten (pandas, python-docx) erst beim ersten Lauf laden
+        from quittungen.pipeline import generate_receipts
+        from quittungen.rendering import default_worker_count
+
+        workers = default_worker_count() if use_processes else 1
+        class_documents, family_files = WORD_OUTPUT_CHOICES[word_output]
+        report = generate_receipts(excel_path, prices_path, template_path, output_dir, workers=workers,
+                                   incremental=incremental, progress=show_progress_threadsafe, cancel=cancel_event,
+                                   class_documents=class_documents, family_files=family_files, profile=profile,
+                                   duplicates=duplicates)
+
+        if report.cancelled:
+            progress_channel.call(status_var.set, CANCELLED_STATUS)
             return
 
-        # NEU: Erstelle die Übersichtstabelle in Excel am Ende von Schritt 1
-        if summary_data:
-            try:
-                summary_df = pd.DataFrame(summary_data)
-                jahr_erstellung = datetime.now().strftime("%Y")
-                summary_file = os.path.join(output_dir, f"{jahr_erstellung}_Quittungen_Uebersicht.xlsx")
-                summary_df.to_excel(summary_file, index=False)
-            except Exception as e:
-                errors_found.append(f"Fehler beim Erstellen der Übersichtstabelle: {e}")
-
         # Abschlussmeldung Word
-        root.after(0, progress_var.set, total_parents)
-        
-        generierte_quittungen = quittungs_nr - 1
-        anzahl_klassen = len(class_folders)
-
         zusammenfassung = (
             f"Statistik:\n"
-            f"➜ {generierte_quittungen} Quittungen (Familien) erstellt.\n"
-            f"➜ Aufgeteilt in {anzahl_klassen} verschiedene Klassen.\n"
-            f"➜ Übersichtstabelle (Excel) wurde generiert."
+            f"➜ {report.receipts} Quittungen (Familien) erstellt.\n"
+            f"➜ Aufgeteilt in {report.classes} verschiedene Klassen.\n"
+            f"➜ Übersichtstabelle (Excel) mit Summen je Klasse wurde generiert."
         )
+        if report.class_documents:
+            zusammenfassung += f"\n➜ {report.class_documents} Word-Dateien pro Klasse geschrieben."
+        if report.duplicates:
+            merged = sum(1 for group in report.duplicates if group["merged"])
+            zusammenfassung += f"\n➜ {len(report.duplicates)} mögliche doppelte Familien, davon {merged} zusammengeführt."
+        if report.run_report:
+            zusammenfassung += f"\n➜ Laufbericht: {os.path.basename(report.run_report)}"
+        if incremental:
+            zusammenfassung += (
+                f"\n➜ Davon {report.unchanged} unverändert übernommen, {report.removed} entfernt.\n"
+                f"➜ Neu zu erstellende Sammel-PDFs: {len(report.stale_classes)}"
+            )
         
-        if not errors_found:
-            root.after(0, status_var.set, "Word-Generierung erfolgreich abgeschlossen!")
-            root.after(0, show_message_threadsafe, "Schritt 1 abgeschlossen", f"Word-Dateien erfolgreich generiert!\n\n{zusammenfassung}\n\nDu kannst die Dateien nun im Ausgabeordner kontrollieren und bei Bedarf anpassen, bevor du Schritt 2 ausführst.")
+        if not report.errors:
+            progress_channel.call(status_var.set, "Word-Generierung erfolgreich abgeschlossen!")
+            progress_channel.call(show_message_threadsafe, "Schritt 1 abgeschlossen", f"Word-Dateien erfolgreich generiert!\n\n{zusammenfassung}\n\nDu kannst die Dateien nun im Ausgabeordner kontrollieren und bei Bedarf anpassen, bevor du Schritt 2 ausführst.")
         else:
-            root.after(0, status_var.set, "Mit Warnungen abgeschlossen.")
-            error_summary = "\n\n------------------------------------\n\n".join(errors_found)
-            final_message = (
-                f"Word-Dateien wurden generiert.\n\n{zusammenfassung}\n\n"
-                f"Es gab jedoch Probleme/Fehler:\n\n{error_summary}"
-            )
-            root.after(0, show_message_threadsafe, "Word-Generierung (mit Warnungen)", final_message, False, True)
+            progress_channel.call(status_var.set, "Mit Warnungen abgeschlossen.")
+            progress_channel.call(show_report_window, "Word-Generierung (mit Warnungen)",
+                                  f"Word-Dateien wurden generiert.\n\n{zusammenfassung}\n\nEs gab jedoch Probleme/Fehler:", report.errors)
 
     except Exception as e:
-        root.after(0, status_var.set, "Kritischer Fehler aufgetreten!")
-        root.after(0, show_message_threadsafe, "Kritischer Fehler", f"Ein Fehler hat die Verarbeitung gestoppt:\n{e}", True)
+        progress_channel.call(status_var.set, "Kritischer Fehler aufgetreten!")
+        progress_channel.call(show_message_threadsafe, "Kritischer Fehler", f"Ein Fehler hat die Verarbeitung gestoppt:\n{e}", True)
     finally:
-        root.after(0, toggle_buttons, False)
+        progress_channel.call(toggle_buttons, False)
 
 
 # ==========================================
 # PHASE 2: PDFS GENERIEREN (THREAD)
 # ==========================================
 def start_pdf_generation():
-    global cancel_flag
-    
-    if not HAS_PDF_TOOLS:
-        messagebox.showerror("Fehlende Pakete", "Bitte installiere die PDF-Erweiterungen im Terminal:\n\npip install docx2pdf pypdf pythoncom")
+    from quittungen.pdf import default_backend_name, get_backend
+
+    backend_name = PDF_BACKEND_CHOICES[pdf_backend_var.get()] or default_backend_name()
+    backend = get_backend(backend_name)
+    if not backend.is_available():
+        messagebox.showerror("Fehlende Pakete", f"Bitte installiere die PDF-Erweiterungen im Terminal:\n\n{backend.missing_packages_hint}")
         return
 
     output_dir = output_dir_var.get()
@@ -334,110 +319,206 @@ def start_pdf_generation():
         messagebox.showerror("Fehler", "Bitte den Ausgabeordner auswählen!")
         return
 
-    cancel_flag = False
-    toggle_buttons(running=True)
-    progress_var.set(0)
+    cancel_event.clear()
+    start_progress()
     
-    threading.Thread(target=generate_pdf_receipts_task, args=(output_dir,), daemon=True).start()
+    threading.Thread(target=generate_pdf_receipts_task, args=(output_dir, backend_name, use_processes_var.get(), incremental_var.get(), single_pdfs_var.get(), PROFILE_CHOICES[profile_var.get()]), daemon=True).start()
 
-def generate_pdf_receipts_task(output_dir):
-    global cancel_flag
-    errors_found = []
+def generate_pdf_receipts_task(output_dir, backend_name=None, use_processes=False, incremental=False, single_pdfs=False, profile=None):
+    try:
+        from quittungen.pipeline import generate_pdfs
+        from quittungen.rendering import default_worker_count
 
-    if HAS_PDF_TOOLS:
-        pythoncom.CoInitialize()
+        workers = default_worker_count() if use_processes else 1
+        report = generate_pdfs(output_dir, backend=backend_name, workers=workers, incremental=incremental, single_pdfs=single_pdfs,
+                               progress=show_progress_threadsafe, cancel=cancel_event, profile=profile)
 
-    try:
-        class_folders = []
-        total_docx_files = 0
-        
-        if os.path.exists(output_dir):
-            for element in os.listdir(output_dir):
-                element_path = os.path.join(output_dir, element)
-                if os.path.isdir(element_path):
-                    docx_files = [f for f in os.listdir(element_path) if f.endswith('.docx') and not f.startswith('~')]
-                    if docx_files:
-                        class_folders.append(element_path)
-                        total_docx_files += len(docx_files)
-
-        if not class_folders:
-            root.after(0, status_var.set, "Warte auf Start...")
-            root.after(0, show_message_threadsafe, "Info", "Keine Klassen-Ordner mit Word-Dateien im Ausgabeordner gefunden.\nBitte führe zuerst Schritt 1 aus.")
+        if not report.docx_files:
+            progress_channel.call(status_var.set, "Warte auf Start...")
+            progress_channel.call(show_message_threadsafe, "Info", "Keine Klassen-Ordner mit Word-Dateien im Ausgabeordner gefunden.\nBitte führe zuerst Schritt 1 aus.")
             return
 
-        anzahl_klassen = len(class_folders)
-        
-        root.after(0, lambda: progress_bar.config(maximum=anzahl_klassen))
-        root.after(0, lambda: status_var.set(f"Starte PDF-Konvertierung für {anzahl_klassen} Klassen..."))
+        if report.cancelled:
+            progress_channel.call(status_var.set, CANCELLED_STATUS)
+            return
 
-        current_progress = 0
-        pdf_count = 0
+        zusammenfassung = (
+            f"Statistik:\n"
+            f"➜ {report.docx_files} Word-Dateien verarbeitet.\n"
+            f"➜ {report.pdf_files} Sammel-PDFs (Klassen) erfolgreich im Ausgabeordner erstellt."
+        )
+        if single_pdfs:
+            zusammenfassung += "\n➜ Einzel-PDFs wurden in den Klassenordnern behalten."
+        if report.pdf_cached:
+            zusammenfassung += f"\n➜ {report.pdf_cached} Word-Dateien unverändert, PDF aus dem Cache übernommen."
+        if report.run_report:
+            zusammenfassung += f"\n➜ Laufbericht: {os.path.basename(report.run_report)}"
+        if incremental:
+            zusammenfassung += f"\n➜ {report.unchanged} Klassen waren unverändert und wurden übersprungen."
+
+        if not report.errors:
+            progress_channel.call(status_var.set, "PDF-Sammelquittungen erfolgreich generiert!")
+            progress_channel.call(show_message_threadsafe, "Schritt 2 abgeschlossen", f"PDF-Prozess erfolgreich beendet!\n\n{zusammenfassung}")
+        else:
+            progress_channel.call(status_var.set, "Mit Warnungen abgeschlossen.")
+            progress_channel.call(show_report_window, "PDF-Generierung (mit Warnungen)",
+                                  f"PDF-Sammelquittungen wurden generiert.\n\n{zusammenfassung}\n\nEs gab jedoch Probleme/Fehler:", report.errors)
 
-        for class_folder in class_folders:
-            if cancel_flag:
-                break
+    except Exception as e:
+        progress_channel.call(status_var.set, "Kritischer Fehler aufgetreten!")
+        progress_channel.call(show_message_threadsafe, "Kritischer Fehler", f"Ein Fehler hat die PDF-Verarbeitung gestoppt:\n{e}", True)
+    finally:
+        progress_channel.call(toggle_buttons, False)
 
-            klasse_name = os.path.basename(class_folder)
-            root.after(0, status_var.set, f"Konvertiere Klasse {klasse_name} in PDFs... ({current_progress + 1}/{anzahl_klassen})")
-            
-            try:
-                convert(class_folder)
-                
-                merger = PdfWriter()
-                pdf_files = sorted([f for f in os.listdir(class_folder) if f.endswith('.pdf')])
-                
-                if pdf_files:
-                    final_pdf_path = os.path.join(output_dir, f"Sammel_PDF_Klasse_{klasse_name}.pdf")
-                    for pdf in pdf_files:
-                        merger.append(os.path.join(class_folder, pdf))
-                        
-                    merger.write(final_pdf_path)
-                    merger.close()
-                    pdf_count += 1
-                
-                current_progress += 1
-                root.after(0, progress_var.set, current_progress)
-                    
-            except Exception as e:
-                errors_found.append(f"Fehler bei PDF-Erstellung für Klasse {klasse_name}: {e}\n(Ist Microsoft Word geschlossen und bereit?)")
 
-        if cancel_flag:
-            root.after(0, status_var.set, "Prozess durch Benutzer abgebrochen.")
+# ==========================================
+# SCHRITT 1 + 2 IN EINEM DURCHLAUF (THREAD)
+# ==========================================
+def start_all_generation():
+    from quittungen.pdf import default_backend_name, get_backend
+
+    excel_path = excel_path_var.get()
+    template_path = template_path_var.get()
+    prices_path = prices_path_var.get()
+    output_dir = output_dir_var.get()
+
+    if not all([excel_path, template_path, prices_path, output_dir]):
+        messagebox.showerror("Fehler", "Bitte alle Pfade auswählen!")
+        return
+
+    backend_name = PDF_BACKEND_CHOICES[pdf_backend_var.get()] or default_backend_name()
+    backend = get_backend(backend_name)
+    if not backend.is_available():
+        messagebox.showerror("Fehlende Pakete", f"Bitte installiere die PDF-Erweiterungen im Terminal:\n\n{backend.missing_packages_hint}")
+        return
+
+    cancel_event.clear()
+    start_progress()
+
+    threading.Thread(target=generate_all_task, args=(excel_path, template_path, prices_path, output_dir, backend_name, use_processes_var.get(), incremental_var.get(), single_pdfs_var.get(), word_output_var.get(), PROFILE_CHOICES[profile_var.get()], DUPLICATE_CHOICES[duplicates_var.get()]), daemon=True).start()
+
+def generate_all_task(excel_path, template_path, prices_path, output_dir, backend_name=None, use_processes=False, incremental=False,
+                      single_pdfs=False, word_output="Eine Datei pro Familie", profile=None, duplicates="report"):
+    try:
+        from quittungen.pipeline import generate_all
+        from quittungen.rendering import default_worker_count
+
+        workers = default_worker_count() if use_processes else 1
+        class_documents, family_files = WORD_OUTPUT_CHOICES[word_output]
+        report = generate_all(excel_path, prices_path, template_path, output_dir, backend=backend_name, workers=workers,
+                              incremental=incremental, single_pdfs=single_pdfs, progress=show_progress_threadsafe,
+                              cancel=cancel_event, class_documents=class_documents, family_files=family_files, profile=profile,
+                              duplicates=duplicates)
+
+        if report.cancelled:
+            progress_channel.call(status_var.set, CANCELLED_STATUS)
             return
 
-        root.after(0, progress_var.set, anzahl_klassen)
-        
         zusammenfassung = (
             f"Statistik:\n"
-            f"➜ {total_docx_files} einzelne Quittungen verarbeitet.\n"
-            f"➜ {total_docx_files} Einzel-PDFs in den Klassenordnern generiert.\n"
-            f"➜ {pdf_count} Sammel-PDFs (Klassen) erfolgreich im Ausgabeordner erstellt."
+            f"➜ {report.receipts} Quittungen (Familien) in {report.classes} Klassen erstellt.\n"
+            f"➜ {report.pdf_files} Sammel-PDFs (Klassen) im Ausgabeordner erstellt."
+        )
+        if report.pdf_cached:
+            zusammenfassung += f"\n➜ {report.pdf_cached} Word-Dateien unverändert, PDF aus dem Cache übernommen."
+        if incremental:
+            zusammenfassung += f"\n➜ Davon {report.unchanged} Quittungen unverändert übernommen, {report.removed} entfernt."
+        if report.duplicates:
+            merged = sum(1 for group in report.duplicates if group["merged"])
+            zusammenfassung += f"\n➜ {len(report.duplicates)} mögliche doppelte Familien, davon {merged} zusammengeführt."
+        if report.run_report:
+            zusammenfassung += f"\n➜ Laufbericht: {os.path.basename(report.run_report)}"
+
+        if not report.errors:
+            progress_channel.call(status_var.set, "Word-Dateien und Sammel-PDFs erfolgreich generiert!")
+            progress_channel.call(show_message_threadsafe, "Fertig", f"Word-Dateien und PDFs erfolgreich generiert!\n\n{zusammenfassung}")
+        else:
+            progress_channel.call(status_var.set, "Mit Warnungen abgeschlossen.")
+            progress_channel.call(show_report_window, "Generierung (mit Warnungen)",
+                                  f"Word-Dateien und PDFs wurden generiert.\n\n{zusammenfassung}\n\nEs gab jedoch Probleme/Fehler:", report.errors)
+
+    except Exception as e:
+        progress_channel.call(status_var.set, "Kritischer Fehler aufgetreten!")
+        progress_channel.call(show_message_threadsafe, "Kritischer Fehler", f"Ein Fehler hat die Verarbeitung gestoppt:\n{e}", True)
+    finally:
+        progress_channel.call(toggle_buttons, False)
+
+
+# ==========================================
+# STAPEL: MEHRERE AUFTRÄGE AUS EINER DATEI (THREAD)
+# ==========================================
+def start_batch_generation():
+    from quittungen.batch import load_batch
+
+    batch_file = filedialog.askopenfilename(filetypes=[("Auftragsdatei", "*.json *.yaml *.yml")])
+    if not batch_file:
+        return
+    try:
+        jobs = load_batch(batch_file)
+    except Exception as e:
+        messagebox.showerror("Fehler in der Auftragsdatei", str(e))
+        return
+
+    cancel_event.clear()
+    start_progress()
+
+    threading.Thread(target=batch_task, args=(batch_file, len(jobs), use_processes_var.get(), PROFILE_CHOICES[profile_var.get()]), daemon=True).start()
+
+def batch_task(batch_file, job_count, use_processes=False, profile=None):
+    try:
+        from quittungen.batch import STATUS_CANCELLED, STATUS_OK, run_batch_file
+        from quittungen.rendering import default_worker_count
+
+        # Mit "Mehrere Prozesse" laufen mehrere Aufträge gleichzeitig
+        parallel = default_worker_count() if use_processes and not profile else 1
+
+        def show_job_progress(name, event):
+            # Je Auftrag eigener Durchsatz; laufen mehrere gleichzeitig, zeigt der Balken ihre Summe
+            show_progress_threadsafe(event._replace(message=f"{name}: {event.message}"), name)
+
+        results, report_file = run_batch_file(batch_file, parallel=parallel, progress=show_job_progress,
+                                              cancel=cancel_event, profile=profile)
+
+        if any(result.status == STATUS_CANCELLED for result in results):
+            progress_channel.call(status_var.set, CANCELLED_STATUS)
+            return
+
+        zeilen = []
+        for result in results:
+            if result.report is not None:
+                zeilen.append(f"➜ {result.job.name}: {result.report.receipts} Quittungen, "
+                              f"{result.report.pdf_files} Sammel-PDFs ({result.status})")
+            else:
+                zeilen.append(f"➜ {result.job.name}: {result.status} - {result.error}")
+        zusammenfassung = (
+            f"{job_count} Aufträge bearbeitet:\n" + "\n".join(zeilen) +
+            f"\n\nGesamtbericht: {os.path.basename(report_file)}"
         )
 
-        if not errors_found:
-            root.after(0, status_var.set, "PDF-Sammelquittungen erfolgreich generiert!")
-            root.after(0, show_message_threadsafe, "Schritt 2 abgeschlossen", f"PDF-Prozess erfolgreich beendet!\n\n{zusammenfassung}")
+        if all(result.status == STATUS_OK for result in results):
+            progress_channel.call(status_var.set, "Alle Aufträge erfolgreich abgeschlossen!")
+            progress_channel.call(show_message_threadsafe, "Stapel fertig", zusammenfassung)
         else:
-            root.after(0, status_var.set, "Mit Warnungen abgeschlossen.")
-            error_summary = "\n\n------------------------------------\n\n".join(errors_found)
-            final_message = (
-                f"PDF-Sammelquittungen wurden generiert.\n\n{zusammenfassung}\n\n"
-                f"Es gab jedoch Probleme/Fehler:\n\n{error_summary}"
-            )
-            root.after(0, show_message_threadsafe, "PDF-Generierung (mit Warnungen)", final_message, False, True)
+            fehler = [f"{result.job.name}: {result.error}" for result in results if result.error]
+            fehler += [f"{result.job.name}: {error}" for result in results if result.report is not None
+                       for error in result.report.errors]
+            progress_channel.call(status_var.set, "Stapel mit Warnungen abgeschlossen.")
+            progress_channel.call(show_report_window, "Stapel (mit Warnungen)",
+                                  f"{zusammenfassung}\n\nDetails stehen auch in den Laufberichten der Ausgabeordner.", fehler)
 
     except Exception as e:
-        root.after(0, status_var.set, "Kritischer Fehler aufgetreten!")
-        root.after(0, show_message_threadsafe, "Kritischer Fehler", f"Ein Fehler hat die PDF-Verarbeitung gestoppt:\n{e}", True)
+        progress_channel.call(status_var.set, "Kritischer Fehler aufgetreten!")
+        progress_channel.call(show_message_threadsafe, "Kritischer Fehler", f"Ein Fehler hat die Verarbeitung gestoppt:\n{e}", True)
     finally:
-        if HAS_PDF_TOOLS:
-            pythoncom.CoUninitialize()
-        root.after(0, toggle_buttons, False)
+        progress_channel.call(toggle_buttons, False)
 
 
 # --- GUI Code ---
 def select_excel_file():
-    filepath = filedialog.askopenfilename(filetypes=[("Excel-Dateien", "*.xlsx *.xls")])
+    filepath = filedialog.askopenfilename(filetypes=[("Schülerliste", "*.xlsx *.xls *.csv *.parquet"),
+                                                     ("Excel-Dateien", "*.xlsx *.xls"),
+                                                     ("CSV-Export", "*.csv"),
+                                                     ("Parquet-Export", "*.parquet")])
     if filepath:
         excel_path_var.set(filepath)
 
@@ -456,86 +537,138 @@ def select_output_dir():
     if dirpath:
         output_dir_var.set(dirpath)
 
-root = tk.Tk()
-root.title("Quittungs-Generator (PDF & Word Edition - Multi-Thread)")
-root.geometry("650x550") 
+if __name__ == "__main__":
+    # Nötig für die Worker-Prozesse in der gepackten .exe
+    multiprocessing.freeze_support()
 
-excel_path_var = tk.StringVar()
-template_path_var = tk.StringVar()
-prices_path_var = tk.StringVar()
-output_dir_var = tk.StringVar()
-logo_path_var = tk.StringVar()
+    root = tk.Tk()
+    root.title("Quittungs-Generator (PDF & Word Edition - Multi-Thread)")
+    root.geometry("760x810") 
 
-frame = tk.Frame(root, padx=10, pady=10)
-frame.pack(expand=True, fill=tk.X) 
+    excel_path_var = tk.StringVar()
+    template_path_var = tk.StringVar()
+    prices_path_var = tk.StringVar()
+    output_dir_var = tk.StringVar()
+    logo_path_var = tk.StringVar()
 
-frame.grid_columnconfigure(0, weight=1)
-frame.grid_columnconfigure(1, weight=0)
+    frame = tk.Frame(root, padx=10, pady=10)
+    frame.pack(expand=True, fill=tk.X) 
 
-initialize_paths()
+    frame.grid_columnconfigure(0, weight=1)
+    frame.grid_columnconfigure(1, weight=0)
 
-logo_path = logo_path_var.get()
-if os.path.exists(logo_path):
-    if HAS_PILLOW:
-        try:
-            img = Image.open(logo_path)
-            max_width = 500
-            max_height = 120
+    initialize_paths()
+
+    logo_path = logo_path_var.get()
+    if os.path.exists(logo_path):
+        if HAS_PILLOW:
             try:
-                resample_filter = Image.Resampling.LANCZOS 
-            except AttributeError:
-                resample_filter = Image.ANTIALIAS 
-
-            img.thumbnail((max_width, max_height), resample_filter)
-            logo_img = ImageTk.PhotoImage(img)
-            root.logo_img = logo_img 
-            tk.Label(frame, image=logo_img).grid(row=0, column=0, columnspan=2, pady=(0, 15))
-        except Exception as e:
-            tk.Label(frame, text="[Fehler bei der Logo-Verarbeitung]").grid(row=0, column=0, columnspan=2, pady=(0, 15))
-    else:
-        tk.Label(frame, text="[Bitte 'Pillow' installieren für Logo-Skalierung]", fg="red").grid(row=0, column=0, columnspan=2, pady=(0, 15))
+                img = Image.open(logo_path)
+                max_width = 500
+                max_height = 120
+                try:
+                    resample_filter = Image.Resampling.LANCZOS 
+                except AttributeError:
+                    resample_filter = Image.ANTIALIAS 
+
+                img.thumbnail((max_width, max_height), resample_filter)
+                logo_img = ImageTk.PhotoImage(img)
+                root.logo_img = logo_img 
+                tk.Label(frame, image=logo_img).grid(row=0, column=0, columnspan=2, pady=(0, 15))
+            except Exception as e:
+                tk.Label(frame, text="[Fehler bei der Logo-Verarbeitung]").grid(row=0, column=0, columnspan=2, pady=(0, 15))
+        else:
+            tk.Label(frame, text="[Bitte 'Pillow' installieren für Logo-Skalierung]", fg="red").grid(row=0, column=0, columnspan=2, pady=(0, 15))
+
+    # Eingabefelder und Buttons
+    tk.Label(frame, text="1. Excel-Datei (Schülerliste) auswählen:").grid(row=1, column=0, sticky="w", pady=2)
+    tk.Entry(frame, textvariable=excel_path_var, width=60).grid(row=2, column=0, padx=(0, 5), sticky="ew")
+    tk.Button(frame, text="Durchsuchen...", command=select_excel_file).grid(row=2, column=1)
+
+    tk.Label(frame, text="2. Excel-Datei (Preise) auswählen:").grid(row=3, column=0, sticky="w", pady=(10, 2))
+    tk.Entry(frame, textvariable=prices_path_var, width=60).grid(row=4, column=0, padx=(0, 5), sticky="ew")
+    tk.Button(frame, text="Durchsuchen...", command=select_prices_file).grid(row=4, column=1)
+
+    tk.Label(frame, text="3. Word-Vorlagendatei auswählen:").grid(row=5, column=0, sticky="w", pady=(10, 2))
+    tk.Entry(frame, textvariable=template_path_var, width=60).grid(row=6, column=0, padx=(0, 5), sticky="ew")
+    tk.Button(frame, text="Durchsuchen...", command=select_template_file).grid(row=6, column=1)
+
+    tk.Label(frame, text="4. Ausgabeordner auswählen:").grid(row=7, column=0, sticky="w", pady=(10, 2))
+    tk.Entry(frame, textvariable=output_dir_var, width=60).grid(row=8, column=0, padx=(0, 5), sticky="ew")
+    tk.Button(frame, text="Durchsuchen...", command=select_output_dir).grid(row=8, column=1)
+
+    # Optionen
+    options_frame = tk.Frame(frame)
+    options_frame.grid(row=9, column=0, columnspan=2, sticky="w", pady=(10, 0))
+
+    use_processes_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(options_frame, text="Mehrere Prozesse verwenden (schneller bei vielen Familien)", variable=use_processes_var).pack(anchor="w")
+
+    incremental_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(options_frame, text="Nur geänderte Quittungen und Klassen neu erstellen (inkrementell, setzt abgebrochene Läufe fort)", variable=incremental_var).pack(anchor="w")
+
+    single_pdfs_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(options_frame, text="Zusätzlich eine PDF pro Quittung behalten", variable=single_pdfs_var).pack(anchor="w")
+
+    word_output_frame = tk.Frame(options_frame)
+    word_output_frame.pack(anchor="w", pady=(2, 0))
+    tk.Label(word_output_frame, text="Word-Ausgabe:").pack(side=tk.LEFT)
+    word_output_var = tk.StringVar(value="Eine Datei pro Familie")
+    ttk.Combobox(word_output_frame, textvariable=word_output_var, values=list(WORD_OUTPUT_CHOICES), state="readonly", width=25).pack(side=tk.LEFT, padx=5)
+
+    backend_frame = tk.Frame(options_frame)
+    backend_frame.pack(anchor="w", pady=(2, 0))
+    tk.Label(backend_frame, text="PDF-Erstellung:").pack(side=tk.LEFT)
+    pdf_backend_var = tk.StringVar(value="Automatisch")
+    ttk.Combobox(backend_frame, textvariable=pdf_backend_var, values=list(PDF_BACKEND_CHOICES), state="readonly", width=25).pack(side=tk.LEFT, padx=5)
+
+    duplicates_frame = tk.Frame(options_frame)
+    duplicates_frame.pack(anchor="w", pady=(2, 0))
+    tk.Label(duplicates_frame, text="Doppelte Familien:").pack(side=tk.LEFT)
+    duplicates_var = tk.StringVar(value="Melden")
+    ttk.Combobox(duplicates_frame, textvariable=duplicates_var, values=list(DUPLICATE_CHOICES), state="readonly", width=25).pack(side=tk.LEFT, padx=5)
 
-# Eingabefelder und Buttons
-tk.Label(frame, text="1. Excel-Datei (Schülerliste) auswählen:").grid(row=1, column=0, sticky="w", pady=2)
-tk.Entry(frame, textvariable=excel_path_var, width=60).grid(row=2, column=0, padx=(0, 5), sticky="ew")
-tk.Button(frame, text="Durchsuchen...", command=select_excel_file).grid(row=2, column=1)
+    profile_frame = tk.Frame(options_frame)
+    profile_frame.pack(anchor="w", pady=(2, 0))
+    tk.Label(profile_frame, text="Lauf aufzeichnen:").pack(side=tk.LEFT)
+    profile_var = tk.StringVar(value="Aus")
+    ttk.Combobox(profile_frame, textvariable=profile_var, values=list(PROFILE_CHOICES), state="readonly", width=25).pack(side=tk.LEFT, padx=5)
 
-tk.Label(frame, text="2. Excel-Datei (Preise) auswählen:").grid(row=3, column=0, sticky="w", pady=(10, 2))
-tk.Entry(frame, textvariable=prices_path_var, width=60).grid(row=4, column=0, padx=(0, 5), sticky="ew")
-tk.Button(frame, text="Durchsuchen...", command=select_prices_file).grid(row=4, column=1)
+    # Frame für die Steuerungsknöpfe
+    button_frame = tk.Frame(frame)
+    button_frame.grid(row=10, column=0, columnspan=2, pady=(20, 5))
 
-tk.Label(frame, text="3. Word-Vorlagendatei auswählen:").grid(row=5, column=0, sticky="w", pady=(10, 2))
-tk.Entry(frame, textvariable=template_path_var, width=60).grid(row=6, column=0, padx=(0, 5), sticky="ew")
-tk.Button(frame, text="Durchsuchen...", command=select_template_file).grid(row=6, column=1)
+    btn_generate_word = tk.Button(button_frame, text="📝 1. Word generieren", font=("Helvetica", 11, "bold"), command=start_word_generation, bg="#2196F3", fg="white")
+    btn_generate_word.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
 
-tk.Label(frame, text="4. Ausgabeordner auswählen:").grid(row=7, column=0, sticky="w", pady=(10, 2))
-tk.Entry(frame, textvariable=output_dir_var, width=60).grid(row=8, column=0, padx=(0, 5), sticky="ew")
-tk.Button(frame, text="Durchsuchen...", command=select_output_dir).grid(row=8, column=1)
+    btn_generate_pdf = tk.Button(button_frame, text="📄 2. PDFs generieren", font=("Helvetica", 11, "bold"), command=start_pdf_generation, bg="#4CAF50", fg="white")
+    btn_generate_pdf.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
 
-# Frame für die Steuerungsknöpfe
-button_frame = tk.Frame(frame)
-button_frame.grid(row=9, column=0, columnspan=2, pady=(20, 5))
+    btn_generate_all = tk.Button(button_frame, text="⚡ 1 + 2 zusammen", font=("Helvetica", 11, "bold"), command=start_all_generation, bg="#673AB7", fg="white")
+    btn_generate_all.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
 
-btn_generate_word = tk.Button(button_frame, text="📝 1. Word generieren", font=("Helvetica", 11, "bold"), command=start_word_generation, bg="#2196F3", fg="white")
-btn_generate_word.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
+    btn_cancel = tk.Button(button_frame, text="🛑 Abbrechen", font=("Helvetica", 11, "bold"), command=cancel_process, bg="#cc3025", fg="white", state=tk.DISABLED)
+    btn_cancel.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
 
-btn_generate_pdf = tk.Button(button_frame, text="📄 2. PDFs generieren", font=("Helvetica", 11, "bold"), command=start_pdf_generation, bg="#4CAF50", fg="white")
-btn_generate_pdf.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
+    btn_batch = tk.Button(frame, text="📋 Mehrere Aufträge aus Auftragsdatei...", command=start_batch_generation)
+    btn_batch.grid(row=11, column=0, columnspan=2, pady=(0, 10))
 
-btn_cancel = tk.Button(button_frame, text="🛑 Abbrechen", font=("Helvetica", 11, "bold"), command=cancel_process, bg="#cc3025", fg="white", state=tk.DISABLED)
-btn_cancel.pack(side=tk.LEFT, padx=5, ipadx=5, ipady=5)
+    # Status-Text
+    status_var = tk.StringVar()
+    status_var.set("Warte auf Start...")
+    tk.Label(frame, textvariable=status_var, fg="blue", font=("Helvetica", 10)).grid(row=12, column=0, columnspan=2, pady=(0, 5))
 
-# Status-Text
-status_var = tk.StringVar()
-status_var.set("Warte auf Start...")
-tk.Label(frame, textvariable=status_var, fg="blue", font=("Helvetica", 10)).grid(row=10, column=0, columnspan=2, pady=(0, 5))
+    # Fortschrittsbalken
+    progress_var = tk.IntVar()
+    progress_bar = ttk.Progressbar(frame, variable=progress_var, mode='determinate')
+    progress_bar.grid(row=13, column=0, columnspan=2, sticky="ew", pady=(0, 2))
 
-# Fortschrittsbalken
-progress_var = tk.IntVar()
-progress_bar = ttk.Progressbar(frame, variable=progress_var, mode='determinate')
-progress_bar.grid(row=11, column=0, columnspan=2, sticky="ew", pady=(0, 15))
+    # Durchsatz und geschätzte Restzeit
+    throughput_var = tk.StringVar()
+    tk.Label(frame, textvariable=throughput_var, fg="gray", font=("Helvetica", 9)).grid(row=14, column=0, columnspan=2, pady=(0, 10))
 
-# Info-Feld
-tk.Label(frame, text="Version 25.06.2026; I. Zlat.", font=("Helvetica", 8), fg="gray").grid(row=12, column=0, columnspan=2, pady=(0, 5))
+    # Info-Feld
+    tk.Label(frame, text="Version 25.06.2026; I. Zlat.", font=("Helvetica", 8), fg="gray").grid(row=15, column=0, columnspan=2, pady=(0, 5))
 
-root.mainloop()
+    poll_progress()
+    root.mainloop()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from quittungen.duplicates import (REASON_CHILD, REASON_EMAIL, REASON_PARENT, describe, find_duplicates,
+                                   merge_duplicates, normalize_email)
+from quittungen.families import aggregate_families
+from quittungen.roster import RosterRow
+
+CHILD_FEES = {1: 360, 2: 220, 3: 170}
+
+
+def _rows(*entries):
+    return [RosterRow(number, parent, child, klasse, email)
+            for number, (parent, child, klasse, email) in enumerate(entries, start=2)]
+
+
+def test_normalize_email():
+    assert normalize_email(" Anna@X.org. ") == "anna@x.org"
+    assert normalize_email("mailto:anna@x.org") == "anna@x.org"
+    assert normalize_email("<anna@x.org>") == "anna@x.org"
+
+
+def test_case_and_trailing_dot_are_merged():
+    rows = _rows(("Maria Petrova", "Ivan Petrov", "1a", "anna@x.org"),
+                 ("Maria Petrova", "Elena Petrova", "3b", "Anna@X.org."),
+                 ("Georgi Nikolov", "Kalin Nikolov", "2a", "georgi@y.org"))
+
+    groups = find_duplicates(rows)
+
+    assert [(group.emails, group.merge) for group in groups] == [(["anna@x.org", "Anna@X.org."], True)]
+    assert groups[0].reasons == [REASON_EMAIL]
+    assert groups[0].children == []
+
+    merged = merge_duplicates(rows, groups)
+    assert [row.email for row in merged] == ["anna@x.org", "anna@x.org", "georgi@y.org"]
+    families, errors = aggregate_families(merged, CHILD_FEES, 40)
+    assert not errors
+    assert [(family.email, family.num_children, family.school_fee) for family in families] == [
+        ("anna@x.org", 2, 580), ("georgi@y.org", 1, 360)]
+
+
+def test_parent_name_match_is_only_reported():
+    rows = _rows(("Maria Petrova", "Ivan Petrov", "1a", "maria@x.org"),
+                 ("Petrova Maria", "Elena Petrova", "3b", "m.petrova@y.org"))
+
+    groups = find_duplicates(rows)
+
+    assert len(groups) == 1
+    assert groups[0].emails == ["maria@x.org", "m.petrova@y.org"]
+    assert groups[0].merge is False
+    assert REASON_PARENT in groups[0].reasons
+    assert merge_duplicates(rows, groups) == rows
+    assert describe(groups[0]).startswith("Möglicherweise doppelte Familie")
+
+
+def test_child_listed_under_both_emails_is_counted_once():
+    rows = _rows(("Ivan Petrov", "Ivan Petrov", "1a", "anna@x.org"),
+                 ("Ivan Petrov", "Ivan  Petrov", "1a", "Anna@X.org"))
+
+    groups = find_duplicates(rows)
+    merge_group = next(group for group in groups if group.merge)
+    assert merge_group.emails == ["anna@x.org", "Anna@X.org"]
+    assert merge_group.children == ["Ivan  Petrov"]
+    assert "nur einmal berechnet: Ivan  Petrov" in describe(merge_group, merged=True)
+
+    merged = merge_duplicates(rows, groups)
+    assert merged == [rows[0]]
+    families, _ = aggregate_families(merged, CHILD_FEES, 40)
+    assert [(family.children_names, family.num_children, family.school_fee) for family in families] == [
+        ("Ivan Petrov", 1, 360)]
+
+
+def test_same_child_in_other_class_is_kept():
+    rows = _rows(("Ivan Petrov", "Ivan Petrov", "1a", "anna@x.org"),
+                 ("Ivan Petrov", "Ivan Petrov", "2a", "Anna@X.org"))
+
+    groups = find_duplicates(rows)
+
+    assert next(group for group in groups if group.merge).children == []
+    assert len(merge_duplicates(rows, groups)) == 2
+
+
+def test_same_child_under_unrelated_emails_is_only_reported():
+    rows = _rows(("Maria Ivanova", "Ivan Petrov", "1a", "maria@x.org"),
+                 ("Georgi Nikolov", "Ivan Petrov", "1a", "georgi@y.org"))
+
+    groups = find_duplicates(rows)
+
+    assert [(group.merge, group.reasons) for group in groups] == [(False, [REASON_CHILD])]
+    assert merge_duplicates(rows, groups) == rows
+
+
+def test_waitlist_families_are_ignored():
+    rows = _rows(("Maria Petrova", "Ivan Petrov", "Warteliste", "anna@x.org"),
+                 ("Maria Petrova", "Elena Petrova", "3b", "Anna@X.org"))
+
+    assert find_duplicates(rows) == []
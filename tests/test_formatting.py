@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from quittungen.formatting import euro_words, fee_totals, format_euro, to_cents
+
+
+@pytest.mark.parametrize("amount, words", [
+    (1, "ein Euro"),
+    (21, "einundzwanzig Euro"),
+    (101, "einhundertein Euro"),
+    (201, "zweihundertein Euro"),
+    (360, "dreihundertsechzig Euro"),
+    (1001, "eintausendein Euro"),
+    (0.01, "ein Cent"),
+    (0.5, "fünfzig Cent"),
+    (1.01, "ein Euro und ein Cent"),
+    (101.01, "einhundertein Euro und ein Cent"),
+    (11.11, "elf Euro und elf Cent"),
+    (1.5, "ein Euro und fünfzig Cent"),
+    (580.25, "fünfhundertachtzig Euro und fünfundzwanzig Cent"),
+])
+def test_euro_words(amount, words):
+    assert euro_words(amount) == words
+
+
+def test_euro_words_rounds_to_cents():
+    # Kaufmännisch gerundet, nicht abgeschnitten
+    assert to_cents(0.125) == 13
+    assert to_cents(2.675) == 268
+    assert euro_words(0.125) == "dreizehn Cent"
+
+
+@pytest.mark.parametrize("amount, text", [
+    (0, "0,00 EUR"),
+    (1, "1,00 EUR"),
+    (1234.5, "1.234,50 EUR"),
+    (1000000, "1.000.000,00 EUR"),
+])
+def test_format_euro(amount, text):
+    assert format_euro(amount) == text
+
+
+def test_fee_totals():
+    assert fee_totals({1: 360, 2: 220, 3: 170}) == [0, 360, 580, 750]
+    assert fee_totals({1: 360, 3: 170}, max_children=4) == [0, 360, 360, 530, 530]
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import os
+
+from quittungen.manifest import Manifest, values_hash
+
+
+def _record(manifest, key, nr, klasse):
+    output_filename = os.path.join(manifest.output_dir, klasse, f"2026_Quittung_{nr:03d}.docx")
+    manifest.record(key, nr, "vorlage", values_hash({"{{NR}}": str(nr)}), output_filename, klasse)
+    return output_filename
+
+
+def _touch(path, content=b"docx"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_values_hash_ignores_date():
+    values = {"{{NR}}": "001", "{{DATUM}}": "18.10.2026"}
+    assert values_hash(values) == values_hash(dict(values, **{"{{DATUM}}": "01.09.2027"}))
+    assert values_hash(values) != values_hash(dict(values, **{"{{NR}}": "002"}))
+
+
+def test_is_current(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    output_filename = _record(manifest, "a@example.org", 1, "Klasse 1")
+    hash_value = values_hash({"{{NR}}": "1"})
+
+    # Ohne Datei nur, wenn keine Einzeldatei verlangt ist
+    assert not manifest.is_current("a@example.org", "vorlage", hash_value, output_filename)
+    assert manifest.is_current("a@example.org", "vorlage", hash_value, output_filename, require_file=False)
+
+    _touch(output_filename)
+    assert manifest.is_current("a@example.org", "vorlage", hash_value, output_filename)
+    assert not manifest.is_current("a@example.org", "andere vorlage", hash_value, output_filename)
+    assert not manifest.is_current("a@example.org", "vorlage", values_hash({"{{NR}}": "2"}), output_filename)
+    assert not manifest.is_current("b@example.org", "vorlage", hash_value, output_filename)
+
+
+def test_is_current_rejects_truncated_file(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    output_filename = os.path.join(str(tmp_path), "Klasse 1", "2026_Quittung_001.docx")
+    _touch(output_filename, b"vollstaendig")
+    manifest.record("a@example.org", 1, "vorlage", "hash", output_filename, "Klasse 1",
+                    size=os.path.getsize(output_filename))
+
+    _touch(output_filename, b"halb")
+
+    assert not manifest.is_current("a@example.org", "vorlage", "hash", output_filename)
+
+
+def test_remove_missing_deletes_files_and_marks_class(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    kept = _record(manifest, "a@example.org", 1, "Klasse 1")
+    removed = _record(manifest, "b@example.org", 2, "Klasse 2")
+    for path in (kept, removed, os.path.splitext(removed)[0] + ".pdf"):
+        _touch(path)
+    manifest.stale_classes.clear()
+
+    assert manifest.remove_missing({"a@example.org"}) == ["b@example.org"]
+
+    assert list(manifest.families) == ["a@example.org"]
+    assert manifest.stale_classes == {"Klasse 2"}
+    assert os.path.exists(kept)
+    assert not os.path.exists(removed)
+    assert not os.path.exists(os.path.splitext(removed)[0] + ".pdf")
+
+
+def test_save_and_load(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    _record(manifest, "a@example.org", 1, "Klasse 1")
+    _record(manifest, "b@example.org", 5, "Klasse 2")
+    manifest.save()
+
+    loaded = Manifest.load(str(tmp_path))
+
+    assert loaded.families == manifest.families
+    assert loaded.stale_classes == {"Klasse 1", "Klasse 2"}
+    assert loaded.next_number() == 6
+
+
+def test_journal_replay_ignores_torn_last_line(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = Manifest(output_dir)
+    manifest.save()
+    manifest.start_journal()
+    _record(manifest, "a@example.org", 1, "Klasse 1")
+    _record(manifest, "b@example.org", 2, "Klasse 2")
+    manifest.mark_class_done("Klasse 1")
+    manifest.close()
+
+    # Absturz mitten im Schreiben der nächsten Zeile
+    with open(manifest.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "family", "key": "c@exa')
+
+    loaded = Manifest.load(output_dir)
+
+    assert sorted(loaded.families) == ["a@example.org", "b@example.org"]
+    assert loaded.families["b@example.org"]["file"] == os.path.join("Klasse 2", "2026_Quittung_002.docx")
+    assert loaded.stale_classes == {"Klasse 2"}
+    assert loaded.next_number() == 3
+
+
+def test_journal_replays_removed_families(tmp_path):
+    output_dir = str(tmp_path)
+    manifest = Manifest(output_dir)
+    _record(manifest, "a@example.org", 1, "Klasse 1")
+    _record(manifest, "b@example.org", 2, "Klasse 2")
+    manifest.stale_classes.clear()
+    manifest.save()
+    manifest.start_journal()
+    manifest.remove_missing({"a@example.org"})
+    manifest.close()
+
+    loaded = Manifest.load(output_dir)
+
+    assert list(loaded.families) == ["a@example.org"]
+    assert loaded.stale_classes == {"Klasse 2"}
+
+
+def test_planned_numbers_survive_until_next_save(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    manifest.planned = {"a@example.org": 1, "b@example.org": 2}
+    manifest.save()
+
+    assert Manifest.load(str(tmp_path)).next_number() == 3
+
+
+def test_save_clears_journal(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    manifest.start_journal()
+    _record(manifest, "a@example.org", 1, "Klasse 1")
+    assert os.path.exists(manifest.journal_path)
+
+    manifest.save()
+
+    assert not os.path.exists(manifest.journal_path)
+    assert list(Manifest.load(str(tmp_path)).families) == ["a@example.org"]
+
+
+def test_issued_date_only_for_unchanged_receipt(tmp_path):
+    manifest = Manifest(str(tmp_path))
+    output_filename = os.path.join(str(tmp_path), "Klasse 1", "2026_Quittung_001.docx")
+    manifest.record("a@example.org", 1, "vorlage", "hash", output_filename, "Klasse 1", datum="18.10.2026")
+    manifest.record("b@example.org", 2, "vorlage", "hash", output_filename, "Klasse 1")
+
+    assert manifest.issued_date("a@example.org", "vorlage", "hash") == "18.10.2026"
+    assert manifest.issued_date("a@example.org", "andere vorlage", "hash") is None
+    assert manifest.issued_date("a@example.org", "vorlage", "anderer hash") is None
+    assert manifest.issued_date("c@example.org", "vorlage", "hash") is None
+    # Manifeste älterer Versionen kennen das Datum nicht
+    assert manifest.issued_date("b@example.org", "vorlage", "hash") is None
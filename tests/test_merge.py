@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip("fpdf")
+pytest.importorskip("pypdf")
+
+from fpdf import FPDF  # noqa: E402
+from pypdf import PdfReader  # noqa: E402
+
+from quittungen.pdf.merge import PdfStreamWriter, merge_pdf_files  # noqa: E402
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logo.png")
+
+
+def _receipts_pdf(path, names):
+    pdf = FPDF()
+    pdf.set_font("helvetica", size=12)
+    for name in names:
+        pdf.add_page()
+        pdf.image(LOGO_PATH, x=10, y=10, w=30)
+        pdf.text(10, 60, f"Quittung für {name}")
+    pdf.output(path)
+    return path
+
+
+def _image_objects(reader):
+    numbers = set()
+    for page in reader.pages:
+        for ref in page["/Resources"]["/XObject"].values():
+            if ref.get_object()["/Subtype"] == "/Image":
+                numbers.add(ref.idnum)
+    return numbers
+
+
+def test_merge_writes_shared_logo_once(tmp_path):
+    first = _receipts_pdf(str(tmp_path / "a.pdf"), ["Anna", "Boris"])
+    second = _receipts_pdf(str(tmp_path / "b.pdf"), ["Elena"])
+    final_pdf_path = str(tmp_path / "Klasse.pdf")
+
+    assert merge_pdf_files([first, second], final_pdf_path, remove_sources=True) == final_pdf_path
+
+    assert not os.path.exists(first) and not os.path.exists(second)
+    reader = PdfReader(final_pdf_path, strict=True)
+    assert len(reader.pages) == 3
+    assert [page.extract_text().strip() for page in reader.pages] == [
+        "Quittung für Anna", "Quittung für Boris", "Quittung für Elena"]
+    assert len(_image_objects(reader)) == 1
+    # Logo samt Transparenzmaske nur so oft wie in einer einzelnen Quittung
+    single = _receipts_pdf(str(tmp_path / "c.pdf"), ["Anna"])
+    with open(single, "rb") as f:
+        images_per_receipt = f.read().count(b"/Subtype /Image")
+    with open(final_pdf_path, "rb") as f:
+        assert f.read().count(b"/Subtype /Image") == images_per_receipt
+
+
+def test_aborted_writer_leaves_no_page_tree(tmp_path):
+    source = _receipts_pdf(str(tmp_path / "a.pdf"), ["Anna"])
+    path = str(tmp_path / "Klasse.pdf.part")
+
+    with pytest.raises(RuntimeError):
+        with PdfStreamWriter(path) as writer:
+            writer.add_pdf(source)
+            raise RuntimeError("Abbruch")
+
+    with open(path, "rb") as f:
+        assert b"trailer" not in f.read()
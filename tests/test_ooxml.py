@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import zipfile
+
+import pytest
+from docx import Document
+
+from quittungen.ooxml import PackageSkeleton
+from quittungen.template import CompiledTemplate
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Quittung-Template.docx")
+DOCUMENT_XML = "word/document.xml"
+
+REPLACEMENTS = {
+    "{{ELTERN_NAME}}": "Jörg Müller",
+    "{{KINDER_NAMEN}}": "Anna Müller, Lea Müller",
+    "{{NR}}": "007",
+    "{{DATUM}}": "18.10.2026",
+    "{{SCHULJAHR}}": "2026/2027",
+    "{{BETRAG_GEBUEHR}}": "580,00 EUR",
+    "{{GESAMTBETRAG}}": "620,00 EUR",
+    "{{BETRAG_GEBUEHR_WORT}}": "fünfhundertachtzig Euro",
+    "{{GESAMTBETRAG_WORT}}": "sechshundertzwanzig Euro",
+    "{{BETRAG_MITGLIED}}": "40,00 EUR",
+    "{{BETRAG_MITGLIED_WORT}}": "vierzig Euro",
+}
+
+
+@pytest.fixture(scope="module")
+def package_bytes():
+    package = io.BytesIO()
+    Document(TEMPLATE_PATH).save(package)
+    return package.getvalue()
+
+
+def _contents(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        return {info.filename: archive.read(info) for info in archive.infolist()}
+
+
+def test_build_round_trips_python_docx_package(package_bytes):
+    original = _contents(package_bytes)
+    skeleton = PackageSkeleton(package_bytes, [DOCUMENT_XML])
+
+    built = skeleton.build({DOCUMENT_XML: original[DOCUMENT_XML]})
+
+    assert _contents(built) == original
+    assert list(_contents(built)) == list(original)
+    paragraphs = [p.text for p in Document(io.BytesIO(built)).paragraphs]
+    assert paragraphs == [p.text for p in Document(io.BytesIO(package_bytes)).paragraphs]
+
+
+def test_build_is_deterministic(package_bytes):
+    skeleton = PackageSkeleton(package_bytes, [DOCUMENT_XML])
+    document_xml = _contents(package_bytes)[DOCUMENT_XML]
+
+    assert skeleton.build({DOCUMENT_XML: document_xml}) == skeleton.build({DOCUMENT_XML: document_xml})
+
+
+def test_missing_dynamic_part(package_bytes):
+    with pytest.raises(ValueError, match="word/fehlt.xml"):
+        PackageSkeleton(package_bytes, [DOCUMENT_XML, "word/fehlt.xml"])
+
+
+def test_rendered_receipt_matches_python_docx_replacement(tmp_path):
+    output_filename = str(tmp_path / "quittung.docx")
+    CompiledTemplate(TEMPLATE_PATH).save(REPLACEMENTS, output_filename)
+
+    expected = []
+    for paragraph in Document(TEMPLATE_PATH).paragraphs:
+        text = paragraph.text
+        for key, value in REPLACEMENTS.items():
+            text = text.replace(key, value)
+        expected.append(text)
+
+    assert [p.text for p in Document(output_filename).paragraphs] == expected
+    assert not os.path.exists(output_filename + ".part")
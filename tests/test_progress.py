@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from quittungen.pipeline import ProgressEvent
+from quittungen.progress import ProgressChannel, ProgressSnapshot, ThroughputMeter, describe_throughput, format_eta
+
+
+class _Clock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return _Clock()
+
+
+def _event(current, total, phase="word", message=""):
+    return ProgressEvent(phase, current, total, message or f"{current}/{total}")
+
+
+def test_meter_needs_a_minimum_span(clock):
+    meter = ThroughputMeter(clock)
+    assert meter.update("word", 0, 100) == (None, None)
+    clock.now += 0.1
+    assert meter.update("word", 5, 100) == (None, None)
+
+    clock.now += 1.9
+    rate, eta = meter.update("word", 20, 100)
+    assert rate == pytest.approx(10.0)
+    assert eta == pytest.approx(8.0)
+
+
+def test_meter_uses_a_sliding_window(clock):
+    meter = ThroughputMeter(clock)
+    meter.update("word", 0, 1000)
+    # Langsamer Start (z.B. Word startet), danach schnell
+    clock.now += 20
+    meter.update("word", 10, 1000)
+    clock.now += 5
+    meter.update("word", 110, 1000)
+    clock.now += 5
+    rate, _ = meter.update("word", 210, 1000)
+    assert rate == pytest.approx(20.0)
+
+
+def test_meter_restarts_on_new_phase_or_reset_counter(clock):
+    meter = ThroughputMeter(clock)
+    meter.update("word", 0, 100)
+    clock.now += 2
+    assert meter.update("word", 50, 100)[0] is not None
+
+    clock.now += 1
+    assert meter.update("pdf", 1, 10) == (None, None)
+    clock.now += 1
+    assert meter.update("pdf", 3, 10)[0] == pytest.approx(2.0)
+    clock.now += 1
+    assert meter.update("pdf", 0, 10) == (None, None)
+
+
+def test_poll_returns_latest_event_and_calls(clock):
+    channel = ProgressChannel(clock)
+    assert channel.poll() == (None, [])
+
+    channel.report(_event(1, 10))
+    channel.report(_event(2, 10))
+    channel.call(print, "a")
+    channel.call(len, "bc")
+
+    snapshot, calls = channel.poll()
+    assert snapshot == ProgressSnapshot("word", 2, 10, "2/10", None, None)
+    assert calls == [(print, ("a",)), (len, ("bc",))]
+    assert channel.poll() == (None, [])
+
+    clock.now += 1
+    channel.report(_event(6, 10))
+    snapshot, _ = channel.poll()
+    assert snapshot.rate == pytest.approx(4.0)
+    assert snapshot.eta == pytest.approx(1.0)
+
+
+def test_poll_combines_parallel_sources(clock):
+    channel = ProgressChannel(clock)
+    channel.report(_event(0, 100, message="A: 0/100"), "A")
+    channel.report(_event(0, 50, message="B: 0/50"), "B")
+    snapshot, _ = channel.poll()
+    assert (snapshot.current, snapshot.total, snapshot.message) == (0, 150, "B: 0/50")
+
+    # Beide melden im selben Bild; beide Messungen laufen weiter, nicht nur die zuletzt gemeldete
+    clock.now += 1
+    channel.report(_event(20, 100, message="A: 20/100"), "A")
+    channel.report(_event(10, 50, message="B: 10/50"), "B")
+    snapshot, _ = channel.poll()
+    assert (snapshot.phase, snapshot.current, snapshot.total) == ("word", 30, 150)
+    assert snapshot.message == "B: 10/50"
+    assert snapshot.rate == pytest.approx(30.0)
+    assert snapshot.eta == pytest.approx(4.0)
+
+    # Nur A meldet: B behält seinen letzten Stand, der Balken springt nicht zurück
+    clock.now += 1
+    channel.report(_event(100, 100, phase="pdf", message="A: fertig"), "A")
+    snapshot, _ = channel.poll()
+    assert (snapshot.phase, snapshot.current, snapshot.total) == (None, 110, 150)
+    assert snapshot.message == "A: fertig"
+    assert snapshot.rate == pytest.approx(10.0)
+    assert snapshot.eta == pytest.approx(4.0)
+
+
+def test_reset_forgets_sources(clock):
+    channel = ProgressChannel(clock)
+    channel.report(_event(5, 10), "A")
+    channel.report(_event(5, 10), "B")
+    channel.poll()
+
+    channel.reset()
+    channel.report(_event(1, 10), "C")
+
+    assert channel.poll()[0] == ProgressSnapshot("word", 1, 10, "1/10", None, None)
+
+
+def test_describe_throughput():
+    assert describe_throughput(None) == ""
+    assert describe_throughput(ProgressSnapshot("word", 10, 100, "", 12.5, 42)) == \
+        "12,5 Quittungen/s - noch ca. 0:42 min"
+    assert describe_throughput(ProgressSnapshot("pdf", 1, 10, "", 0.5, 3700)) == "30,0 Klassen/min - noch ca. 1:01 h"
+    assert describe_throughput(ProgressSnapshot(None, 10, 10, "", 2.0, 0)) == "2,0 Schritte/s"
+    assert format_eta(59.6) == "1:00 min"
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import zipfile
+from datetime import datetime, time
+
+import pytest
+
+from quittungen.families import aggregate_families
+from quittungen.roster import ROSTER_COLUMNS, RosterRow, read_roster, read_table
+
+_NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+_WORKBOOK = (f'<workbook {_NS} xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+             '{properties}<sheets><sheet name="Liste" sheetId="1" r:id="rId1"/></sheets></workbook>')
+_RELS = ('<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"'
+         ' Target="worksheets/sheet1.xml"/></Relationships>')
+# Zellformat 0 = Standard, 1 = eingebautes Datum (14), 2 = eigenes Datumsformat, 3 = eigenes Zahlenformat
+_STYLES = (f'<styleSheet {_NS}><numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy"/>'
+           '<numFmt numFmtId="165" formatCode="0.00 &quot;EUR&quot;"/></numFmts>'
+           '<cellXfs count="4"><xf numFmtId="0"/><xf numFmtId="14"/><xf numFmtId="164"/><xf numFmtId="165"/>'
+           '</cellXfs></styleSheet>')
+
+
+def _xlsx(path, rows, shared=(), date1904=False):
+    """Minimale .xlsx-Datei; rows = [[Zell-XML ohne r-Attribut, ...], ...]."""
+    sheet_rows = []
+    for row_number, cells in enumerate(rows, start=1):
+        cells_xml = "".join(cell.format(ref=f"{chr(65 + column)}{row_number}")
+                            for column, cell in enumerate(cells) if cell)
+        sheet_rows.append(f'<row r="{row_number}">{cells_xml}</row>')
+    strings = "".join(f"<si><t>{text}</t></si>" for text in shared)
+    properties = '<workbookPr date1904="1"/>' if date1904 else ""
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("xl/workbook.xml", _WORKBOOK.format(properties=properties))
+        archive.writestr("xl/_rels/workbook.xml.rels", _RELS)
+        archive.writestr("xl/styles.xml", _STYLES)
+        archive.writestr("xl/sharedStrings.xml", f"<sst {_NS}>{strings}</sst>")
+        archive.writestr("xl/worksheets/sheet1.xml", f"<worksheet {_NS}><sheetData>{''.join(sheet_rows)}"
+                                                     "</sheetData></worksheet>")
+    return str(path)
+
+
+def _text(value):
+    return '<c r="{ref}" t="inlineStr"><is><t>' + value + '</t></is></c>'
+
+
+def _shared(index):
+    return '<c r="{ref}" t="s"><v>' + str(index) + '</v></c>'
+
+
+def _number(value, style=None):
+    style = f' s="{style}"' if style is not None else ""
+    return '<c r="{ref}"' + style + '><v>' + str(value) + '</v></c>'
+
+
+def test_xlsx_shared_strings_and_projection(tmp_path):
+    shared = ["Eltern 1 - Name", "Name Kind", "In Klasse", "Eltern 1 - Emailadresse", "Maria Petrova"]
+    path = _xlsx(tmp_path / "liste.xlsx", [
+        [_shared(0), _text("Gezahlt"), _shared(1), _shared(2), _shared(3)],
+        [_shared(4), _number(360), _text("Ivan Petrov"), _text("1a"), _text(" maria@x.org ")],
+        # Leere Zeile, Zeile ohne Kind
+        [],
+        [_shared(4), None, None, _text("1a"), _text("m@x.org")],
+    ], shared)
+
+    assert list(read_table(path, ROSTER_COLUMNS)) == [
+        (2, ("Maria Petrova", "Ivan Petrov", "1a", " maria@x.org ")),
+        (3, (None, None, None, None)),
+        (4, ("Maria Petrova", None, "1a", "m@x.org")),
+    ]
+    assert list(read_roster(path)) == [RosterRow(2, "Maria Petrova", "Ivan Petrov", "1a", "maria@x.org")]
+
+
+def test_xlsx_missing_column(tmp_path):
+    path = _xlsx(tmp_path / "liste.xlsx", [[_text("Eltern 1 - Name"), _text("Name Kind")]])
+
+    with pytest.raises(ValueError, match="'In Klasse', 'Eltern 1 - Emailadresse'"):
+        list(read_table(path, ROSTER_COLUMNS))
+
+
+def test_xlsx_cell_types(tmp_path):
+    columns = ("A", "B", "C", "D", "E", "F", "G", "H")
+    path = _xlsx(tmp_path / "werte.xlsx", [
+        [_text(name) for name in columns],
+        ['<c r="{ref}" t="d"><v>2026-09-14T00:00:00</v></c>',
+         _number(46279, style=1),
+         _number("46279.5", style=2),
+         _number("0.75", style=2),
+         _number("360.5", style=3),
+         '<c r="{ref}" t="e"><v>#N/A</v></c>',
+         '<c r="{ref}" t="b"><v>1</v></c>',
+         '<c r="{ref}" t="str"><v>3a</v></c>'],
+    ])
+
+    assert list(read_table(path, columns)) == [
+        (2, (datetime(2026, 9, 14), datetime(2026, 9, 14), datetime(2026, 9, 14, 12), time(18),
+             360.5, None, True, "3a")),
+    ]
+
+
+def test_xlsx_date_1904(tmp_path):
+    path = _xlsx(tmp_path / "mac.xlsx", [[_text("Datum")], [_number(44817, style=1)]], date1904=True)
+
+    assert list(read_table(path, ("Datum",))) == [(2, (datetime(2026, 9, 14),))]
+
+
+def test_csv_with_semicolons(tmp_path):
+    path = tmp_path / "liste.csv"
+    path.write_bytes("Eltern 1 - Name;Name Kind;In Klasse;Eltern 1 - Emailadresse;Gezahlt\n"
+                     "Jörg Müller;Anna Müller;1a;joerg@x.org;360,00\n"
+                     "Jörg Müller;Lea Müller;;joerg@x.org;\n".encode("cp1252"))
+
+    assert list(read_roster(str(path))) == [
+        RosterRow(2, "Jörg Müller", "Anna Müller", "1a", "joerg@x.org"),
+        RosterRow(3, "Jörg Müller", "Lea Müller", None, "joerg@x.org"),
+    ]
+
+
+def test_parquet(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    table = pa.table({"Eltern 1 - Name": ["Maria Petrova"], "Name Kind": ["Ivan Petrov"], "In Klasse": [None],
+                      "Eltern 1 - Emailadresse": ["maria@x.org"], "Gezahlt": [360.0]})
+    path = str(tmp_path / "liste.parquet")
+    pq.write_table(table, path)
+
+    assert list(read_roster(path)) == [RosterRow(2, "Maria Petrova", "Ivan Petrov", None, "maria@x.org")]
+
+
+def test_empty_class_sorts_as_nan_like_pandas():
+    # Wie früher df['In Klasse'].astype(str): leere Klassen als "nan" zwischen den übrigen Klassen
+    rows = [RosterRow(2, "E1", "K1", "zweig", "e1@x.org"),
+            RosterRow(3, "E2", "K2", None, "e2@x.org"),
+            RosterRow(4, "E3", "K3", "Klasse 1", "e3@x.org"),
+            RosterRow(5, "E4", "K4", None, "e4@x.org"),
+            RosterRow(6, "E5", "K5", "1a", "e5@x.org")]
+
+    families, errors = aggregate_families(rows, {1: 360}, 40)
+
+    assert not errors
+    assert [(family.email, family.klasse) for family in families] == [
+        ("e5@x.org", "1a"), ("e3@x.org", "Klasse 1"), ("e2@x.org", "nan"), ("e4@x.org", "nan"),
+        ("e1@x.org", "zweig")]
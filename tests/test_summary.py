@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import glob
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from quittungen.summary import CLASS_TOTALS_SHEET, COLUMNS, MAIN_SHEET, SummaryWorkbook
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _row(nr, klasse, amount):
+    return {'Quittung Nr.': f"{nr:03d}", 'Eltern 1 - Name': f"Eltern {nr}",
+            'Eltern 1 - Emailadresse': f"eltern{nr}@example.org", 'In Klasse': klasse,
+            'Rechnungsbeitrag (€)': amount, 'Namen aller Kinder': f"Kind {nr}"}
+
+
+def _values(sheet):
+    return [list(row) for row in sheet.iter_rows(values_only=True)]
+
+
+def test_class_sheets_subtotals_and_totals(tmp_path):
+    path = str(tmp_path / "Uebersicht.xlsx")
+    summary = SummaryWorkbook(path)
+    for row in (_row(1, "1a", 400), _row(2, "2b", 620), _row(3, "1a", 250.5)):
+        summary.add(row)
+
+    assert summary.close() == path
+    assert not os.path.exists(path + ".part")
+
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == [MAIN_SHEET, "1a", "2b", CLASS_TOTALS_SHEET]
+
+    main = _values(workbook[MAIN_SHEET])
+    assert main[0] == COLUMNS
+    assert [row[0] for row in main[1:4]] == ["001", "002", "003"]
+    assert main[-1] == ["Gesamt", "3 Quittungen", None, None, 1270.5, None]
+
+    class_1a = _values(workbook["1a"])
+    assert [row[0] for row in class_1a[1:3]] == ["001", "003"]
+    assert class_1a[-1] == ["Zwischensumme", "2 Quittungen", None, None, 650.5, None]
+    assert _values(workbook["2b"])[-1] == ["Zwischensumme", "1 Quittungen", None, None, 620, None]
+
+    assert _values(workbook[CLASS_TOTALS_SHEET]) == [
+        ["In Klasse", "Quittungen", "Rechnungsbeitrag (€)"],
+        ["1a", 2, 650.5],
+        ["2b", 1, 620],
+        ["Gesamt", 3, 1270.5],
+    ]
+    assert workbook[MAIN_SHEET]["E2"].number_format == "#,##0.00"
+
+
+def test_sheet_titles_are_valid_and_unique(tmp_path):
+    path = str(tmp_path / "Uebersicht.xlsx")
+    summary = SummaryWorkbook(path)
+    for nr, klasse in enumerate(["3/4", "Klasse A", "klasse a", "Übersicht", "x" * 40], start=1):
+        summary.add(_row(nr, klasse, 100))
+    summary.close()
+
+    assert load_workbook(path).sheetnames == [MAIN_SHEET, "3_4", "Klasse A", "klasse a (2)", "Übersicht (2)",
+                                              "x" * 31, CLASS_TOTALS_SHEET]
+
+
+def test_summary_is_written_when_rendering_fails(tmp_path, monkeypatch):
+    from quittungen import rendering
+    from quittungen.pipeline import generate_receipts
+
+    def failing_render(template_path, jobs, on_result=None, **kwargs):
+        # Zwei Quittungen werden fertig, dann bricht der Prozess-Pool weg
+        for job in jobs[:2]:
+            with open(job.output_filename, "wb") as f:
+                f.write(b"docx")
+            on_result(job.key, None)
+        raise RuntimeError("Prozess-Pool abgestürzt")
+
+    monkeypatch.setattr(rendering, "render_receipts", failing_render)
+    output_dir = str(tmp_path / "out")
+
+    with pytest.raises(RuntimeError):
+        generate_receipts(os.path.join(REPO_DIR, "schuelerliste.xlsx"), os.path.join(REPO_DIR, "preise.xlsx"),
+                          os.path.join(REPO_DIR, "Quittung-Template.docx"), output_dir, run_report=False)
+
+    summary_files = glob.glob(os.path.join(output_dir, "*_Quittungen_Uebersicht.xlsx"))
+    assert len(summary_files) == 1
+    main = _values(load_workbook(summary_files[0])[MAIN_SHEET])
+    assert len(main) == 1 + 2 + 2
+    assert main[-1][:2] == ["Gesamt", "2 Quittungen"]
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.shared import Cm
+
+from quittungen.template import CompiledTemplate
+
+LOGO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logo.png")
+
+
+def _template(path, paragraphs):
+    """Vorlage mit einem Absatz je Eintrag; ein Eintrag ist eine Liste von (Text, fett)-Runs."""
+    document = Document()
+    for runs in paragraphs:
+        paragraph = document.add_paragraph()
+        for text, bold in runs:
+            paragraph.add_run(text).bold = bold
+    document.save(str(path))
+    return str(path)
+
+
+def test_placeholder_split_across_runs(tmp_path):
+    # So verteilt Word Platzhalter nach dem Bearbeiten oder durch die Rechtschreibprüfung
+    path = _template(tmp_path / "vorlage.docx", [
+        [("Nr. {{", False), ("N", False), ("R}} / {{DA", True), ("TUM}}", False)],
+        [("Für {{ELTERN_NAME}}, Kinder: {", False), ("{KINDER_", True), ("NAMEN}", False), ("}.", False)],
+    ])
+    template = CompiledTemplate(path)
+    assert template.placeholders == {"{{NR}}", "{{DATUM}}", "{{ELTERN_NAME}}", "{{KINDER_NAMEN}}"}
+
+    output_filename = str(tmp_path / "quittung.docx")
+    template.save({"{{NR}}": "007", "{{DATUM}}": "18.10.2026", "{{ELTERN_NAME}}": " Jörg Müller ",
+                   "{{KINDER_NAMEN}}": "Anna und Lea"}, output_filename)
+
+    paragraphs = Document(output_filename).paragraphs
+    assert [p.text for p in paragraphs] == ["Nr. 007 / 18.10.2026", "Für  Jörg Müller , Kinder: Anna und Lea."]
+    # Der Wert steht im ersten Run des Platzhalters und bekommt dessen Formatierung
+    assert [(run.text, run.bold) for run in paragraphs[0].runs] == [
+        ("Nr. 007", False), ("", False), (" / 18.10.2026", True), ("", False)]
+
+
+def test_unknown_values_keep_placeholder(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", [[("{{NR}} {{UNBEKANNT}}", False)]])
+    output_filename = str(tmp_path / "quittung.docx")
+
+    CompiledTemplate(path).save({"{{NR}}": 1}, output_filename)
+
+    assert Document(output_filename).paragraphs[0].text == "1 {{UNBEKANNT}}"
+
+
+def test_render_does_not_change_the_template(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", [[("{{NR}}", False)]])
+    template = CompiledTemplate(path)
+
+    for nr in ("001", "002"):
+        template.save({"{{NR}}": nr}, str(tmp_path / f"{nr}.docx"))
+
+    assert [Document(str(tmp_path / f"{nr}.docx")).paragraphs[0].text for nr in ("001", "002")] == ["001", "002"]
+
+
+def _class_template(path, header_text=None):
+    """Vorlage mit Logo und Lesezeichen, optional mit Text in der Kopfzeile."""
+    document = Document()
+    paragraph = document.add_paragraph("Quittung Nr. {{NR}}")
+    start = OxmlElement("w:bookmarkStart")
+    start.set(qn("w:id"), "0")
+    start.set(qn("w:name"), "Anfang")
+    end = OxmlElement("w:bookmarkEnd")
+    end.set(qn("w:id"), "0")
+    paragraph._p.insert(0, start)
+    paragraph._p.append(end)
+    document.add_picture(LOGO_PATH, width=Cm(3))
+    document.add_paragraph("Eltern: {{ELTERN_NAME}}")
+    if header_text:
+        document.sections[0].header.paragraphs[0].text = header_text
+    document.save(str(path))
+    return str(path)
+
+
+def test_save_combined_one_section_per_receipt(tmp_path):
+    template = CompiledTemplate(_class_template(tmp_path / "vorlage.docx"))
+    output_filename = str(tmp_path / "1a.docx")
+
+    template.save_combined([{"{{NR}}": f"00{nr}", "{{ELTERN_NAME}}": name}
+                            for nr, name in enumerate(["Anna", "Boris", "Elena"], start=1)], output_filename)
+
+    document = Document(output_filename)
+    texts = [p.text for p in document.paragraphs if p.text]
+    assert texts == ["Quittung Nr. 001", "Eltern: Anna", "Quittung Nr. 002", "Eltern: Boris",
+                     "Quittung Nr. 003", "Eltern: Elena"]
+
+    body = document.element.body
+    # Abschnittswechsel im letzten Absatz jeder Quittung außer der letzten, deren sectPr am Ende des Body steht
+    assert len(document.sections) == 3
+    breaks = [p for p in body.iterchildren(qn("w:p")) if p.find(qn("w:pPr") + "/" + qn("w:sectPr")) is not None]
+    assert [p.xpath("string(.)") for p in breaks] == ["Eltern: Anna", "Eltern: Boris"]
+    assert body[-1].tag == qn("w:sectPr")
+
+    # Bild-IDs im ganzen Dokument neu durchnummeriert
+    assert [doc_pr.get("id") for doc_pr in body.iter(qn("wp:docPr"))] == ["1", "2", "3"]
+
+    # Lesezeichen nur aus der ersten Quittung
+    starts = list(body.iter(qn("w:bookmarkStart")))
+    assert [start.get(qn("w:name")) for start in starts] == ["Anfang"]
+    assert len(list(body.iter(qn("w:bookmarkEnd")))) == 1
+    assert starts[0].getparent().xpath("string(.)") == "Quittung Nr. 001"
+
+
+def test_save_combined_rejects_placeholders_outside_main_part(tmp_path):
+    template = CompiledTemplate(_class_template(tmp_path / "vorlage.docx", header_text="Nr. {{NR}}"))
+
+    with pytest.raises(ValueError, match="nur im Haupttext"):
+        template.save_combined([{"{{NR}}": "001", "{{ELTERN_NAME}}": "Anna"}], str(tmp_path / "1a.docx"))
+
+    assert not (tmp_path / "1a.docx").exists()
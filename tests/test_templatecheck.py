@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+from docx import Document
+
+from quittungen.templatecheck import (LOCATION_BODY, LOCATION_HEADER, LOCATION_TABLE, RECEIPT_PLACEHOLDERS,
+                                      PlaceholderUse, analyze_template, check_template, validate_template)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUIRED_TEXT = "{{ELTERN_NAME}} {{KINDER_NAMEN}} {{NR}} {{GESAMTBETRAG}}"
+
+
+def _template(path, paragraphs=(REQUIRED_TEXT,), header_text=None, table_text=None):
+    """Vorlage mit einem Absatz je Eintrag; ein Eintrag ist ein Text oder eine Liste von (Text, fett)-Runs."""
+    document = Document()
+    for runs in paragraphs:
+        paragraph = document.add_paragraph()
+        for text, bold in ([(runs, False)] if isinstance(runs, str) else runs):
+            paragraph.add_run(text).bold = bold
+    if table_text:
+        document.add_table(rows=1, cols=1).cell(0, 0).text = table_text
+    if header_text:
+        document.sections[0].header.paragraphs[0].text = header_text
+    document.save(str(path))
+    return str(path)
+
+
+def test_repository_template_is_valid():
+    check = validate_template(os.path.join(REPO_DIR, "Quittung-Template.docx"), class_documents=True)
+
+    assert check.placeholders == set(RECEIPT_PLACEHOLDERS)
+    assert check.problems() == [] and check.malformed == []
+
+
+def test_unknown_and_missing_placeholders(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", ["{{ELTERN_NAMEN}} {{KINDER_NAMEN}} {{GESAMTBETRAG}}"])
+
+    check = analyze_template(path)
+
+    assert check.unknown == ["{{ELTERN_NAMEN}}"]
+    assert check.missing == ["{{ELTERN_NAME}}", "{{NR}}"]
+    problems = check.problems()
+    assert len(problems) == 3
+    assert problems[0].startswith("Unbekannter Platzhalter {{ELTERN_NAMEN}} (Haupttext)")
+    assert problems[1:] == ["Pflicht-Platzhalter {{ELTERN_NAME}} fehlt in der Vorlage.",
+                            "Pflicht-Platzhalter {{NR}} fehlt in der Vorlage."]
+
+
+def test_malformed_placeholders(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", [REQUIRED_TEXT, "Nr. {{ NR }} vom {DATUM}} für {{Eltern-Name}}",
+                                                 "Betrag: {{GESAMTBETRAG}", "Mengen {a, b} und {x} sind in Ordnung"],
+                     table_text="{{SCHULJAHR }}")
+
+    check = analyze_template(path)
+
+    assert [(entry.text, entry.location) for entry in check.malformed] == [
+        ("{{ NR }}", LOCATION_BODY), ("{DATUM}}", LOCATION_BODY), ("{{Eltern-Name}}", LOCATION_BODY),
+        ("{{GESAMTBETRAG}", LOCATION_BODY), ("{{SCHULJAHR }}", LOCATION_TABLE)]
+    assert check.unknown == [] and check.missing == []
+    assert len(check.problems()) == 5
+    assert check.problems()[0] == ("Fehlerhafter Platzhalter '{{ NR }}' (Haupttext) - erlaubt sind nur "
+                                   "{{GROSSBUCHSTABEN_ZIFFERN}} ohne Leerzeichen.")
+
+
+def test_placeholder_split_across_runs(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", [
+        REQUIRED_TEXT,
+        [("Datum: {{DA", False), ("TU", False), ("M}}", False)],
+        [("{{SCHUL", False), ("JAHR}}", True)],
+    ])
+
+    check = analyze_template(path)
+
+    assert check.uses[-2:] == [
+        PlaceholderUse("{{DATUM}}", LOCATION_BODY, "word/document.xml", 3, False),
+        PlaceholderUse("{{SCHULJAHR}}", LOCATION_BODY, "word/document.xml", 2, True)]
+    assert check.problems() == []
+    assert check.warnings() == ["Platzhalter {{SCHULJAHR}} ist über unterschiedlich formatierte Textteile "
+                                "verteilt; der Wert bekommt die Formatierung des ersten Teils."]
+    assert "verteilt auf bis zu 3 Runs" in check.describe()
+
+
+def test_header_placeholder_only_fails_for_class_documents(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", header_text="Quittung {{NR}} - {{DATUM}}")
+
+    check = validate_template(path)
+
+    assert {use.name for use in check.uses if use.location == LOCATION_HEADER} == {"{{NR}}", "{{DATUM}}"}
+    with pytest.raises(ValueError) as excinfo:
+        validate_template(path, class_documents=True)
+    assert "{{DATUM}}, {{NR}}" in str(excinfo.value)
+
+
+def test_validate_lists_all_problems(tmp_path):
+    path = _template(tmp_path / "vorlage.docx", ["{{NR}} {{ NR }} {{UNBEKANNT}}"])
+
+    with pytest.raises(ValueError) as excinfo:
+        validate_template(path)
+
+    lines = str(excinfo.value).splitlines()
+    assert lines[0] == f"Die Vorlage '{path}' ist fehlerhaft:"
+    assert len(lines) == 1 + 1 + 3 + 1
+
+
+def test_check_is_cached_per_hash(tmp_path):
+    path = _template(tmp_path / "vorlage.docx")
+
+    assert check_template(path) is check_template(path)
+    assert check_template(path, "anderer-hash") is not check_template(path)
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / "vorlage.docx"
+    path.write_bytes(b"kein zip")
+
+    with pytest.raises(ValueError, match="keine gültige Word-Datei"):
+        check_template(str(path))
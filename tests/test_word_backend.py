@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from quittungen.pdf.word import WordComBackend
+
+
+class _FakeDocument:
+
+    def __init__(self, word, path):
+        self.word = word
+        self.path = path
+
+    def SaveAs(self, pdf_path, FileFormat):
+        if os.path.basename(self.path) in self.word.failing:
+            # Word bricht mitten im Schreiben ab
+            with open(pdf_path, "wb") as f:
+                f.write(b"%PDF-1.7 halb")
+            raise RuntimeError("Word antwortet nicht")
+        with open(pdf_path, "wb") as f:
+            f.write(b"kein echtes PDF")
+
+    def Close(self, save_changes):
+        pass
+
+
+class _FakeWord:
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.Documents = self
+
+    def Open(self, path, ReadOnly):
+        return _FakeDocument(self, path)
+
+
+def _backend(tmp_path, failing=()):
+    for name in ("a.docx", "b.docx", "c.docx"):
+        (tmp_path / name).write_bytes(b"docx")
+    backend = WordComBackend()
+    backend._word = _FakeWord(failing)
+    return backend
+
+
+def _pdfs(tmp_path):
+    return sorted(path.name for path in tmp_path.iterdir() if path.suffix == ".pdf")
+
+
+def test_convert_removes_pdfs_when_word_fails(tmp_path):
+    backend = _backend(tmp_path, failing={"c.docx"})
+
+    with pytest.raises(RuntimeError):
+        backend.convert(str(tmp_path), ["a.docx", "b.docx", "c.docx"])
+
+    assert _pdfs(tmp_path) == []
+
+
+def test_convert_removes_pdfs_when_cancelled(tmp_path):
+    backend = _backend(tmp_path)
+    calls = []
+
+    def is_cancelled():
+        calls.append(None)
+        return len(calls) > 2
+
+    assert backend.convert(str(tmp_path), ["a.docx", "b.docx", "c.docx"], is_cancelled) is None
+    assert _pdfs(tmp_path) == []
+
+
+def test_convert_keeps_pdfs(tmp_path):
+    backend = _backend(tmp_path)
+
+    assert backend.convert(str(tmp_path), ["a.docx", "b.docx"]) == ["a.pdf", "b.pdf"]
+    assert _pdfs(tmp_path) == ["a.pdf", "b.pdf"]
+
+
+def test_build_class_removes_pdfs_when_merge_fails(tmp_path):
+    backend = _backend(tmp_path)
+    final_pdf_path = str(tmp_path / "Klasse.pdf.part")
+
+    # Die Einzel-PDFs der Attrappe sind keine gültigen PDFs
+    with pytest.raises(Exception):
+        backend.build_class(str(tmp_path), ["a.docx", "b.docx"], final_pdf_path, single_pdfs=True)
+
+    assert _pdfs(tmp_path) == []